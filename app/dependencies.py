@@ -0,0 +1,343 @@
+"""
+Application-scoped service container and FastAPI dependencies.
+"""
+
+import asyncio
+import logging
+from typing import Iterable, Optional
+from fastapi import Request
+from app import metrics
+from app.services.slack_client import SlackService
+from app.services.message_formatter import MessageFormatter
+from app.services.dispatcher import NotificationDispatcher
+from app.services.outbox import Outbox
+from app.services.idempotency import IdempotencyStore
+from app.services.state import open_state_backend
+from app.shutdown import ShutdownCoordinator
+
+logger = logging.getLogger(__name__)
+
+
+def preload_dependencies():
+    """Import the OpenAI Agents SDK and the Slack async client"""
+    import agents  # noqa: F401
+    import slack_sdk.web.async_client  # noqa: F401
+
+
+class ServiceContainer:
+    """Holds the services shared by every request for the lifetime of the app."""
+
+    def __init__(self):
+        # Caches and Slack rate limits shared with the other workers, if configured
+        self.state = open_state_backend()
+        self.slack_service = SlackService(state=self.state)
+        self.message_formatter = MessageFormatter(state=self.state)
+        self.dispatcher = NotificationDispatcher(
+            self.slack_service, self.message_formatter
+        )
+        self.outbox = Outbox()
+        self.idempotency = IdempotencyStore()
+        self.startup_seconds = None
+
+    async def warm_up(self):
+        """Open the pooled Slack connection and load channel IDs ahead of the first request"""
+        if await self.slack_service.validate_connection():
+            logger.info("Slack connection warmed up")
+            await self.slack_service.channel_directory.refresh()
+        else:
+            logger.warning("Slack connection warm-up failed")
+
+    async def start(self):
+        """Start background workers and report service state to /metrics"""
+        await self.outbox.start(self.dispatcher)
+        metrics.registry.add_collector(self.collect_metrics)
+
+    def collect_metrics(self) -> Iterable[metrics.Sample]:
+        """Cache, queue and limiter statistics sampled at scrape time"""
+        cache = self.message_formatter.cache.stats()
+        limiter = self.slack_service.rate_limiter.stats()
+        directory = self.slack_service.channel_directory.stats()
+        idempotency = self.idempotency.stats()
+        breakers = {
+            "llm": self.message_formatter.breaker.stats(),
+            "slack": self.slack_service.breaker.stats(),
+        }
+        batcher = self.message_formatter.batcher
+        admission = self.dispatcher.admission.stats()
+        schedulers = (self.dispatcher.format_scheduler, self.dispatcher.post_scheduler)
+        return [
+            (
+                "kalos_format_cache_hits_total",
+                "counter",
+                "Format cache hits",
+                [({}, cache["hits"])],
+            ),
+            (
+                "kalos_format_cache_misses_total",
+                "counter",
+                "Format cache misses",
+                [({}, cache["misses"])],
+            ),
+            (
+                "kalos_format_cache_entries",
+                "gauge",
+                "Messages in the format cache",
+                [({}, cache["entries"])],
+            ),
+            (
+                "kalos_format_cache_bytes",
+                "gauge",
+                "Bytes held by the format cache",
+                [({}, cache["bytes"])],
+            ),
+            (
+                "kalos_format_cache_shared_hits_total",
+                "counter",
+                "Format cache hits served from the shared state backend",
+                [({}, cache["shared_hits"])],
+            ),
+            (
+                "kalos_format_path_total",
+                "counter",
+                "Formatted messages by how they were produced",
+                [
+                    ({"path": path}, count)
+                    for path, count in self.message_formatter.path_counts.items()
+                ],
+            ),
+            (
+                "kalos_format_hedges_total",
+                "counter",
+                "Hedged second LLM requests sent after the first was slow",
+                [({}, self.message_formatter.hedges)],
+            ),
+            (
+                "kalos_format_batches_total",
+                "counter",
+                "Batched LLM calls",
+                [({}, batcher.batches)],
+            ),
+            (
+                "kalos_format_batch_items_total",
+                "counter",
+                "Notifications formatted in batches",
+                [({}, batcher.batched_items)],
+            ),
+            (
+                "kalos_slack_queued",
+                "gauge",
+                "Slack calls waiting for a rate limit token",
+                [({}, limiter["queued"])],
+            ),
+            (
+                "kalos_slack_rate_limit_wait_seconds_total",
+                "counter",
+                "Time spent waiting for Slack rate limits",
+                [({}, limiter["wait_seconds_total"])],
+            ),
+            (
+                "kalos_slack_rate_limit_max_wait_seconds",
+                "gauge",
+                "Longest wait for a Slack rate limit token",
+                [({}, limiter["max_wait_seconds"])],
+            ),
+            (
+                "kalos_slack_rate_limited_total",
+                "counter",
+                "ratelimited responses from Slack",
+                [({}, limiter["rate_limited"])],
+            ),
+            (
+                "kalos_channel_directory_channels",
+                "gauge",
+                "Channels in the channel directory",
+                [({}, directory["channels"])],
+            ),
+            (
+                "kalos_channel_directory_missing",
+                "gauge",
+                "Channels negatively cached as missing",
+                [({}, directory["missing"])],
+            ),
+            (
+                "kalos_channel_directory_shared_loads_total",
+                "counter",
+                "Channel indexes adopted from another worker instead of loaded from Slack",
+                [({}, self.slack_service.channel_directory.shared_loads)],
+            ),
+            (
+                "kalos_state_backend_errors_total",
+                "counter",
+                "Failed shared state backend calls, served from local state instead",
+                [({}, self.state.stats()["errors"])],
+            ),
+            (
+                "kalos_queue_depth",
+                "gauge",
+                "Notifications waiting for an LLM or Slack slot by stage and lane",
+                [
+                    ({"stage": scheduler.stage, "lane": lane.value}, depth)
+                    for scheduler in schedulers
+                    for lane, depth in scheduler.depths().items()
+                ],
+            ),
+            (
+                "kalos_admission_in_flight",
+                "gauge",
+                "Notifications admitted and being delivered",
+                [({}, admission["in_flight"])],
+            ),
+            (
+                "kalos_admission_queued",
+                "gauge",
+                "Notifications waiting for admission",
+                [({}, admission["queued"])],
+            ),
+            (
+                "kalos_admission_limit",
+                "gauge",
+                "Current admission limit on notifications in flight",
+                [({}, admission["limit"])],
+            ),
+            (
+                "kalos_admission_rejected_total",
+                "counter",
+                "Notifications shed with 429 by reason",
+                [
+                    ({"reason": reason}, count)
+                    for reason, count in admission["rejected"].items()
+                ],
+            ),
+            (
+                "kalos_outbox_queue_depth",
+                "gauge",
+                "Async notifications waiting for a worker",
+                [({}, self.outbox.depth)],
+            ),
+            (
+                "kalos_idempotency_keys",
+                "gauge",
+                "Completed responses held for idempotent replay",
+                [({}, idempotency["entries"])],
+            ),
+            (
+                "kalos_idempotency_replays_total",
+                "counter",
+                "Repeated requests answered from a stored response",
+                [({}, idempotency["replays"])],
+            ),
+            (
+                "kalos_idempotency_joined_total",
+                "counter",
+                "Duplicate requests that waited on an in-flight delivery",
+                [({}, idempotency["joined"])],
+            ),
+            (
+                "kalos_channel_alerts_sent_total",
+                "counter",
+                "Channel-not-found alerts and summaries posted to the internal channel",
+                [({}, self.slack_service.alerts.sent)],
+            ),
+            (
+                "kalos_channel_alerts_suppressed_total",
+                "counter",
+                "Repeated channel-not-found alerts folded into summaries",
+                [({}, self.slack_service.alerts.suppressed)],
+            ),
+            (
+                "kalos_circuit_state",
+                "gauge",
+                "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+                [
+                    ({"dependency": name}, stats["state"])
+                    for name, stats in breakers.items()
+                ],
+            ),
+            (
+                "kalos_circuit_trips_total",
+                "counter",
+                "Times a circuit breaker opened",
+                [
+                    ({"dependency": name}, stats["trips"])
+                    for name, stats in breakers.items()
+                ],
+            ),
+            (
+                "kalos_circuit_rejected_total",
+                "counter",
+                "Calls skipped because a circuit breaker was open",
+                [
+                    ({"dependency": name}, stats["rejected"])
+                    for name, stats in breakers.items()
+                ],
+            ),
+        ]
+
+    async def close(self, timeout: Optional[float] = None):
+        """
+        Stop background workers and release connections held by the services.
+
+        With a timeout, outbox workers get that long to finish their current
+        jobs and buffered digests and alerts are flushed only while time
+        remains; cut-off outbox jobs are resumed on next start. Without one,
+        all of them are waited for.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - loop.time())
+
+        metrics.registry.clear_collectors()
+        await self.outbox.stop(timeout=remaining())
+        try:
+            async with asyncio.timeout(remaining()):
+                await self.dispatcher.close()
+        except TimeoutError:
+            logger.warning(
+                "Shutdown deadline passed before coalesced digests were sent"
+            )
+        try:
+            async with asyncio.timeout(remaining()):
+                await self.slack_service.alerts.close()
+        except TimeoutError:
+            logger.warning("Shutdown deadline passed before channel alerts were sent")
+        await self.slack_service.close()
+        self.message_formatter.close()
+        self.idempotency.close()
+        await self.state.close()
+
+
+async def get_services(request: Request) -> ServiceContainer:
+    """
+    Return the service container created by the application lifespan, waiting
+    for a lazy startup to finish if it is still running
+    """
+    services = request.app.state.services
+    if services is None:
+        services = await asyncio.shield(request.app.state.startup)
+    return services
+
+
+async def get_slack_service(request: Request) -> SlackService:
+    return (await get_services(request)).slack_service
+
+
+async def get_message_formatter(request: Request) -> MessageFormatter:
+    return (await get_services(request)).message_formatter
+
+
+async def get_dispatcher(request: Request) -> NotificationDispatcher:
+    return (await get_services(request)).dispatcher
+
+
+async def get_outbox(request: Request) -> Outbox:
+    return (await get_services(request)).outbox
+
+
+async def get_idempotency_store(request: Request) -> IdempotencyStore:
+    return (await get_services(request)).idempotency
+
+
+async def get_shutdown(request: Request) -> ShutdownCoordinator:
+    return request.app.state.shutdown
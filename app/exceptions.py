@@ -28,7 +28,51 @@ class LLMError(NotificationServiceError):
     pass
 
 
-class CustomerNotFoundError(NotificationServiceError):
+class CustomerNotFoundError(SlackIntegrationError):
     """Raised when customer channel cannot be found"""
 
     pass
+
+
+class SlackRateLimitError(SlackIntegrationError):
+    """Raised when Slack keeps rate limiting a call after all retries"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SlackUnavailableError(SlackIntegrationError):
+    """Raised without calling Slack while its circuit breaker is open"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ServiceOverloadedError(NotificationServiceError):
+    """Raised when admission control sheds a notification under load"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class DeliveryDeferredError(NotificationServiceError):
+    """Raised when shutdown cut a delivery off and moved it to the outbox"""
+
+    def __init__(self, job_id: str):
+        super().__init__(f"Delivery deferred to outbox job {job_id} at shutdown")
+        self.job_id = job_id
+
+
+class StateBackendError(NotificationServiceError):
+    """Raised when the shared state backend cannot be reached or fails a command"""
+
+    pass
+
+
+class IdempotencyConflictError(ValidationError):
+    """Raised when an idempotency key is reused for a different notification"""
+
+    pass
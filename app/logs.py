@@ -0,0 +1,163 @@
+"""
+Structured logging handled off the event loop.
+
+Log calls on the event loop only build a LogRecord and put it on a queue; a
+QueueListener thread formats and writes it. Messages use %-style arguments so
+the text, and the JSON line around it, are only built for records that are
+actually written; arguments must not be mutated after the call. Success logs
+can be sampled per logger at high volume while warnings and errors are always
+kept.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Dict, Optional
+
+# Attributes every LogRecord has; anything else was passed with `extra=`
+RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the message, level, logger and any extras"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of records below WARNING per logger.
+
+    Rates are matched by the longest logger name prefix, so
+    `app.services=0.1` also covers `app.services.slack_client`.
+    """
+
+    def __init__(self, default_rate: float = 1.0, rates: Dict[str, float] = None):
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.sampled_out = 0
+        self._resolved: Dict[str, float] = {}
+
+    def rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = self.default_rate
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records as they are, leaving formatting to the listener thread.
+
+    The stock QueueHandler formats each record before queueing it so it can be
+    pickled; the queue here never leaves the process, so that work moves off
+    the event loop.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parse `logger=rate,logger=rate` as used by LOG_SAMPLE_RATES"""
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+def configure_logging(
+    level: Optional[str] = None,
+    json_format: Optional[bool] = None,
+    stream=None,
+) -> logging.handlers.QueueListener:
+    """
+    Route the root logger through a queue to a background writer thread.
+
+    Configuration: LOG_LEVEL (default INFO), LOG_FORMAT `json` or `text`
+    (default json), LOG_SAMPLE_RATE for records below WARNING (default 1.0) and
+    LOG_SAMPLE_RATES overrides per logger, e.g. `app.routers=0.01`. Calling it
+    again replaces the previous pipeline.
+    """
+    global _listener
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "json").lower() == "json"
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(
+        JSONFormatter()
+        if json_format
+        else logging.Formatter("%(levelname)s:%(name)s:%(message)s")
+    )
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(
+        SamplingFilter(
+            float(os.getenv("LOG_SAMPLE_RATE", "1.0")),
+            parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "")),
+        )
+    )
+
+    root = logging.getLogger()
+    shutdown_logging()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Write out queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -1,18 +1,94 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import notifications
+from app.routers import debug, metrics, notifications
+from app.dependencies import ServiceContainer, preload_dependencies
+from app.logs import configure_logging
+from app.shutdown import ShutdownCoordinator, ShutdownMiddleware
+from app.tracing import TracingMiddleware, tracer
+import asyncio
 import logging
+import os
+import time
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Structured logging written from a background thread
+configure_logging()
 logger = logging.getLogger(__name__)
 
+
+async def start_services(app: FastAPI) -> ServiceContainer:
+    """Build and warm the shared services, then publish them on app.state"""
+    startup_budget = float(os.getenv("STARTUP_BUDGET_SECONDS", "5"))
+    started = time.perf_counter()
+
+    # Heavy SDK imports run in a thread so the event loop keeps serving /health
+    await asyncio.to_thread(preload_dependencies)
+    services = ServiceContainer()
+    try:
+        await asyncio.wait_for(services.warm_up(), timeout=startup_budget)
+    except asyncio.TimeoutError:
+        logger.warning("Service warm-up exceeded %ss, continuing", startup_budget)
+
+    await services.start()
+
+    services.startup_seconds = time.perf_counter() - started
+    app.state.services = services
+    if services.startup_seconds > startup_budget:
+        logger.warning(
+            "Startup took %.3fs, budget is %ss",
+            services.startup_seconds,
+            startup_budget,
+        )
+    else:
+        logger.info("Startup completed in %.3fs", services.startup_seconds)
+    return services
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build shared services once at startup and drain and close them on shutdown.
+
+    With LAZY_STARTUP=true the app starts serving immediately and services are
+    built in the background; requests that need them wait for startup to finish.
+
+    Shutdown starts when the server receives SIGTERM/SIGINT, or at the latest
+    when the lifespan ends: new notifications get 503 and `/ready` reports
+    not-ready. In-flight deliveries, outbox workers and buffered digests then
+    share SHUTDOWN_DEADLINE; whatever has not finished is left in the outbox.
+    """
+    shutdown = ShutdownCoordinator()
+    app.state.shutdown = shutdown
+    app.state.services = None
+    startup = asyncio.create_task(start_services(app))
+    app.state.startup = startup
+    shutdown.install_signal_handlers()
+    if os.getenv("LAZY_STARTUP", "false").lower() != "true":
+        await startup
+
+    yield
+
+    await shutdown.drain()
+    shutdown.restore_signal_handlers()
+    if not startup.done():
+        startup.cancel()
+    await asyncio.gather(startup, return_exceptions=True)
+    if app.state.services is not None:
+        await app.state.services.close(timeout=shutdown.remaining())
+    tracer.close()
+
+
 app = FastAPI(
     title="Kalos Notification Service",
     description="Slack notification service for Kalos platform",
     version="0.0.1",
+    lifespan=lifespan,
 )
 
+# Turn away new notifications while draining for shutdown
+app.add_middleware(ShutdownMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -20,10 +96,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
+app.add_middleware(TracingMiddleware)
 
 # Include routers
 app.include_router(notifications.router)
+app.include_router(metrics.router)
+# Traces carry customer names and request details, so the debug endpoints
+# are only served when explicitly enabled
+if os.getenv("TRACE_DEBUG_ENDPOINT", "false").lower() == "true":
+    app.include_router(debug.router)
 
 
 @app.get("/")
@@ -37,4 +120,24 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    services = getattr(app.state, "services", None)
+    shutdown = getattr(app.state, "shutdown", None)
+    return {
+        "status": "healthy",
+        "ready": services is not None,
+        "draining": shutdown is not None and shutdown.draining,
+        "startup_seconds": services.startup_seconds if services else None,
+    }
+
+
+@app.get("/ready")
+def readiness_check():
+    """Readiness probe: 503 until services are built and once shutdown begins"""
+    services = getattr(app.state, "services", None)
+    shutdown = getattr(app.state, "shutdown", None)
+    draining = shutdown is not None and shutdown.draining
+    ready = services is not None and not draining
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "draining": draining},
+    )
@@ -0,0 +1,221 @@
+"""
+In-process metrics aggregation rendered in the Prometheus text format.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# (name, type, help, [(labels, value), ...])
+Sample = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], labels: Sequence[str]) -> str:
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter keyed by positional label values."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    type = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+
+class Histogram:
+    """Fixed-bucket histogram; observations cost one bisect and three additions."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            self._series[labels] = series
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def render(self) -> List[str]:
+        lines = []
+        labelnames = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(
+                    labelnames, labels + (_format_value(float(bound)),)
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            series_labels = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{series_labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{series_labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and collectors that report service state at scrape time."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        self._collectors.append(collector)
+
+    def clear_collectors(self):
+        self._collectors = []
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for name, metric_type, help, samples in collector():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    label_text = _format_labels(list(labels), list(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+
+registry = MetricsRegistry()
+
+notifications_total = registry.counter(
+    "kalos_notifications_total",
+    "Notifications processed by type and outcome",
+    ("type", "outcome"),
+)
+notify_duration = registry.histogram(
+    "kalos_notify_duration_seconds",
+    "End-to-end notification delivery time",
+    ("type",),
+)
+format_duration = registry.histogram(
+    "kalos_format_duration_seconds",
+    "Time spent formatting a notification, including waiting for an LLM slot",
+    ("type",),
+)
+post_duration = registry.histogram(
+    "kalos_slack_post_duration_seconds",
+    "Time spent posting to Slack, including waiting for a Slack slot",
+)
+queue_wait = registry.histogram(
+    "kalos_queue_wait_seconds",
+    "Time spent waiting for an LLM or Slack slot by stage and priority lane",
+    ("stage", "lane"),
+)
+notify_in_flight = registry.gauge(
+    "kalos_notify_in_flight", "Notifications currently being delivered"
+)
+format_in_flight = registry.gauge(
+    "kalos_format_in_flight", "Notifications currently being formatted"
+)
+post_in_flight = registry.gauge(
+    "kalos_slack_post_in_flight", "Slack posts currently in progress"
+)
+prompt_tokens = registry.histogram(
+    "kalos_prompt_tokens",
+    "Estimated tokens in the notification sent to the LLM, excluding instructions",
+    ("type",),
+    buckets=(25, 50, 100, 200, 400, 800, 1600, 3200),
+)
+prompt_truncated = registry.counter(
+    "kalos_prompt_truncated_total",
+    "LLM prompts shortened to fit FORMAT_PROMPT_MAX_TOKENS",
+    ("type",),
+)
+llm_tokens = registry.counter(
+    "kalos_llm_tokens_total",
+    "Tokens reported by the LLM provider: input, cached input and output",
+    ("kind",),
+)
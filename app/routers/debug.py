@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Any, Dict, Optional
+from app import tracing
+
+router = APIRouter(prefix="/debug")
+
+
+# Handlers are async so they read the trace buffer on the event loop that
+# appends to it; from a threadpool worker the deque could change mid-iteration
+
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(50, ge=1, le=1000),
+    min_duration_ms: float = Query(0.0, ge=0),
+    status: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    List recently completed traces, newest first.
+
+    Args:
+        limit: Maximum number of traces to return
+        min_duration_ms: Only traces at least this slow
+        status: Only traces whose root span has this status (ok, error)
+
+    Returns:
+        The sample rate, the number of traces sampled since startup, and the
+        matching span trees
+    """
+    tracer = tracing.tracer
+    return {
+        "sample_rate": tracer.sample_rate,
+        "sampled": tracer.sampled,
+        "traces": tracer.recent(limit, min_duration_ms, status),
+    }
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str) -> Dict[str, Any]:
+    """
+    Get one trace's span tree.
+
+    Raises:
+        HTTPException: If the trace was not sampled or has left the buffer (404)
+    """
+    trace = tracing.tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Trace '{trace_id}' not found")
+    return trace
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app import metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Expose service metrics in the Prometheus text format.
+
+    Rendered on the event loop, which updates the metrics: a worker thread
+    could see their dicts change size mid-iteration.
+
+    Returns:
+        Latency histograms, notification counters, in-flight gauges, and
+        cache, queue and rate limiter statistics
+    """
+    return PlainTextResponse(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4"
+    )
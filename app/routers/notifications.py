@@ -1,72 +1,445 @@
-from fastapi import APIRouter, HTTPException
-from app.types import NotificationRequest, NotificationResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError as PydanticValidationError
+from starlette.requests import ClientDisconnect
+from typing import Annotated, AsyncIterator, List, Optional, Set
+from app.types import NotificationJob, NotificationRequest, NotificationResponse
 from app.exceptions import (
+    DeliveryDeferredError,
     ValidationError,
     NotificationServiceError,
+    ServiceOverloadedError,
     SlackIntegrationError,
+    SlackRateLimitError,
+    SlackUnavailableError,
 )
-from app.services.slack_client import SlackService
-from app.services.message_formatter import MessageFormatter
+from app import tracing
+from app.services.dispatcher import NotificationDispatcher
+from app.services.idempotency import IdempotencyStore
+from app.services.outbox import Outbox
+from app.shutdown import ShutdownCoordinator
+from app.dependencies import (
+    get_dispatcher,
+    get_idempotency_store,
+    get_outbox,
+    get_shutdown,
+)
+import asyncio
 import logging
+import math
 import os
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+MAX_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_MAX_SIZE", "100"))
+STREAM_CONCURRENCY = int(os.getenv("NOTIFY_STREAM_CONCURRENCY", "32"))
+MAX_STREAM_LINE_BYTES = int(os.getenv("NOTIFY_STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+
 
-@router.post("/notify", response_model=NotificationResponse)
-async def send_notification(request: NotificationRequest) -> NotificationResponse:
+@router.post(
+    "/notify",
+    response_model=NotificationResponse,
+    responses={202: {"model": NotificationResponse}},
+)
+async def send_notification(
+    request: NotificationRequest,
+    async_delivery: Annotated[bool, Query(alias="async")] = False,
+    idempotency_key: Annotated[Optional[str], Header(alias="Idempotency-Key")] = None,
+    dispatcher: NotificationDispatcher = Depends(get_dispatcher),
+    outbox: Outbox = Depends(get_outbox),
+    idempotency: IdempotencyStore = Depends(get_idempotency_store),
+    shutdown: ShutdownCoordinator = Depends(get_shutdown),
+) -> NotificationResponse:
     """
     Send a notification to a customer's Slack channel.
 
     Args:
         request: The notification request containing type, customer, and data
+        async_delivery: Queue the notification in the outbox and return immediately
+        idempotency_key: Client key identifying retries of the same notification
+        dispatcher: Application-scoped delivery pipeline
+        outbox: Application-scoped durable outbox
+        idempotency: Application-scoped store of responses by idempotency key
+        shutdown: Coordinator that moves deliveries cut off by shutdown to the outbox
 
     Returns:
-        NotificationResponse with success status and optional message_id
+        NotificationResponse with success status and optional message_id, or a
+        202 response with the outbox job_id when async_delivery is set or the
+        delivery was cut off by shutdown, tagged with the request's trace_id.
+        Repeats of an idempotency key receive the original response.
 
     Raises:
-        HTTPException: For validation errors (400) or service errors (500)
+        HTTPException: For validation errors and reused idempotency keys (400),
+            when the service is overloaded (429), service errors (500), or while
+            Slack's circuit breaker is open (503)
     """
     try:
         logger.info(
-            f"Received notification request for customer {request.customer}, type {request.type}"
+            "Received notification request for customer %s, type %s",
+            request.customer,
+            request.type.value,
+            extra={
+                "customer": request.customer,
+                "notification_type": request.type.value,
+            },
         )
 
-        # Initialize services
-        slack_service = SlackService()
+        trace_id = tracing.current_trace_id()
+        tracing.annotate(customer=request.customer, type=request.type.value)
 
-        # Initialize message formatter (uses openai-agents which handles API key automatically)
-        message_formatter = MessageFormatter()
+        async def deliver() -> NotificationResponse:
+            if async_delivery:
+                with tracing.span("outbox.enqueue"):
+                    job_id = await outbox.enqueue(request)
+                return NotificationResponse(
+                    status=202, success=True, job_id=job_id, trace_id=trace_id
+                )
 
-        # Format message using LLM
-        formatted_message = await message_formatter.format_message(
-            notification_type=request.type,
-            customer=request.customer,
-            data=request.data,
-            campaign=request.campaign,
-            links=request.links,
-        )
+            # Format message using LLM and post it to Slack
+            try:
+                message_id = await shutdown.run(
+                    request, lambda: dispatcher.deliver(request), outbox
+                )
+            except DeliveryDeferredError as e:
+                return NotificationResponse(
+                    status=202, success=True, job_id=e.job_id, trace_id=trace_id
+                )
+            return NotificationResponse(
+                status=200, success=True, message_id=message_id, trace_id=trace_id
+            )
 
-        # Post message to Slack
-        message_id = await slack_service.post_message(
-            request.customer, formatted_message
-        )
+        key = idempotency.key_for(idempotency_key, request)
+        if key is None:
+            response = await deliver()
+        else:
+            response = await idempotency.run(key, request, deliver)
 
-        return NotificationResponse(status=200, success=True, message_id=message_id)
+        if response.status == 202:
+            return JSONResponse(status_code=202, content=response.model_dump())
+        return response
 
     except ValidationError as e:
-        logger.warning(f"Validation error: {str(e)}")
+        logger.warning("Validation error: %s", e, extra={"customer": request.customer})
         raise HTTPException(status_code=400, detail=str(e))
 
+    except ServiceOverloadedError as e:
+        logger.warning("Notification shed: %s", e, extra={"customer": request.customer})
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+
+    except SlackUnavailableError as e:
+        logger.warning("Slack unavailable: %s", e, extra={"customer": request.customer})
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+
+    except SlackRateLimitError as e:
+        logger.warning(
+            "Slack rate limited: %s", e, extra={"customer": request.customer}
+        )
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+
     except SlackIntegrationError as e:
-        logger.error(f"Slack integration error: {str(e)}")
+        logger.error(
+            "Slack integration error: %s", e, extra={"customer": request.customer}
+        )
         raise HTTPException(status_code=500, detail=str(e))
 
     except NotificationServiceError as e:
-        logger.error(f"Service error: {str(e)}")
+        logger.error("Service error: %s", e, extra={"customer": request.customer})
         raise HTTPException(status_code=500, detail=str(e))
 
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e, extra={"customer": request.customer})
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/notify/{job_id}", response_model=NotificationJob)
+async def get_notification_job(
+    job_id: str, outbox: Outbox = Depends(get_outbox)
+) -> NotificationJob:
+    """
+    Get the delivery status of an asynchronously queued notification.
+
+    Raises:
+        HTTPException: If the job does not exist (404)
+    """
+    job = await outbox.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+
+@router.post("/notify/batch", response_model=List[NotificationResponse])
+async def send_notification_batch(
+    requests: List[NotificationRequest],
+    dispatcher: NotificationDispatcher = Depends(get_dispatcher),
+    outbox: Outbox = Depends(get_outbox),
+    shutdown: ShutdownCoordinator = Depends(get_shutdown),
+) -> List[NotificationResponse]:
+    """
+    Send several notifications concurrently.
+
+    Args:
+        requests: Notification requests to deliver
+        dispatcher: Application-scoped delivery pipeline
+        outbox: Application-scoped durable outbox
+        shutdown: Coordinator that moves deliveries cut off by shutdown to the outbox
+
+    Returns:
+        One NotificationResponse per request, in request order. A failed item
+        does not fail the batch; its response carries the error instead. Items
+        cut off by shutdown get a 202 response with their outbox job_id.
+
+    Raises:
+        HTTPException: If the batch exceeds the maximum size (400)
+    """
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size {len(requests)} exceeds maximum of {MAX_BATCH_SIZE}",
+        )
+
+    logger.info("Received batch of %d notifications", len(requests))
+
+    responses = await asyncio.gather(
+        *(
+            _deliver_batch_item(dispatcher, request, shutdown, outbox)
+            for request in requests
+        )
+    )
+    trace_id = tracing.current_trace_id()
+    for response in responses:
+        response.trace_id = trace_id
+    return responses
+
+
+async def _deliver_batch_item(
+    dispatcher: NotificationDispatcher,
+    request: NotificationRequest,
+    shutdown: Optional[ShutdownCoordinator] = None,
+    outbox: Optional[Outbox] = None,
+) -> NotificationResponse:
+    """Deliver one batch item, converting failures into an error response"""
+    try:
+        if shutdown is None:
+            message_id = await dispatcher.deliver(request)
+        else:
+            message_id = await shutdown.run(
+                request, lambda: dispatcher.deliver(request), outbox
+            )
+        return NotificationResponse(status=200, success=True, message_id=message_id)
+
+    except DeliveryDeferredError as e:
+        return NotificationResponse(status=202, success=True, job_id=e.job_id)
+
+    except ValidationError as e:
+        logger.warning(
+            "Validation error for %s: %s",
+            request.customer,
+            e,
+            extra={"customer": request.customer},
+        )
+        return NotificationResponse(status=400, success=False, error=str(e))
+
+    except ServiceOverloadedError as e:
+        logger.warning(
+            "Notification shed for %s: %s",
+            request.customer,
+            e,
+            extra={"customer": request.customer},
+        )
+        return NotificationResponse(status=429, success=False, error=str(e))
+
+    except SlackRateLimitError as e:
+        logger.warning(
+            "Slack rate limited %s: %s",
+            request.customer,
+            e,
+            extra={"customer": request.customer},
+        )
+        return NotificationResponse(status=429, success=False, error=str(e))
+
+    except SlackUnavailableError as e:
+        logger.warning(
+            "Slack unavailable for %s: %s",
+            request.customer,
+            e,
+            extra={"customer": request.customer},
+        )
+        return NotificationResponse(status=503, success=False, error=str(e))
+
+    except NotificationServiceError as e:
+        logger.error(
+            "Service error for %s: %s",
+            request.customer,
+            e,
+            extra={"customer": request.customer},
+        )
+        return NotificationResponse(status=500, success=False, error=str(e))
+
+    except Exception as e:
+        logger.error(
+            "Unexpected error for %s: %s",
+            request.customer,
+            e,
+            extra={"customer": request.customer},
+        )
+        return NotificationResponse(
+            status=500, success=False, error="Internal server error"
+        )
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streams while the request body is still being read.
+
+    StreamingResponse normally listens for client disconnects by reading from
+    the ASGI receive channel, which would consume request body chunks meant for
+    the endpoint; here the body reader notices disconnects instead.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+@router.post("/notify/stream", response_class=NDJSONStreamingResponse)
+async def send_notification_stream(
+    http_request: Request,
+    dispatcher: NotificationDispatcher = Depends(get_dispatcher),
+    outbox: Outbox = Depends(get_outbox),
+    shutdown: ShutdownCoordinator = Depends(get_shutdown),
+) -> NDJSONStreamingResponse:
+    """
+    Deliver an NDJSON stream of notifications, streaming results back.
+
+    Records are delivered as they arrive, at most STREAM_CONCURRENCY at a time.
+    Once that many are in flight or waiting to be written back, the body is not
+    read further, so a fast upload is held back by TCP flow control rather than
+    buffered in memory. Once shutdown begins no further records are read;
+    records in flight finish or are moved to the outbox.
+
+    Returns:
+        NDJSON NotificationResponse lines in completion order, each carrying the
+        zero-based `index` of its record among the non-empty input lines
+    """
+    logger.info("Receiving notification stream")
+    return NDJSONStreamingResponse(
+        _stream_deliveries(http_request.stream(), dispatcher, shutdown, outbox)
+    )
+
+
+async def _stream_deliveries(
+    chunks: AsyncIterator[bytes],
+    dispatcher: NotificationDispatcher,
+    shutdown: Optional[ShutdownCoordinator] = None,
+    outbox: Optional[Outbox] = None,
+) -> AsyncIterator[bytes]:
+    # A slot is held from reading a record until its result has been written
+    slots = asyncio.Semaphore(STREAM_CONCURRENCY)
+    results: "asyncio.Queue[Optional[NotificationResponse]]" = asyncio.Queue()
+    tasks: Set[asyncio.Task] = set()
+
+    async def deliver(index: int, line: bytes):
+        response = await _deliver_stream_record(dispatcher, line, shutdown, outbox)
+        response.index = index
+        await results.put(response)
+
+    async def read():
+        index = 0
+        try:
+            async for line in _iter_lines(chunks):
+                if not line.strip():
+                    continue
+                await slots.acquire()
+                if shutdown is not None and shutdown.draining:
+                    await results.put(
+                        NotificationResponse(
+                            status=503,
+                            success=False,
+                            error="Service is shutting down",
+                            index=index,
+                        )
+                    )
+                    logger.warning(
+                        "Notification stream stopped at record %d by shutdown", index
+                    )
+                    break
+                task = asyncio.create_task(deliver(index, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                index += 1
+        except ValueError as e:
+            await slots.acquire()
+            await results.put(
+                NotificationResponse(
+                    status=413, success=False, error=str(e), index=index
+                )
+            )
+        except ClientDisconnect:
+            logger.warning("Notification stream disconnected after %d records", index)
+        await asyncio.gather(*tasks)
+        logger.info("Notification stream of %d records completed", index)
+        await results.put(None)
+
+    reader = asyncio.create_task(read())
+    try:
+        while (response := await results.get()) is not None:
+            yield (response.model_dump_json() + "\n").encode("utf-8")
+            slots.release()
+    finally:
+        reader.cancel()
+        for task in list(tasks):
+            task.cancel()
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a chunked body into lines without holding more than one line"""
+    partial = b""
+    async for chunk in chunks:
+        *lines, rest = chunk.split(b"\n")
+        if lines:
+            yield partial + lines[0]
+            for line in lines[1:]:
+                yield line
+            partial = rest
+        else:
+            partial += rest
+        if len(partial) > MAX_STREAM_LINE_BYTES:
+            raise ValueError(
+                f"Record exceeds maximum line size of {MAX_STREAM_LINE_BYTES} bytes"
+            )
+    if partial:
+        yield partial
+
+
+async def _deliver_stream_record(
+    dispatcher: NotificationDispatcher,
+    line: bytes,
+    shutdown: Optional[ShutdownCoordinator] = None,
+    outbox: Optional[Outbox] = None,
+) -> NotificationResponse:
+    """Parse and deliver one NDJSON record, converting failures into a response"""
+    try:
+        request = NotificationRequest.model_validate_json(line)
+    except PydanticValidationError as e:
+        details = "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'record'}: {error['msg']}"
+            for error in e.errors(include_url=False)
+        )
+        return NotificationResponse(
+            status=400, success=False, error=f"Invalid notification: {details}"
+        )
+    return await _deliver_batch_item(dispatcher, request, shutdown, outbox)
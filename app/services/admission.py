@@ -0,0 +1,201 @@
+"""
+Admission control for notification deliveries.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+from .. import tracing
+from ..exceptions import ServiceOverloadedError
+
+logger = logging.getLogger(__name__)
+
+# Smoothing factor for the latency moving average
+LATENCY_ALPHA = 0.1
+# Multiplicative decrease applied when latency is above target
+BACKOFF = 0.9
+
+
+class AdmissionController:
+    """
+    Bounds the deliveries in progress and sheds the excess early.
+
+    Up to `limit` deliveries run at once; further arrivals wait in a FIFO queue
+    of at most `max_queued` for up to `queue_timeout` seconds. Arrivals beyond
+    that, or beyond `max_per_customer` for one customer, are rejected with
+    `ServiceOverloadedError` so callers retry later instead of piling up memory
+    and LLM calls.
+
+    With a `latency_target`, the limit adapts to observed format + post latency:
+    it shrinks by 10% (at most once per `adjust_interval`) while the moving
+    average is above target and grows by about one per limit's worth of fast
+    deliveries, between `min_in_flight` and `max_in_flight`.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        max_per_customer: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        latency_target: Optional[float] = None,
+        min_in_flight: Optional[int] = None,
+        adjust_interval: Optional[float] = None,
+    ):
+        self.max_in_flight = max_in_flight or int(
+            os.getenv("ADMISSION_MAX_IN_FLIGHT", "512")
+        )
+        self.max_queued = (
+            max_queued
+            if max_queued is not None
+            else int(os.getenv("ADMISSION_MAX_QUEUED", "1024"))
+        )
+        self.max_per_customer = (
+            max_per_customer
+            if max_per_customer is not None
+            else int(os.getenv("ADMISSION_MAX_PER_CUSTOMER", "128"))
+        )
+        self.queue_timeout = queue_timeout or float(
+            os.getenv("ADMISSION_QUEUE_TIMEOUT", "5")
+        )
+        self.latency_target = (
+            latency_target
+            if latency_target is not None
+            else float(os.getenv("ADMISSION_LATENCY_TARGET", "0"))
+        )
+        self.min_in_flight = min(
+            self.max_in_flight,
+            min_in_flight or int(os.getenv("ADMISSION_MIN_IN_FLIGHT", "16")),
+        )
+        self.adjust_interval = (
+            adjust_interval
+            if adjust_interval is not None
+            else float(os.getenv("ADMISSION_ADJUST_INTERVAL", "1"))
+        )
+
+        self.limit = float(self.max_in_flight)
+        self.latency = 0.0
+        self.in_flight = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "customer": 0, "timeout": 0}
+        self._customers: Dict[str, int] = {}
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._adjusted_at = 0.0
+
+    @property
+    def adaptive(self) -> bool:
+        return self.latency_target > 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> float:
+        """Rough seconds until a rejected caller would be admitted"""
+        if not self.latency:
+            return 1.0
+        return max(1.0, self.latency * (self.queued + 1) / max(1.0, self.limit))
+
+    @asynccontextmanager
+    async def admit(self, customer: str) -> AsyncIterator[None]:
+        """
+        Hold an admission slot for one delivery.
+
+        Raises:
+            ServiceOverloadedError: If the queue or the customer's cap is full,
+                or no slot frees up within `queue_timeout`
+        """
+        count = self._customers.get(customer, 0)
+        if self.max_per_customer and count >= self.max_per_customer:
+            self._reject("customer", f"Too many notifications in flight for {customer}")
+
+        self._customers[customer] = count + 1
+        try:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+            elif self.queued >= self.max_queued:
+                self._reject("queue_full", "Notification queue is full")
+            else:
+                with tracing.span("admission.queue"):
+                    await self._wait()
+            try:
+                yield
+            finally:
+                self._release()
+        finally:
+            self._leave(customer)
+
+    def observe(self, seconds: float):
+        """Feed the latency of one format + post to the adaptive limit"""
+        if not self.latency:
+            self.latency = seconds
+        else:
+            self.latency += LATENCY_ALPHA * (seconds - self.latency)
+        if not self.adaptive:
+            return
+
+        now = time.monotonic()
+        if self.latency > self.latency_target:
+            if now - self._adjusted_at >= self.adjust_interval:
+                self._adjusted_at = now
+                self.limit = max(self.min_in_flight, self.limit * BACKOFF)
+                logger.info(
+                    "Admission limit lowered to %d (latency %.2fs)",
+                    int(self.limit),
+                    self.latency,
+                )
+        elif self.in_flight >= int(self.limit) - 1:
+            # Only grow while the limit is actually the bottleneck
+            self.limit = min(self.max_in_flight, self.limit + 1 / self.limit)
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "limit": int(self.limit),
+            "latency": self.latency,
+            "rejected": dict(self.rejected),
+        }
+
+    async def _wait(self):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._waiters.remove(future)
+                self._reject("timeout", "Timed out waiting for delivery capacity")
+            # Granted in the same tick as the timeout; keep the slot
+        except BaseException:
+            if future.done():
+                # The slot was handed over just as we were cancelled; pass it on
+                self._release()
+            else:
+                self._waiters.remove(future)
+                future.cancel()
+            raise
+
+    def _release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.popleft().set_result(None)
+
+    def _leave(self, customer: str):
+        count = self._customers.get(customer, 0) - 1
+        if count > 0:
+            self._customers[customer] = count
+        else:
+            self._customers.pop(customer, None)
+
+    def _reject(self, reason: str, message: str):
+        self.rejected[reason] += 1
+        raise ServiceOverloadedError(message, self.retry_after())
@@ -0,0 +1,115 @@
+"""
+Deduplicated internal alerts for notifications to missing customer channels.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_SUMMARY_LINES = 20
+
+
+def channel_not_found_message(customer: str, channel_name: str) -> str:
+    return (
+        f"Channel Not Found Error\n"
+        f"Failed to post notification for customer: `{customer}`\n"
+        f"Attempted channel: `{channel_name}`\n"
+        f"Please verify the channel exists and the bot has access."
+    )
+
+
+def summary_message(counts: Dict[str, Tuple[str, int]], interval: float) -> str:
+    ranked = sorted(counts.items(), key=lambda item: item[1][1], reverse=True)
+    lines = [
+        "Channel Not Found Summary",
+        f"Repeated failures in the last {interval:g}s:",
+    ]
+    for customer, (channel_name, count) in ranked[:MAX_SUMMARY_LINES]:
+        noun = "notification" if count == 1 else "notifications"
+        lines.append(f"• `{customer}` (`{channel_name}`): {count} failed {noun}")
+    if len(ranked) > MAX_SUMMARY_LINES:
+        lines.append(f"…and {len(ranked) - MAX_SUMMARY_LINES} more customers")
+    return "\n".join(lines)
+
+
+class AlertAggregator:
+    """
+    Posts one channel-not-found alert per customer per window and folds the
+    repeats into a periodic summary with counts.
+
+    Alerts are posted from background tasks, so reporting never blocks the
+    request that hit the missing channel.
+    """
+
+    def __init__(
+        self,
+        post: Callable[[str], Awaitable[None]],
+        window: Optional[float] = None,
+        summary_interval: Optional[float] = None,
+        max_customers: int = 10000,
+    ):
+        self.post = post
+        self.window = window or float(os.getenv("ALERT_DEDUPE_WINDOW", "300"))
+        self.summary_interval = summary_interval or float(
+            os.getenv("ALERT_SUMMARY_INTERVAL", "60")
+        )
+        self.max_customers = max_customers
+        self.sent = 0
+        self.suppressed = 0
+        self._last_alert: Dict[str, float] = {}
+        self._pending: Dict[str, Tuple[str, int]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def report(self, customer: str, channel_name: str):
+        """Record a failed notification for a customer whose channel is missing"""
+        now = time.monotonic()
+        last = self._last_alert.get(customer)
+        if last is None or now - last >= self.window:
+            self._remember(customer, now)
+            self.sent += 1
+            self._spawn(self.post(channel_not_found_message(customer, channel_name)))
+            return
+
+        _, count = self._pending.get(customer, (channel_name, 0))
+        self._pending[customer] = (channel_name, count + 1)
+        self.suppressed += 1
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.summary_interval, self._flush
+            )
+
+    async def close(self):
+        """Post the pending summary and wait for in-flight alerts"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self):
+        self._timer = None
+        counts, self._pending = self._pending, {}
+        if counts:
+            self.sent += 1
+            self._spawn(self.post(summary_message(counts, self.summary_interval)))
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _remember(self, customer: str, now: float):
+        if len(self._last_alert) >= self.max_customers:
+            self._last_alert = {
+                key: alerted_at
+                for key, alerted_at in self._last_alert.items()
+                if now - alerted_at < self.window
+            }
+            if len(self._last_alert) >= self.max_customers:
+                self._last_alert.pop(next(iter(self._last_alert)))
+        self._last_alert[customer] = now
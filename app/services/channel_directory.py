@@ -0,0 +1,234 @@
+"""
+Channel name to ID directory backed by Slack's conversations.list.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+from slack_sdk.errors import SlackApiError
+from ..exceptions import StateBackendError
+from .state import StateBackend
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelDirectory:
+    """
+    Caches Slack channel IDs by name, including names known to be missing.
+
+    With a shared state backend the loaded index is published for the other
+    workers, which adopt it instead of paging through conversations.list
+    themselves; a lease lets one worker at a time reload it from Slack.
+    """
+
+    def __init__(
+        self,
+        client,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        refresh_interval: Optional[float] = None,
+        max_missing: int = 10000,
+        state: Optional[StateBackend] = None,
+    ):
+        self.client = client
+        self.ttl = ttl or float(os.getenv("CHANNEL_DIRECTORY_TTL", "300"))
+        self.negative_ttl = negative_ttl or float(
+            os.getenv("CHANNEL_NEGATIVE_TTL", "60")
+        )
+        self.refresh_interval = refresh_interval or float(
+            os.getenv("CHANNEL_REFRESH_INTERVAL", "30")
+        )
+        self.max_missing = max_missing
+        self.state = state if state is not None and state.shared else None
+        self.shared_loads = 0
+        self._index: Dict[str, str] = {}
+        # Wall-clock time the current index was read from Slack, by any worker
+        self._loaded_at = 0.0
+        self._missing: Dict[str, float] = {}
+        self._loaded = False
+        self._last_refresh: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"channels": len(self._index), "missing": len(self._missing)}
+
+    def is_missing(self, name: str) -> bool:
+        """Whether the channel is negatively cached as not existing"""
+        expires_at = self._missing.get(name)
+        if expires_at is None:
+            return False
+        if expires_at <= time.monotonic():
+            del self._missing[name]
+            return False
+        return True
+
+    async def resolve(self, name: str) -> Optional[str]:
+        """
+        Resolve a channel name to its ID.
+
+        Returns:
+            The channel ID, None if the channel does not exist, or the name itself
+            if the directory could not be loaded (Slack then resolves the name)
+        """
+        now = time.monotonic()
+
+        if not self._loaded:
+            if self._can_refresh(now):
+                await self.refresh()
+            if not self._loaded:
+                return name
+        elif now - self._last_refresh > self.ttl:
+            # Serve the current index while reloading in the background
+            self._schedule_refresh()
+
+        channel_id = self._index.get(name)
+        if channel_id:
+            return channel_id
+        if self.is_missing(name):
+            return None
+
+        # The channel may have been created since the last load
+        if self._can_refresh(now):
+            await self.refresh()
+            channel_id = self._index.get(name)
+            if channel_id:
+                return channel_id
+
+        self._mark_missing(name)
+        return None
+
+    def invalidate(self, name: str):
+        """Drop a cached ID after Slack reports the channel as not found"""
+        self._index.pop(name, None)
+        self._mark_missing(name)
+
+    async def refresh(self) -> bool:
+        """Reload the full channel index from Slack, paging through conversations.list"""
+        requested_at = time.monotonic()
+        async with self._lock:
+            # Another caller completed a refresh while we were waiting
+            if self._last_refresh is not None and self._last_refresh >= requested_at:
+                return self._loaded
+
+            if self.state is not None and await self._load_shared():
+                return True
+
+            index: Dict[str, str] = {}
+            cursor = None
+            try:
+                while True:
+                    response = await self.client.conversations_list(
+                        types="public_channel,private_channel",
+                        exclude_archived=True,
+                        limit=1000,
+                        cursor=cursor,
+                    )
+                    for channel in response["channels"]:
+                        index[channel["name"]] = channel["id"]
+                    cursor = (response.get("response_metadata") or {}).get(
+                        "next_cursor"
+                    )
+                    if not cursor:
+                        break
+            except SlackApiError as e:
+                logger.error("Failed to load Slack channels: %s", e.response["error"])
+                self._last_refresh = time.monotonic()
+                return self._loaded
+            except Exception as e:
+                logger.error("Unexpected error loading Slack channels: %s", e)
+                self._last_refresh = time.monotonic()
+                return self._loaded
+
+            self._adopt(index, time.time())
+            if self.state is not None:
+                await self._publish()
+
+            logger.info("Loaded %d Slack channels", len(index))
+            return True
+
+    async def close(self):
+        """Cancel any background refresh"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
+
+    def _adopt(self, index: Dict[str, str], loaded_at: float):
+        self._index = index
+        self._loaded = True
+        self._loaded_at = loaded_at
+        self._last_refresh = time.monotonic()
+        for name in index:
+            self._missing.pop(name, None)
+
+    async def _load_shared(self) -> bool:
+        """
+        Adopt an index another worker loaded since ours, or wait for the worker
+        holding the refresh lease. Returns False if this worker should call Slack.
+        """
+        try:
+            if await self._adopt_shared():
+                return True
+            if await self.state.add(
+                "channels:refresh", str(os.getpid()), self.refresh_interval
+            ):
+                return False
+            # Another worker is reloading the index; wait for it to be published
+            for _ in range(50):
+                await asyncio.sleep(0.1)
+                if await self._adopt_shared():
+                    return True
+        except StateBackendError:
+            return False
+        self._last_refresh = time.monotonic()
+        return self._loaded
+
+    async def _adopt_shared(self) -> bool:
+        published = await self.state.get("channels:index")
+        if published is None:
+            return False
+        entry = json.loads(published)
+        if entry["loaded_at"] <= self._loaded_at:
+            return False
+        self._adopt(entry["index"], entry["loaded_at"])
+        self.shared_loads += 1
+        logger.info(
+            "Adopted %d Slack channels loaded by another worker", len(self._index)
+        )
+        return True
+
+    async def _publish(self):
+        entry = json.dumps({"loaded_at": self._loaded_at, "index": self._index})
+        try:
+            await self.state.set("channels:index", entry, self.ttl)
+        except StateBackendError:
+            pass
+
+    def _can_refresh(self, now: float) -> bool:
+        return (
+            self._last_refresh is None
+            or now - self._last_refresh >= self.refresh_interval
+        )
+
+    def _schedule_refresh(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+
+    def _mark_missing(self, name: str):
+        now = time.monotonic()
+        if len(self._missing) >= self.max_missing:
+            self._missing = {
+                key: expires_at
+                for key, expires_at in self._missing.items()
+                if expires_at > now
+            }
+            if len(self._missing) >= self.max_missing:
+                self._missing.pop(next(iter(self._missing)))
+        self._missing[name] = now + self.negative_ttl
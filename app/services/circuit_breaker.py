@@ -0,0 +1,124 @@
+"""
+Circuit breaker for calls to external dependencies (OpenAI, Slack).
+"""
+
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after consecutive failures.
+
+    After `failure_threshold` failures in a row the breaker opens and callers
+    take their fallback without waiting. Once `reset_timeout` has passed it goes
+    half-open and admits up to `probes` trial calls: a success closes it, a
+    failure opens it again. Settings are read from `<PREFIX>_BREAKER_FAILURES`,
+    `<PREFIX>_BREAKER_RESET` and `<PREFIX>_BREAKER_PROBES`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+        probes: Optional[int] = None,
+    ):
+        prefix = name.upper()
+        self.name = name
+        self.failure_threshold = failure_threshold or int(
+            os.getenv(f"{prefix}_BREAKER_FAILURES", "5")
+        )
+        self.reset_timeout = reset_timeout or float(
+            os.getenv(f"{prefix}_BREAKER_RESET", "30")
+        )
+        self.probes = probes or int(os.getenv(f"{prefix}_BREAKER_PROBES", "1"))
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.trips = 0
+        self._probes_in_flight = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the breaker will admit a probe"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "state": STATE_VALUES[self.state],
+            "failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; admitted calls must report back"""
+        if not self.enabled or self.state == CLOSED:
+            return True
+
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                return False
+            logger.info("%s circuit half-open, probing", self.name)
+            self.state = HALF_OPEN
+            self._probes_in_flight = 0
+
+        if self._probes_in_flight >= self.probes:
+            self.rejected += 1
+            return False
+        self._probes_in_flight += 1
+        return True
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            logger.info("%s circuit closed after successful probe", self.name)
+            self._probes_in_flight = 0
+        self.state = CLOSED
+        self.failures = 0
+
+    def record_failure(self):
+        if not self.enabled:
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and self.failures >= self.failure_threshold
+        ):
+            self._open()
+
+    def release(self):
+        """Give back a probe slot for a call that ended without an outcome"""
+        if self.state == HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    def _open(self):
+        if self.state != OPEN:
+            self.trips += 1
+            logger.warning(
+                "%s circuit open after %d failures, retrying in %ss",
+                self.name,
+                self.failures,
+                self.reset_timeout,
+            )
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self._probes_in_flight = 0
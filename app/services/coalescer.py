@@ -0,0 +1,161 @@
+"""
+Per-customer coalescing of notifications into digest messages.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from ..types import FormatMode, NotificationRequest, NotificationType, Priority
+
+logger = logging.getLogger(__name__)
+
+GroupKey = Tuple[
+    str, NotificationType, Optional[str], Optional[FormatMode], Optional[Priority]
+]
+
+
+def merge_requests(requests: List[NotificationRequest]) -> NotificationRequest:
+    """Merge notifications of one type for one customer into a single digest request"""
+    first = requests[0]
+    if len(requests) == 1:
+        return first
+
+    campaigns = {request.campaign for request in requests}
+    same_campaign = len(campaigns) == 1
+
+    data: List[str] = []
+    links: List[str] = []
+    for request in requests:
+        items = request.data if isinstance(request.data, list) else [request.data]
+        if not same_campaign and request.campaign:
+            items = [f"[{request.campaign}] {item}" for item in items]
+        data.extend(items)
+        for link in request.links:
+            if link not in links:
+                links.append(link)
+
+    return NotificationRequest(
+        type=first.type,
+        customer=first.customer,
+        campaign=first.campaign if same_campaign else None,
+        data=data,
+        links=links,
+        mode=first.mode,
+        priority=first.priority,
+    )
+
+
+class _Group:
+    def __init__(self):
+        self.requests: List[NotificationRequest] = []
+        self.futures: List[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class NotificationCoalescer:
+    """
+    Buffers notifications per customer and type for a short window, then delivers
+    them as one digest. Every caller in a group receives the result of delivering
+    the digest.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[NotificationRequest], Awaitable[Any]],
+        window: Optional[float] = None,
+        max_size: Optional[int] = None,
+        by_campaign: Optional[bool] = None,
+        bypass_updates: Optional[bool] = None,
+    ):
+        self._deliver = deliver
+        self.window = (
+            window if window is not None else float(os.getenv("COALESCE_WINDOW", "0"))
+        )
+        self.max_size = max_size or int(os.getenv("COALESCE_MAX_SIZE", "20"))
+        self.by_campaign = (
+            by_campaign
+            if by_campaign is not None
+            else os.getenv("COALESCE_BY_CAMPAIGN", "false").lower() == "true"
+        )
+        self.bypass_updates = (
+            bypass_updates
+            if bypass_updates is not None
+            else os.getenv("COALESCE_BYPASS_UPDATES", "true").lower() == "true"
+        )
+        self._groups: Dict[GroupKey, _Group] = {}
+        self._flushing: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    async def submit(self, request: NotificationRequest) -> Any:
+        """Deliver a notification, possibly as part of a digest, returning the delivery result"""
+        if not self.enabled or (
+            self.bypass_updates and request.type == NotificationType.UPDATE
+        ):
+            return await self._deliver(request)
+
+        key = (
+            request.customer,
+            request.type,
+            request.campaign if self.by_campaign else None,
+            request.mode,
+            request.priority,
+        )
+        group = self._groups.get(key)
+        if group is None:
+            group = _Group()
+            group.timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush, key
+            )
+            self._groups[key] = group
+
+        future = asyncio.get_running_loop().create_future()
+        group.requests.append(request)
+        group.futures.append(future)
+
+        if len(group.requests) >= self.max_size:
+            self._flush(key)
+
+        # A cancelled caller must not cancel delivery for the rest of the group
+        return await asyncio.shield(future)
+
+    async def close(self):
+        """Flush buffered groups and wait for their delivery"""
+        for key in list(self._groups):
+            self._flush(key)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    def _flush(self, key: GroupKey):
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+        if group.timer is not None:
+            group.timer.cancel()
+
+        task = asyncio.create_task(self._deliver_group(group))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _deliver_group(self, group: _Group):
+        if len(group.requests) > 1:
+            logger.info(
+                "Coalesced %d %s notifications for %s",
+                len(group.requests),
+                group.requests[0].type.value,
+                group.requests[0].customer,
+            )
+        try:
+            result = await self._deliver(merge_requests(group.requests))
+        except Exception as e:
+            for future in group.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for future in group.futures:
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,155 @@
+"""
+Notification delivery pipeline shared by the single and batch endpoints.
+"""
+
+import logging
+import os
+import time
+from typing import Optional, Tuple
+from .. import metrics, tracing
+from ..exceptions import (
+    CustomerNotFoundError,
+    ServiceOverloadedError,
+    SlackRateLimitError,
+    SlackUnavailableError,
+)
+from ..types import NotificationRequest
+from .admission import AdmissionController
+from .coalescer import NotificationCoalescer
+from .message_formatter import MessageFormatter, format_path
+from .scheduler import FairScheduler, request_lane, type_lanes
+from .slack_client import SlackService
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_PATHS = ("fallback", "timeout", "circuit_open")
+
+
+class NotificationDispatcher:
+    """
+    Formats and posts notifications under separate LLM and Slack concurrency
+    limits, handing free slots out by priority lane and fairly across customers.
+    """
+
+    def __init__(
+        self,
+        slack_service: SlackService,
+        message_formatter: MessageFormatter,
+        format_concurrency: Optional[int] = None,
+        post_concurrency: Optional[int] = None,
+        admission: Optional[AdmissionController] = None,
+    ):
+        self.slack_service = slack_service
+        self.message_formatter = message_formatter
+        self.format_concurrency = format_concurrency or int(
+            os.getenv("LLM_CONCURRENCY", "16")
+        )
+        self.post_concurrency = post_concurrency or int(
+            os.getenv("SLACK_CONCURRENCY", "50")
+        )
+        self.lanes = type_lanes()
+        self.format_scheduler = FairScheduler("format", self.format_concurrency)
+        self.post_scheduler = FairScheduler("post", self.post_concurrency)
+        self.admission = admission or AdmissionController()
+        self.coalescer = NotificationCoalescer(self._deliver_now)
+
+    async def format(self, request: NotificationRequest) -> str:
+        """Format a notification, waiting for a free LLM slot"""
+        lane = request_lane(request, self.lanes)
+        metrics.format_in_flight.inc()
+        try:
+            with (
+                metrics.format_duration.time(request.type.value),
+                tracing.span("format", lane=lane.value),
+            ):
+                async with self.format_scheduler.slot(lane, request.customer):
+                    message = await self.message_formatter.format_message(
+                        notification_type=request.type,
+                        customer=request.customer,
+                        data=request.data,
+                        campaign=request.campaign,
+                        links=request.links,
+                        mode=request.mode,
+                    )
+                tracing.annotate(path=format_path.get())
+                return message
+        finally:
+            metrics.format_in_flight.dec()
+
+    async def post(self, request: NotificationRequest, message: str) -> Optional[str]:
+        """Post a formatted message, waiting for a free Slack slot"""
+        lane = request_lane(request, self.lanes)
+        metrics.post_in_flight.inc()
+        try:
+            with metrics.post_duration.time(), tracing.span("post", lane=lane.value):
+                async with self.post_scheduler.slot(lane, request.customer):
+                    return await self.slack_service.post_message(
+                        request.customer, message
+                    )
+        finally:
+            metrics.post_in_flight.dec()
+
+    async def deliver(self, request: NotificationRequest) -> Optional[str]:
+        """
+        Format and post a single notification, coalescing it with other
+        notifications for the same customer when coalescing is enabled.
+        Admission control sheds the notification if the service is overloaded.
+
+        Returns:
+            Slack message ID
+
+        Raises:
+            ServiceOverloadedError: If admission control rejects the notification
+            NotificationServiceError: If formatting or posting fails
+        """
+        started = time.perf_counter()
+        outcome = "error"
+        metrics.notify_in_flight.inc()
+        with tracing.span(
+            "deliver", customer=request.customer, type=request.type.value
+        ) as current:
+            try:
+                async with self.admission.admit(request.customer):
+                    message_id, path = await self.coalescer.submit(request)
+                outcome = "fallback" if path in FALLBACK_PATHS else "success"
+                return message_id
+            except ServiceOverloadedError:
+                outcome = "shed"
+                raise
+            except CustomerNotFoundError:
+                outcome = "channel_not_found"
+                raise
+            except SlackRateLimitError:
+                outcome = "rate_limited"
+                raise
+            except SlackUnavailableError:
+                outcome = "slack_unavailable"
+                raise
+            finally:
+                if current is not None:
+                    current.set(outcome=outcome)
+                metrics.notify_in_flight.dec()
+                metrics.notifications_total.inc(request.type.value, outcome)
+                metrics.notify_duration.observe(
+                    time.perf_counter() - started, request.type.value
+                )
+
+    async def close(self):
+        """Deliver any notifications still buffered for coalescing"""
+        await self.coalescer.close()
+
+    async def _deliver_now(
+        self, request: NotificationRequest
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Format and post a notification, returning the Slack message ID and the
+        format path. Coalesced digests are delivered in the coalescer's own
+        task, so the path is returned rather than read from `format_path`.
+        """
+        started = time.perf_counter()
+        format_path.set(None)
+        formatted_message = await self.format(request)
+        path = format_path.get()
+        message_id = await self.post(request, formatted_message)
+        self.admission.observe(time.perf_counter() - started)
+        return message_id, path
@@ -0,0 +1,200 @@
+"""
+Content-addressed cache for LLM-formatted notification messages.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from ..exceptions import StateBackendError
+from .state import StateBackend
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(payload: Dict[str, Any], instructions: str, model: str) -> str:
+    """Hash the notification fields together with the agent instructions and model"""
+    canonical = json.dumps(
+        {"payload": payload, "instructions": instructions, "model": model},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FormatCache:
+    """
+    LRU + TTL cache of formatted messages with optional SQLite persistence.
+
+    With a shared state backend, local misses are looked up in it and new
+    messages are written through, so workers reuse each other's LLM results.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        path: Optional[str] = None,
+        state: Optional[StateBackend] = None,
+    ):
+        self.max_entries = (
+            max_entries
+            if max_entries is not None
+            else int(os.getenv("FORMAT_CACHE_SIZE", "1024"))
+        )
+        self.max_bytes = max_bytes or int(
+            os.getenv("FORMAT_CACHE_MAX_BYTES", str(16 * 1024 * 1024))
+        )
+        self.ttl = ttl or float(os.getenv("FORMAT_CACHE_TTL", "3600"))
+        self.path = path or os.getenv("FORMAT_CACHE_PATH")
+        self.state = state if state is not None and state.shared else None
+
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        if self.path and self.enabled:
+            self._open_db()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_hits": self.shared_hits,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached message for a key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            message, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return message
+            self._remove(key)
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._db_get, key)
+            if row is not None and row[1] > time.time():
+                self._store(key, row[0], row[1])
+                self.hits += 1
+                return row[0]
+
+        if self.state is not None:
+            try:
+                message = await self.state.get(f"format:{key}")
+            except StateBackendError:
+                message = None
+            if message is not None:
+                # The remaining TTL is not known; keep it locally for a full TTL
+                self._store(key, message, time.time() + self.ttl)
+                self.hits += 1
+                self.shared_hits += 1
+                return message
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, message: str):
+        """Cache a formatted message"""
+        if not self.enabled:
+            return
+
+        expires_at = time.time() + self.ttl
+        self._store(key, message, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_set, key, message, expires_at)
+        if self.state is not None:
+            try:
+                await self.state.set(f"format:{key}", message, self.ttl)
+            except StateBackendError:
+                pass
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _store(self, key: str, message: str, expires_at: float):
+        if key in self._entries:
+            self._remove(key)
+        size = len(message.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (message, expires_at)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def _remove(self, key: str):
+        message, _ = self._entries.pop(key)
+        self._bytes -= len(message.encode("utf-8"))
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS format_cache "
+                "(key TEXT PRIMARY KEY, message TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM format_cache WHERE expires_at <= ?", (time.time(),)
+            )
+            self._db.commit()
+            logger.info("Format cache persisted to %s", self.path)
+        except sqlite3.Error as e:
+            logger.error("Failed to open format cache database: %s", e)
+            self._db = None
+
+    def _db_get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            try:
+                return self._db.execute(
+                    "SELECT message, expires_at FROM format_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error("Format cache read failed: %s", e)
+                return None
+
+    def _db_set(self, key: str, message: str, expires_at: float):
+        with self._db_lock:
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO format_cache (key, message, expires_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, message, expires_at),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error("Format cache write failed: %s", e)
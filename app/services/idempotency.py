@@ -0,0 +1,226 @@
+"""
+Idempotency key store so retried /notify calls are delivered only once.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from ..exceptions import IdempotencyConflictError
+from ..types import NotificationRequest, NotificationResponse
+
+logger = logging.getLogger(__name__)
+
+
+def request_fingerprint(request: NotificationRequest) -> str:
+    """Hash the notification payload in a canonical form"""
+    canonical = json.dumps(
+        request.model_dump(mode="json"),
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remembers successful responses by idempotency key for a bounded time.
+
+    Completed responses are replayed for repeats. A duplicate that arrives while
+    the first request is still being delivered waits for that result instead of
+    formatting and posting a second time. Failures are not stored, so a retry
+    after an error is delivered again.
+    """
+
+    def __init__(
+        self,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        path: Optional[str] = None,
+        derive_keys: Optional[bool] = None,
+    ):
+        self.ttl = ttl or float(os.getenv("IDEMPOTENCY_TTL", "3600"))
+        self.max_entries = max_entries or int(
+            os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000")
+        )
+        self.path = path or os.getenv("IDEMPOTENCY_PATH")
+        self.derive_keys = (
+            derive_keys
+            if derive_keys is not None
+            else os.getenv("IDEMPOTENCY_DERIVE_KEYS", "false").lower() == "true"
+        )
+
+        self.replays = 0
+        self.joined = 0
+        # key -> (fingerprint, response JSON, expires_at)
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        if self.path:
+            self._open_db()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "replays": self.replays,
+            "joined": self.joined,
+        }
+
+    def key_for(
+        self, header_key: Optional[str], request: NotificationRequest
+    ) -> Optional[str]:
+        """The client's Idempotency-Key, or one derived from the payload if enabled"""
+        if header_key:
+            return f"key:{header_key}"
+        if self.derive_keys:
+            return f"payload:{request_fingerprint(request)}"
+        return None
+
+    async def run(
+        self,
+        key: str,
+        request: NotificationRequest,
+        deliver: Callable[[], Awaitable[NotificationResponse]],
+    ) -> NotificationResponse:
+        """
+        Deliver a request at most once per key.
+
+        Raises:
+            IdempotencyConflictError: If the key was used for a different payload
+        """
+        fingerprint = request_fingerprint(request)
+
+        while key in self._in_flight:
+            owner_fingerprint, future = self._in_flight[key]
+            self._check(key, fingerprint, owner_fingerprint)
+            self.joined += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The first request was cancelled; take over its delivery
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        # Waiters retrieve the outcome; avoid "exception was never retrieved"
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[key] = (fingerprint, future)
+        try:
+            stored = await self._get(key)
+            if stored is not None:
+                self._check(key, fingerprint, stored[0])
+                self.replays += 1
+                response = NotificationResponse.model_validate_json(stored[1])
+            else:
+                response = await deliver()
+                await self._set(key, fingerprint, response)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            return response
+        finally:
+            self._in_flight.pop(key, None)
+            if not future.done():
+                future.cancel()
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _check(self, key: str, fingerprint: str, stored_fingerprint: str):
+        if fingerprint != stored_fingerprint:
+            raise IdempotencyConflictError(
+                f"Idempotency key '{key.split(':', 1)[1]}' was already used for a different notification"
+            )
+
+    async def _get(self, key: str) -> Optional[Tuple[str, str]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            fingerprint, response, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return fingerprint, response
+            del self._entries[key]
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._db_get, key)
+            if row is not None and row[2] > time.time():
+                self._store(key, *row)
+                return row[0], row[1]
+        return None
+
+    async def _set(self, key: str, fingerprint: str, response: NotificationResponse):
+        expires_at = time.time() + self.ttl
+        response_json = response.model_dump_json()
+        self._store(key, fingerprint, response_json, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(
+                self._db_set, key, fingerprint, response_json, expires_at
+            )
+
+    def _store(self, key: str, fingerprint: str, response: str, expires_at: float):
+        self._entries.pop(key, None)
+        self._entries[key] = (fingerprint, response, expires_at)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _open_db(self):
+        try:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency_keys "
+                "(key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, "
+                "response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "DELETE FROM idempotency_keys WHERE expires_at <= ?", (time.time(),)
+            )
+            self._db.commit()
+            logger.info("Idempotency keys persisted to %s", self.path)
+        except sqlite3.Error as e:
+            logger.error("Failed to open idempotency database: %s", e)
+            self._db = None
+
+    def _db_get(self, key: str) -> Optional[Tuple[str, str, float]]:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            try:
+                return self._db.execute(
+                    "SELECT fingerprint, response, expires_at FROM idempotency_keys "
+                    "WHERE key = ?",
+                    (key,),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error("Idempotency key read failed: %s", e)
+                return None
+
+    def _db_set(self, key: str, fingerprint: str, response: str, expires_at: float):
+        with self._db_lock:
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO idempotency_keys "
+                    "(key, fingerprint, response, expires_at) VALUES (?, ?, ?, ?)",
+                    (key, fingerprint, response, expires_at),
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.error("Idempotency key write failed: %s", e)
@@ -2,23 +2,64 @@
 Message formatting service using OpenAI Agents for intelligent Slack notifications.
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Union
-from agents import Agent, Runner
-from ..types import NotificationType
+import os
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from pydantic import BaseModel
+from .. import metrics, tracing
+from ..types import FormatMode, NotificationType
+from .circuit_breaker import CircuitBreaker
+from .format_cache import FormatCache, make_cache_key
+from .prompt_builder import PromptBuilder
+from .state import StateBackend
+from .templates import render_template
+
+if TYPE_CHECKING:
+    from agents import Agent
 
 logger = logging.getLogger(__name__)
 
 
-class MessageFormatter:
-    """Formats notification messages using OpenAI Agents with Blue Bot persona."""
+def _agents():
+    """
+    Import the OpenAI Agents SDK on first use rather than at module import.
 
-    def __init__(self):
-        """Initialize the message formatter with OpenAI Agents."""
-        self.agent = Agent(
-            name="Blue",
-            model="gpt-4o-mini",
-            instructions="""You are Blue, a friendly AI assistant representing Kalos. You format notifications for customers through Slack.
+    The SDK takes seconds to import, which dominates cold starts, so it is
+    loaded when the first formatter is built.
+    """
+    import agents
+
+    return agents
+
+
+def __getattr__(name: str) -> Any:
+    # Keep `message_formatter.Agent` / `.Runner` available without the eager import
+    if name in ("Agent", "Runner"):
+        return getattr(_agents(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# How the current task's last message was produced
+# (llm, cache, template, timeout, circuit_open, fallback)
+format_path: ContextVar[Optional[str]] = ContextVar("format_path", default=None)
+
+BLUE_INSTRUCTIONS = """You are Blue, a friendly AI assistant representing Kalos. You format notifications for customers through Slack.
 
 Your personality:
 - Warm and professional tone
@@ -31,8 +72,186 @@ Notification types:
 - "learning": Insights and analytics discovered about campaigns (exciting, data-focused)
 - "update": Actions required from customer (clear call-to-action, include links prominently)
 
-Format the notification data into a friendly Slack message. Return ONLY the formatted message text.""",
+Notifications arrive as compact JSON with "type", "customer" and "data", and optionally "campaign" and "links". An entry like "+3 more" stands for items left out for length; mention them as a count, never invent them.
+
+Format the notification data into a friendly Slack message. Return ONLY the formatted message text."""
+
+BATCH_INSTRUCTIONS = """
+
+You will receive a JSON list of notifications, each with an "index". Format every notification independently and return one message per notification with its index."""
+
+
+def record_usage(result: Any):
+    """Count the tokens the provider reports for a run, including cached input"""
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if not isinstance(getattr(usage, "input_tokens", None), int):
+        return
+    details = getattr(usage, "input_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    metrics.llm_tokens.inc("input", amount=usage.input_tokens)
+    metrics.llm_tokens.inc("cached", amount=cached)
+    metrics.llm_tokens.inc("output", amount=usage.output_tokens)
+    tracing.annotate(
+        input_tokens=usage.input_tokens,
+        cached_tokens=cached,
+        output_tokens=usage.output_tokens,
+    )
+
+
+class FormattedMessage(BaseModel):
+    index: int
+    message: str
+
+
+class FormattedBatch(BaseModel):
+    messages: List[FormattedMessage]
+
+
+class FormatBatcher:
+    """
+    Collects format requests for a few milliseconds and sends them to the agent
+    as one structured-output call, so the persona instructions are sent once per
+    batch instead of once per notification.
+    """
+
+    def __init__(
+        self,
+        agent: "Agent",
+        run_single: Callable[[str], Awaitable[str]],
+        window_ms: Optional[float] = None,
+        max_size: Optional[int] = None,
+    ):
+        self.window = (
+            window_ms
+            if window_ms is not None
+            else float(os.getenv("FORMAT_BATCH_WINDOW_MS", "0"))
+        ) / 1000
+        self.max_size = max_size or int(os.getenv("FORMAT_BATCH_MAX_SIZE", "10"))
+        self.agent = agent.clone(
+            instructions=agent.instructions + BATCH_INSTRUCTIONS,
+            output_type=FormattedBatch,
+        )
+        self._run_single = run_single
+        self._pending: List[Tuple[Dict, str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.batched_items = 0
+        self.split_failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    async def submit(self, notification_data: Dict, user_prompt: str) -> str:
+        """Format one notification as part of the next batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((notification_data, user_prompt, future))
+        if len(self._pending) == 1:
+            self._timer = loop.call_later(self.window, self._flush)
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        with tracing.span("llm.batch"):
+            return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        items, self._pending = self._pending, []
+        if items:
+            self._spawn(self._run_batch(items))
+
+    def _spawn(self, coroutine):
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, items: List[Tuple[Dict, str, asyncio.Future]]):
+        if len(items) == 1:
+            await self._resolve_single(*items[0][1:])
+            return
+
+        self.batches += 1
+        self.batched_items += len(items)
+        batch_prompt = json.dumps(
+            [{"index": index, **data} for index, (data, _, _) in enumerate(items)],
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+
+        messages: Dict[int, str] = {}
+        try:
+            result = await _agents().Runner.run(self.agent, batch_prompt)
+            record_usage(result)
+            for formatted in result.final_output.messages:
+                if formatted.message.strip():
+                    messages[formatted.index] = formatted.message.strip()
+        except Exception as e:
+            logger.warning("Batch formatting of %d messages failed: %s", len(items), e)
+
+        for index, (_, user_prompt, future) in enumerate(items):
+            if future.done():
+                continue
+            if index in messages:
+                future.set_result(messages[index])
+            else:
+                self.split_failures += 1
+                self._spawn(self._resolve_single(user_prompt, future))
+
+    async def _resolve_single(self, user_prompt: str, future: asyncio.Future):
+        try:
+            message = await self._run_single(user_prompt)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(message)
+
+
+class MessageFormatter:
+    """Formats notification messages using OpenAI Agents with Blue Bot persona."""
+
+    def __init__(
+        self,
+        cache: Optional[FormatCache] = None,
+        state: Optional[StateBackend] = None,
+    ):
+        """Initialize the message formatter with OpenAI Agents."""
+        self.cache = cache or FormatCache(state=state)
+        default_mode = FormatMode(os.getenv("FORMAT_MODE", FormatMode.LLM.value))
+        self.type_modes: Dict[NotificationType, FormatMode] = {
+            notification_type: FormatMode(
+                os.getenv(f"FORMAT_MODE_{notification_type.name}", default_mode.value)
+            )
+            for notification_type in NotificationType
+        }
+        self.auto_template_max_chars = int(os.getenv("AUTO_TEMPLATE_MAX_CHARS", "200"))
+        self.latency_budget = float(os.getenv("FORMAT_LATENCY_BUDGET", "10"))
+        self.detach_on_timeout = (
+            os.getenv("FORMAT_DETACH_ON_TIMEOUT", "true").lower() == "true"
+        )
+        self.hedge_enabled = (
+            os.getenv("FORMAT_HEDGE_ENABLED", "false").lower() == "true"
+        )
+        self.hedge_percentile = float(os.getenv("FORMAT_HEDGE_PERCENTILE", "95"))
+        self.hedge_min_samples = int(os.getenv("FORMAT_HEDGE_MIN_SAMPLES", "20"))
+        self.path_counts: Counter = Counter()
+        # Second LLM requests sent by hedging; not a path, the message still
+        # counts once under the path that produced it
+        self.hedges = 0
+        self._latencies: deque = deque(maxlen=200)
+        self._detached: Set[asyncio.Task] = set()
+        self.breaker = CircuitBreaker("llm")
+        self.prompt_builder = PromptBuilder()
+        self.agent = _agents().Agent(
+            name="Blue",
+            model="gpt-4o-mini",
+            instructions=BLUE_INSTRUCTIONS,
         )
+        self.batcher = FormatBatcher(self.agent, self._run_agent)
 
     async def format_message(
         self,
@@ -41,31 +260,231 @@ Format the notification data into a friendly Slack message. Return ONLY the form
         data: Union[str, List[str]],
         campaign: str = None,
         links: List[str] = None,
+        mode: Optional[FormatMode] = None,
     ) -> str:
         """Format a notification message based on type and data."""
+        if self.resolve_mode(notification_type, data, mode) == FormatMode.TEMPLATE:
+            self._record_path("template")
+            return render_template(notification_type, customer, data, campaign, links)
+
         try:
-            # Build notification data object
-            notification_data = {
-                "type": notification_type.value,
-                "customer": customer,
-                "data": data,
-                "campaign": campaign,
-                "links": links or [],
-            }
+            prompt = self.prompt_builder.build(
+                notification_type, customer, data, campaign, links
+            )
+            cache_key = make_cache_key(
+                prompt.payload, self.agent.instructions, str(self.agent.model)
+            )
+            with tracing.span("format.cache") as current:
+                cached_message = await self.cache.get(cache_key)
+                if current is not None:
+                    current.set(hit=cached_message is not None)
+            if cached_message is not None:
+                logger.info(
+                    "Using cached %s message for %s",
+                    notification_type.value,
+                    customer,
+                    extra={"customer": customer, "format_path": "cache"},
+                )
+                self._record_path("cache")
+                return cached_message
+
+            if not self.breaker.allow():
+                logger.warning(
+                    "LLM circuit open, using template for %s",
+                    customer,
+                    extra={"customer": customer, "format_path": "circuit_open"},
+                )
+                self._record_path("circuit_open")
+                return render_template(
+                    notification_type, customer, data, campaign, links
+                )
+
+            metrics.prompt_tokens.observe(prompt.tokens, notification_type.value)
+            if prompt.truncated:
+                metrics.prompt_truncated.inc(notification_type.value)
+                logger.info(
+                    "Shortened %s prompt for %s to %d tokens, %d items omitted",
+                    notification_type.value,
+                    customer,
+                    prompt.tokens,
+                    prompt.omitted,
+                    extra={"customer": customer, "prompt_tokens": prompt.tokens},
+                )
+            tracing.annotate(
+                prompt_tokens=prompt.tokens, prompt_truncated=prompt.truncated
+            )
 
-            user_prompt = f"Format this notification: {notification_data}"
+            try:
+                formatted_message = await self._run_with_budget(
+                    prompt.payload, prompt.text, cache_key
+                )
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                raise
 
-            result = await Runner.run(self.agent, user_prompt)
-            formatted_message = result.final_output.strip()
+            if formatted_message is None:
+                self.breaker.record_failure()
+                logger.warning(
+                    "Formatting for %s exceeded %ss budget, using template",
+                    customer,
+                    self.latency_budget,
+                    extra={"customer": customer, "format_path": "timeout"},
+                )
+                self._record_path("timeout")
+                return render_template(
+                    notification_type, customer, data, campaign, links
+                )
 
             logger.info(
-                f"Successfully formatted {notification_type} message for {customer}"
+                "Successfully formatted %s message for %s",
+                notification_type.value,
+                customer,
+                extra={"customer": customer, "format_path": "llm"},
             )
+            self.breaker.record_success()
+            self._record_path("llm")
+
+            await self.cache.set(cache_key, formatted_message)
 
             return formatted_message
 
         except Exception as e:
-            logger.error(f"Failed to format message: {str(e)}")
+            logger.error(
+                "Failed to format message: %s",
+                e,
+                exc_info=True,
+                extra={"customer": customer, "format_path": "fallback"},
+            )
+            self._record_path("fallback")
             # Simple fallback
             data_text = ", ".join(data) if isinstance(data, list) else data
             return f"Update from Blue: {data_text}"
+
+    async def _run_with_budget(
+        self, notification_data: Dict, user_prompt: str, cache_key: str
+    ) -> Optional[str]:
+        """
+        Run the agent within the latency budget.
+
+        Returns:
+            The formatted message, or None if the budget ran out. A late result is
+            either cancelled or left to finish and populate the cache.
+        """
+        with tracing.span("llm", budget=self.latency_budget) as current:
+            task = asyncio.create_task(self._run_hedged(notification_data, user_prompt))
+            try:
+                done, _ = await asyncio.wait(
+                    {task}, timeout=self.latency_budget or None
+                )
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            if current is not None:
+                current.set(timed_out=task not in done)
+
+        if task in done:
+            return task.result()
+
+        if self.detach_on_timeout:
+            self._detached.add(task)
+            task.add_done_callback(
+                lambda finished: self._cache_detached(finished, cache_key)
+            )
+        else:
+            task.cancel()
+        return None
+
+    def _cache_detached(self, task: asyncio.Task, cache_key: str):
+        self._detached.discard(task)
+        if task.cancelled() or task.exception() is not None:
+            return
+        store = asyncio.create_task(self.cache.set(cache_key, task.result()))
+        self._detached.add(store)
+        store.add_done_callback(self._detached.discard)
+
+    async def _run_hedged(self, notification_data: Dict, user_prompt: str) -> str:
+        """Run the agent, sending a second request if the first is unusually slow"""
+        delay = self._hedge_delay()
+        if self.batcher.enabled:
+            primary = asyncio.create_task(
+                self.batcher.submit(notification_data, user_prompt)
+            )
+        else:
+            primary = asyncio.create_task(self._run_agent(user_prompt))
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        tracing.annotate(hedged=True)
+        hedge = asyncio.create_task(self._run_agent(user_prompt))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            return primary.result()
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    async def _run_agent(self, user_prompt: str) -> str:
+        started = time.perf_counter()
+        with tracing.span("llm.run"):
+            result = await _agents().Runner.run(self.agent, user_prompt)
+            record_usage(result)
+        self._latencies.append(time.perf_counter() - started)
+        return result.final_output.strip()
+
+    def _hedge_delay(self) -> Optional[float]:
+        """Delay before hedging: the configured percentile of recent LLM latency"""
+        if not self.hedge_enabled or len(self._latencies) < self.hedge_min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        index = min(
+            len(latencies) - 1, int(len(latencies) * self.hedge_percentile / 100)
+        )
+        return latencies[index]
+
+    def _record_path(self, path: str):
+        self.path_counts[path] += 1
+        format_path.set(path)
+
+    def resolve_mode(
+        self,
+        notification_type: NotificationType,
+        data: Union[str, List[str]],
+        mode: Optional[FormatMode] = None,
+    ) -> FormatMode:
+        """
+        Pick LLM or template formatting for a notification.
+
+        The request's mode wins over the per-type default. In auto mode, action
+        required updates and long free-form data go to the LLM; short factual
+        items render from templates.
+        """
+        mode = mode or self.type_modes[notification_type]
+        if mode != FormatMode.AUTO:
+            return mode
+
+        if notification_type == NotificationType.UPDATE:
+            return FormatMode.LLM
+        items = data if isinstance(data, list) else [data]
+        if any(len(item) > self.auto_template_max_chars for item in items):
+            return FormatMode.LLM
+        return FormatMode.TEMPLATE
+
+    def close(self):
+        """Release the formatting cache"""
+        self.cache.close()
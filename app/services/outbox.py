@@ -0,0 +1,336 @@
+"""
+Durable local outbox for asynchronous notification delivery.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional, Set
+from ..exceptions import (
+    NotificationServiceError,
+    ServiceOverloadedError,
+    SlackRateLimitError,
+    SlackUnavailableError,
+)
+from ..types import JobStatus, NotificationJob, NotificationRequest
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """
+    SQLite-backed job queue drained by a pool of background workers.
+
+    Several processes can share one file. A job is claimed with a conditional
+    update, so only one outbox delivers it, and is leased to its owner for
+    `lease` seconds, renewed while delivery runs. Jobs whose owner stopped
+    renewing are returned to the queue by whichever outbox notices first.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        workers: Optional[int] = None,
+        retention: Optional[float] = None,
+        lease: Optional[float] = None,
+    ):
+        self.path = path or os.getenv("OUTBOX_PATH", "outbox.db")
+        self.workers = workers or int(os.getenv("OUTBOX_WORKERS", "4"))
+        self.retention = retention or float(os.getenv("OUTBOX_RETENTION", "86400"))
+        self.lease = lease or float(os.getenv("OUTBOX_LEASE", "60"))
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._retries: Set[asyncio.TimerHandle] = set()
+        self._busy: Set[asyncio.Task] = set()
+        self._stopping = False
+
+    async def start(self, dispatcher):
+        """Open the outbox, re-queue unfinished jobs and start the workers"""
+        self._stopping = False
+        pending = await asyncio.to_thread(self._open)
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        if pending:
+            logger.info("Resuming %d unfinished outbox jobs", len(pending))
+
+        self._tasks = [
+            asyncio.create_task(self._worker(dispatcher)) for _ in range(self.workers)
+        ]
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self, timeout: Optional[float] = 0.0):
+        """
+        Stop the workers, giving those mid-job up to `timeout` seconds to finish
+        it, or as long as they need if `timeout` is None; jobs still processing
+        are resumed by the next outbox opened on the same file
+        """
+        self._stopping = True
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        for task in self._tasks:
+            if task not in self._busy:
+                task.cancel()
+        if self._busy and (timeout is None or timeout > 0):
+            await asyncio.wait(list(self._busy), timeout=timeout)
+        if self._busy:
+            logger.warning(
+                "Stopping outbox with %d jobs unfinished; they resume on next start",
+                len(self._busy),
+            )
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._tasks.append(self._heartbeat_task)
+            self._heartbeat_task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._busy.clear()
+
+        with self._db_lock:
+            if self._db is not None:
+                # Let the next outbox to look resume our unfinished jobs now
+                # rather than after the lease runs out
+                self._db.execute(
+                    "UPDATE jobs SET lease_until = 0 WHERE owner = ? AND status = ?",
+                    (self.owner, JobStatus.PROCESSING.value),
+                )
+                self._db.commit()
+                self._db.close()
+                self._db = None
+
+    async def enqueue(self, request: NotificationRequest) -> str:
+        """Persist a notification and schedule it for delivery"""
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._insert, job_id, request.model_dump_json())
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[NotificationJob]:
+        """Look up a job's delivery status"""
+        return await asyncio.to_thread(self._select, job_id)
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    async def _worker(self, dispatcher):
+        worker = asyncio.current_task()
+        while not self._stopping:
+            job_id = await self._queue.get()
+            self._busy.add(worker)
+            try:
+                await self._process(job_id, dispatcher)
+            finally:
+                self._busy.discard(worker)
+                self._queue.task_done()
+
+    async def _process(self, job_id: str, dispatcher):
+        payload = await asyncio.to_thread(self._claim, job_id)
+        if payload is None:
+            return
+
+        try:
+            request = NotificationRequest.model_validate_json(payload)
+            message_id = await dispatcher.deliver(request)
+            await asyncio.to_thread(
+                self._finish, job_id, JobStatus.DELIVERED, message_id, None
+            )
+            logger.info("Delivered outbox job %s", job_id, extra={"job_id": job_id})
+
+        except (
+            SlackUnavailableError,
+            SlackRateLimitError,
+            ServiceOverloadedError,
+        ) as e:
+            # Hold the job until Slack's circuit breaker admits a probe again,
+            # Slack's rate limit has passed, or admission control has capacity
+            logger.warning(
+                "Outbox job %s deferred: %s", job_id, e, extra={"job_id": job_id}
+            )
+            await asyncio.to_thread(
+                self._finish, job_id, JobStatus.QUEUED, None, str(e)
+            )
+            self._retry_later(job_id, max(1.0, e.retry_after))
+
+        except NotificationServiceError as e:
+            logger.error(
+                "Outbox job %s failed: %s", job_id, e, extra={"job_id": job_id}
+            )
+            await asyncio.to_thread(
+                self._finish, job_id, JobStatus.FAILED, None, str(e)
+            )
+
+        except Exception as e:
+            logger.error(
+                "Unexpected error in outbox job %s: %s",
+                job_id,
+                e,
+                exc_info=True,
+                extra={"job_id": job_id},
+            )
+            await asyncio.to_thread(
+                self._finish, job_id, JobStatus.FAILED, None, "Internal server error"
+            )
+
+    async def _heartbeat(self):
+        """Renew the leases of jobs being delivered and recover expired ones"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                recovered = await asyncio.to_thread(self._renew)
+            except sqlite3.Error as e:
+                logger.warning("Outbox lease renewal failed: %s", e)
+                continue
+            for job_id in recovered:
+                self._queue.put_nowait(job_id)
+            if recovered:
+                logger.info(
+                    "Resuming %d outbox jobs whose owner stopped", len(recovered)
+                )
+
+    def _retry_later(self, job_id: str, delay: float):
+        def requeue():
+            self._retries.discard(handle)
+            self._queue.put_nowait(job_id)
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retries.add(handle)
+
+    def _open(self) -> List[str]:
+        with self._db_lock:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, payload TEXT NOT NULL, status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, message_id TEXT, error TEXT, "
+                "created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "owner TEXT, lease_until REAL)"
+            )
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+            for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+                if column not in columns:
+                    self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+            )
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (
+                    JobStatus.DELIVERED.value,
+                    JobStatus.FAILED.value,
+                    time.time() - self.retention,
+                ),
+            )
+            # Jobs interrupted by a crash or restart are retried once their
+            # lease has run out; other outboxes may be delivering the rest
+            self._expire_leases()
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at",
+                (JobStatus.QUEUED.value,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _renew(self) -> List[str]:
+        with self._db_lock:
+            if self._db is None:
+                return []
+            self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status = ?",
+                (time.time() + self.lease, self.owner, JobStatus.PROCESSING.value),
+            )
+            recovered = self._expire_leases()
+            self._db.commit()
+        return recovered
+
+    def _expire_leases(self) -> List[str]:
+        """Return jobs whose owner stopped renewing their lease to the queue"""
+        rows = self._db.execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL "
+            "WHERE status = ? AND (lease_until IS NULL OR lease_until < ?) "
+            "RETURNING id",
+            (JobStatus.QUEUED.value, JobStatus.PROCESSING.value, time.time()),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _insert(self, job_id: str, payload: str):
+        now = time.time()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, payload, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, payload, JobStatus.QUEUED.value, now, now),
+            )
+            self._db.commit()
+
+    def _claim(self, job_id: str) -> Optional[str]:
+        """Take a queued job, unless another outbox has already claimed it"""
+        now = time.time()
+        with self._db_lock:
+            claimed = self._db.execute(
+                "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ? AND status = ?",
+                (
+                    JobStatus.PROCESSING.value,
+                    self.owner,
+                    now + self.lease,
+                    now,
+                    job_id,
+                    JobStatus.QUEUED.value,
+                ),
+            ).rowcount
+            self._db.commit()
+            if not claimed:
+                return None
+            row = self._db.execute(
+                "SELECT payload FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row[0]
+
+    def _finish(
+        self,
+        job_id: str,
+        status: JobStatus,
+        message_id: Optional[str],
+        error: Optional[str],
+    ):
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, message_id = ?, error = ?, updated_at = ?, "
+                "owner = NULL, lease_until = NULL WHERE id = ?",
+                (status.value, message_id, error, time.time(), job_id),
+            )
+            self._db.commit()
+
+    def _select(self, job_id: str) -> Optional[NotificationJob]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT id, status, attempts, message_id, error, created_at, updated_at "
+                "FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return NotificationJob(
+            job_id=row[0],
+            status=row[1],
+            attempts=row[2],
+            message_id=row[3],
+            error=row[4],
+            created_at=row[5],
+            updated_at=row[6],
+        )
@@ -0,0 +1,175 @@
+"""
+Compact, token-budgeted prompts for LLM formatting.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from ..types import NotificationType
+
+ELLIPSIS = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate token count of a prompt.
+
+    Uses one token per four UTF-8 bytes, close to GPT tokenizers for English
+    and JSON punctuation and an overestimate for other scripts, so the budget
+    errs on the safe side without shipping a tokenizer.
+    """
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def encode_payload(payload: Dict[str, Any]) -> str:
+    """Canonical compact JSON: sorted keys, no whitespace, unescaped unicode"""
+    return json.dumps(
+        payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+
+
+class Prompt:
+    """The user message for one notification and what fitting it cost"""
+
+    def __init__(
+        self,
+        payload: Dict[str, Any],
+        text: str,
+        tokens: int,
+        omitted: int = 0,
+        clipped: int = 0,
+    ):
+        self.payload = payload
+        self.text = text
+        self.tokens = tokens
+        # Data items and links replaced by "+N more" markers
+        self.omitted = omitted
+        # Data items cut short
+        self.clipped = clipped
+
+    @property
+    def truncated(self) -> bool:
+        return self.omitted > 0 or self.clipped > 0
+
+
+class PromptBuilder:
+    """
+    Encodes notifications for the Blue agent within a token budget.
+
+    Empty fields are dropped and the rest is serialised as canonical compact
+    JSON, so identical notifications always produce identical prompts. Data
+    items longer than `max_item_chars` are cut short; if the encoding is still
+    over `max_tokens`, trailing data items and then links are replaced by a
+    "+N more" marker, keeping at least the first data item.
+
+    Only the notification goes in the user message: the persona instructions
+    are sent unchanged as the system prompt, a stable prefix the provider can
+    serve from its prompt cache.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_item_chars: Optional[int] = None,
+    ):
+        self.max_tokens = (
+            max_tokens
+            if max_tokens is not None
+            else int(os.getenv("FORMAT_PROMPT_MAX_TOKENS", "1000"))
+        )
+        self.max_item_chars = (
+            max_item_chars
+            if max_item_chars is not None
+            else int(os.getenv("FORMAT_PROMPT_MAX_ITEM_CHARS", "1000"))
+        )
+
+    def build(
+        self,
+        notification_type: NotificationType,
+        customer: str,
+        data: Union[str, List[str]],
+        campaign: Optional[str] = None,
+        links: Optional[List[str]] = None,
+    ) -> Prompt:
+        """Encode a notification, fitting it to the token budget"""
+        is_list = isinstance(data, list)
+        original = [item for item in (data if is_list else [data]) if item]
+        items = [self._clip(item, self.max_item_chars) for item in original]
+        links = [link for link in links or [] if link]
+
+        def encode(kept_items: List[str], kept_links: List[str]) -> Prompt:
+            payload: Dict[str, Any] = {
+                "type": notification_type.value,
+                "customer": customer,
+            }
+            if kept_items:
+                payload["data"] = kept_items if is_list else kept_items[0]
+            if campaign:
+                payload["campaign"] = campaign
+            if kept_links:
+                payload["links"] = kept_links
+            text = encode_payload(payload)
+            return Prompt(payload, text, estimate_tokens(text))
+
+        kept_items, kept_links = items, links
+        omitted_items = omitted_links = 0
+        prompt = encode(items, links)
+        if self.max_tokens and prompt.tokens > self.max_tokens:
+            # Drop trailing data items, then links, behind "+N more" markers
+            kept_items, omitted_items = self._fit(
+                items, 1, lambda kept: encode(kept, links)
+            )
+            kept_links, omitted_links = self._fit(
+                links, 0, lambda kept: encode(kept_items, kept)
+            )
+            prompt = encode(kept_items, kept_links)
+
+            # One long item can still be over; cut it to what the budget leaves
+            while (
+                prompt.tokens > self.max_tokens
+                and kept_items
+                and len(kept_items[0]) > 1
+            ):
+                overflow = (prompt.tokens - self.max_tokens) * 4
+                first = kept_items[0]
+                kept_items = [
+                    self._clip(first, max(1, len(first) - max(overflow, 16)))
+                ] + kept_items[1:]
+                prompt = encode(kept_items, kept_links)
+
+        kept_data = kept_items[: len(kept_items) - 1] if omitted_items else kept_items
+        prompt.omitted = omitted_items + omitted_links
+        prompt.clipped = sum(
+            1 for kept, item in zip(kept_data, original) if kept != item
+        )
+        return prompt
+
+    def _fit(
+        self,
+        values: List[str],
+        minimum: int,
+        encode: Callable[[List[str]], Prompt],
+    ) -> Tuple[List[str], int]:
+        """Largest prefix of `values` that fits the budget with a "+N more" marker"""
+
+        def kept(count: int) -> List[str]:
+            if count >= len(values):
+                return values
+            return values[:count] + [f"+{len(values) - count} more"]
+
+        if len(values) <= minimum or encode(values).tokens <= self.max_tokens:
+            return values, 0
+        low, high = minimum, len(values) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if encode(kept(middle)).tokens <= self.max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return kept(low), len(values) - low
+
+    @staticmethod
+    def _clip(text: str, limit: int) -> str:
+        if not limit or len(text) <= limit:
+            return text
+        return text[: max(0, limit - 1)].rstrip() + ELLIPSIS
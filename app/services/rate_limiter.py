@@ -0,0 +1,253 @@
+"""
+Token-bucket scheduling for Slack Web API calls.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from slack_sdk.errors import SlackApiError
+from .. import tracing
+from ..exceptions import StateBackendError
+from .state import StateBackend
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket whose waiters are served in arrival order."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Wait for a token, returning the time spent waiting"""
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - started
+                else:
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Hold all waiters until Slack's Retry-After has elapsed"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    @property
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return not self._lock.locked() and self.tokens >= self.capacity
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class SlackRateLimiter:
+    """
+    Queues Slack calls per channel and per method instead of failing them.
+
+    Channel buckets follow chat.postMessage's ~1 message/second/channel limit and
+    method buckets cap workspace-wide throughput. ratelimited responses pause the
+    channel for Slack's Retry-After and the call is retried with jittered backoff.
+
+    With a shared state backend the limits are global across workers: each call
+    claims a place in a fixed window of `burst / rate` seconds counted in the
+    backend, and pauses are shared. If the backend fails, the call falls back
+    to this worker's own buckets.
+    """
+
+    def __init__(
+        self,
+        channel_rate: Optional[float] = None,
+        channel_burst: Optional[float] = None,
+        method_rate: Optional[float] = None,
+        method_burst: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        max_buckets: int = 10000,
+        state: Optional[StateBackend] = None,
+    ):
+        self.channel_rate = channel_rate or float(os.getenv("SLACK_CHANNEL_RATE", "1"))
+        self.channel_burst = channel_burst or float(
+            os.getenv("SLACK_CHANNEL_BURST", "1")
+        )
+        self.method_rate = method_rate or float(os.getenv("SLACK_METHOD_RATE", "10"))
+        self.method_burst = method_burst or float(os.getenv("SLACK_METHOD_BURST", "20"))
+        self.max_retries = (
+            max_retries
+            if max_retries is not None
+            else int(os.getenv("SLACK_MAX_RETRIES", "3"))
+        )
+        self.backoff = backoff or float(os.getenv("SLACK_RETRY_BACKOFF", "1"))
+        self.max_buckets = max_buckets
+        self.state = state if state is not None and state.shared else None
+
+        self._channel_buckets: Dict[str, TokenBucket] = {}
+        self._method_buckets: Dict[str, TokenBucket] = {}
+        # First shared window that may still have room, per bucket
+        self._next_window: Dict[str, int] = {}
+
+        self.queued = 0
+        self.calls = 0
+        self.rate_limited = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "queued": self.queued,
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "wait_seconds_total": self.wait_seconds_total,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+    async def acquire(self, method: str, channel: str) -> float:
+        """Wait for both the channel and the method bucket, returning the wait time"""
+        self.queued += 1
+        try:
+            if self.state is not None:
+                try:
+                    waited = await self._acquire_shared(method, channel)
+                except StateBackendError:
+                    waited = await self._acquire_local(method, channel)
+            else:
+                waited = await self._acquire_local(method, channel)
+        finally:
+            self.queued -= 1
+
+        self.calls += 1
+        self.wait_seconds_total += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return waited
+
+    async def call(
+        self,
+        method: str,
+        channel: str,
+        func: Callable[..., Awaitable[Any]],
+        /,
+        **kwargs,
+    ) -> Any:
+        """
+        Invoke a Slack API call once the rate limits allow it.
+
+        Raises:
+            SlackApiError: For non-rate-limit errors, or once retries are exhausted
+        """
+        attempt = 0
+        while True:
+            with tracing.span("slack.rate_limit"):
+                await self.acquire(method, channel)
+            try:
+                with tracing.span(f"slack.{method}", attempt=attempt):
+                    return await func(**kwargs)
+            except SlackApiError as e:
+                if e.response["error"] != "ratelimited" or attempt >= self.max_retries:
+                    raise
+
+                self.rate_limited += 1
+                retry_after = self.retry_after(e)
+                await self._pause(channel, retry_after)
+                delay = max(retry_after, self.backoff * 2**attempt)
+                delay += random.uniform(0, self.backoff)
+                attempt += 1
+                logger.warning(
+                    "Slack rate limited %s on %s, retry %d in %.2fs",
+                    method,
+                    channel,
+                    attempt,
+                    delay,
+                )
+                with tracing.span("slack.backoff", retry_after=retry_after):
+                    await asyncio.sleep(delay)
+
+    async def _acquire_local(self, method: str, channel: str) -> float:
+        waited = await self._channel_bucket(channel).acquire()
+        waited += await self._method_bucket(method).acquire()
+        return waited
+
+    async def _acquire_shared(self, method: str, channel: str) -> float:
+        started = time.monotonic()
+        paused_until = await self.state.get(f"slack:pause:{channel}")
+        if paused_until is not None:
+            delay = float(paused_until) - time.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await self._reserve(f"channel:{channel}", self.channel_rate, self.channel_burst)
+        await self._reserve(f"method:{method}", self.method_rate, self.method_burst)
+        return time.monotonic() - started
+
+    async def _reserve(self, bucket: str, rate: float, burst: float):
+        """Claim a call in the first shared window with room and wait for it to open"""
+        window = burst / rate
+        now = time.time()
+        index = max(int(now // window), self._next_window.get(bucket, 0))
+        while True:
+            count = await self.state.incr(
+                f"slack:rate:{bucket}:{index}", (index + 2) * window - now
+            )
+            if count <= burst:
+                break
+            index += 1
+        if len(self._next_window) >= self.max_buckets:
+            self._next_window.clear()
+        self._next_window[bucket] = index
+        delay = index * window - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _pause(self, channel: str, seconds: float):
+        self._channel_bucket(channel).pause(seconds)
+        if self.state is not None:
+            try:
+                await self.state.set(
+                    f"slack:pause:{channel}", str(time.time() + seconds), seconds
+                )
+            except StateBackendError:
+                pass
+
+    def retry_after(self, error: SlackApiError) -> float:
+        """Seconds Slack asked to wait before retrying, or the base backoff"""
+        headers = getattr(error.response, "headers", None) or {}
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return self.backoff
+
+    def _channel_bucket(self, channel: str) -> TokenBucket:
+        bucket = self._channel_buckets.get(channel)
+        if bucket is None:
+            if len(self._channel_buckets) >= self.max_buckets:
+                self._channel_buckets = {
+                    key: value
+                    for key, value in self._channel_buckets.items()
+                    if not value.idle
+                }
+            bucket = TokenBucket(self.channel_rate, self.channel_burst)
+            self._channel_buckets[channel] = bucket
+        return bucket
+
+    def _method_bucket(self, method: str) -> TokenBucket:
+        bucket = self._method_buckets.get(method)
+        if bucket is None:
+            bucket = TokenBucket(self.method_rate, self.method_burst)
+            self._method_buckets[method] = bucket
+        return bucket
@@ -0,0 +1,159 @@
+"""
+Priority lanes with fair queuing across customers for format and post slots.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+from .. import metrics, tracing
+from ..types import NotificationRequest, NotificationType, Priority
+
+DEFAULT_LANES = {
+    NotificationType.UPDATE: Priority.HIGH,
+    NotificationType.CHANGE: Priority.NORMAL,
+    NotificationType.LEARNING: Priority.LOW,
+}
+DEFAULT_WEIGHTS = {Priority.HIGH: 8, Priority.NORMAL: 4, Priority.LOW: 1}
+
+
+def lane_weights() -> Dict[Priority, float]:
+    """Share of slots each lane receives under contention, from LANE_WEIGHT_<LANE>"""
+    return {
+        lane: float(os.getenv(f"LANE_WEIGHT_{lane.name}", str(weight)))
+        for lane, weight in DEFAULT_WEIGHTS.items()
+    }
+
+
+def type_lanes() -> Dict[NotificationType, Priority]:
+    """Default lane per notification type, from PRIORITY_<TYPE>"""
+    return {
+        notification_type: Priority(
+            os.getenv(f"PRIORITY_{notification_type.name}", lane.value)
+        )
+        for notification_type, lane in DEFAULT_LANES.items()
+    }
+
+
+class FairScheduler:
+    """
+    Semaphore that hands free slots out by lane weight, then round-robin across
+    customers within the lane.
+
+    Lanes are served by stride scheduling: under contention a lane with weight 8
+    gets eight slots for every one of a weight-1 lane, so low-priority work is
+    slowed rather than starved. Inside a lane each customer has its own queue and
+    customers take turns, so one tenant's flood waits behind itself only.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        capacity: int,
+        weights: Optional[Dict[Priority, float]] = None,
+    ):
+        self.stage = stage
+        self.capacity = capacity
+        self.weights = weights or lane_weights()
+        self._active = 0
+        self._waiting = 0
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            lane: OrderedDict() for lane in Priority
+        }
+        self._depth: Dict[Priority, int] = {lane: 0 for lane in Priority}
+        self._pass: Dict[Priority, float] = {lane: 0.0 for lane in Priority}
+        self._virtual_time = 0.0
+
+    def depths(self) -> Dict[Priority, int]:
+        """Waiters per lane"""
+        return dict(self._depth)
+
+    @asynccontextmanager
+    async def slot(self, lane: Priority, customer: str) -> AsyncIterator[None]:
+        """Hold one of the scheduler's slots, queueing fairly if none is free"""
+        started = time.perf_counter()
+        if self._active < self.capacity and not self._waiting:
+            self._active += 1
+        else:
+            with tracing.span(f"{self.stage}.queue", lane=lane.value):
+                await self._wait(lane, customer)
+        metrics.queue_wait.observe(
+            time.perf_counter() - started, self.stage, lane.value
+        )
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _wait(self, lane: Priority, customer: str):
+        future = asyncio.get_running_loop().create_future()
+        queues = self._queues[lane]
+        if not self._depth[lane]:
+            # An idle lane rejoins at the current virtual time, without banked credit
+            self._pass[lane] = max(self._pass[lane], self._virtual_time)
+        queues.setdefault(customer, deque()).append(future)
+        self._depth[lane] += 1
+        self._waiting += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._discard(lane, customer, future)
+            else:
+                # The slot was handed over just as we were cancelled; pass it on
+                self._release()
+            raise
+
+    def _release(self):
+        future = self._next()
+        if future is None:
+            self._active -= 1
+        else:
+            # The slot moves straight to the next waiter; _active is unchanged
+            future.set_result(None)
+
+    def _next(self) -> Optional[asyncio.Future]:
+        while True:
+            lanes = [lane for lane in Priority if self._depth[lane]]
+            if not lanes:
+                return None
+            lane = min(lanes, key=lambda candidate: self._pass[candidate])
+
+            queues = self._queues[lane]
+            customer, queue = next(iter(queues.items()))
+            future = queue.popleft()
+            self._depth[lane] -= 1
+            self._waiting -= 1
+            if future.done():
+                # Cancelled in this tick, before its waiter could discard it;
+                # skip it without charging the lane or moving the customer
+                if not queue:
+                    del queues[customer]
+                continue
+
+            if queue:
+                queues.move_to_end(customer)
+            else:
+                del queues[customer]
+            self._virtual_time = self._pass[lane]
+            self._pass[lane] += 1 / self.weights[lane]
+            return future
+
+    def _discard(self, lane: Priority, customer: str, future: asyncio.Future):
+        queue = self._queues[lane].get(customer)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        if not queue:
+            del self._queues[lane][customer]
+        self._depth[lane] -= 1
+        self._waiting -= 1
+
+
+def request_lane(
+    request: NotificationRequest, lanes: Dict[NotificationType, Priority]
+) -> Priority:
+    """The request's explicit priority, or its type's lane"""
+    return request.priority or lanes[request.type]
@@ -1,20 +1,88 @@
+import asyncio
 import os
 import logging
-from typing import Optional
-from slack_sdk import WebClient
+import sys
+from typing import Any, Optional
 from slack_sdk.errors import SlackApiError
+from app import tracing
 
-from app.exceptions import SlackIntegrationError
+from app.exceptions import (
+    CustomerNotFoundError,
+    SlackIntegrationError,
+    SlackRateLimitError,
+    SlackUnavailableError,
+)
+from app.services.alerts import AlertAggregator
+from app.services.channel_directory import ChannelDirectory
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.rate_limiter import SlackRateLimiter
+from app.services.state import StateBackend
 
 logger = logging.getLogger(__name__)
 
 
+def __getattr__(name: str) -> Any:
+    # The async client pulls in aiohttp; import it when the first service is built
+    if name == "AsyncWebClient":
+        from slack_sdk.web.async_client import AsyncWebClient
+
+        return AsyncWebClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 class SlackService:
     """Service for handling Slack API interactions"""
 
-    def __init__(self):
-        self.client = WebClient(token=os.getenv("SLACK_BOT_TOKEN"))
+    def __init__(
+        self,
+        pool_size: Optional[int] = None,
+        timeout: Optional[float] = None,
+        keepalive_timeout: Optional[float] = None,
+        state: Optional[StateBackend] = None,
+    ):
+        self.pool_size = pool_size or int(os.getenv("SLACK_POOL_SIZE", "200"))
+        self.timeout = timeout or float(os.getenv("SLACK_TIMEOUT", "10"))
+        self.keepalive_timeout = keepalive_timeout or float(
+            os.getenv("SLACK_KEEPALIVE_TIMEOUT", "30")
+        )
+        client_class = sys.modules[__name__].AsyncWebClient
+        self.client = client_class(
+            token=os.getenv("SLACK_BOT_TOKEN"),
+            timeout=self.timeout,
+            base_url=os.getenv("SLACK_API_URL", "https://slack.com/api/"),
+        )
         self.internal_channel = "kalos-internal"
+        self.channel_directory = ChannelDirectory(self.client, state=state)
+        self.rate_limiter = SlackRateLimiter(state=state)
+        self.breaker = CircuitBreaker("slack")
+        self.alerts = AlertAggregator(self._post_internal_alert)
+
+    def _ensure_session(self):
+        """
+        Attach the shared keep-alive connection pool to the Slack client.
+
+        The aiohttp session is bound to the running event loop, so it is created
+        lazily on first use rather than in the constructor.
+        """
+        session = self.client.session
+        if session is None or session.closed:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self.client.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        """Flush pending alerts and close the pooled HTTP session"""
+        await self.alerts.close()
+        await self.channel_directory.close()
+        session = self.client.session
+        if session is not None and not session.closed:
+            await session.close()
+        self.client.session = None
 
     def get_customer_channel_name(self, customer: str) -> str:
         """Convert customer name to Slack channel name format"""
@@ -32,67 +100,155 @@ class SlackService:
             Message ID if successful, None if failed
 
         Raises:
+            SlackUnavailableError: If the Slack circuit breaker is open
             SlackIntegrationError: If posting fails
         """
         channel_name = self.get_customer_channel_name(customer)
 
-        try:
-            response = self.client.chat_postMessage(
-                channel=channel_name, text=message, username="Blue Bot"
+        # Repeated traffic for a known-missing channel short-circuits without Slack calls
+        if self.channel_directory.is_missing(channel_name):
+            logger.warning(
+                "Skipping post to known missing channel %s",
+                channel_name,
+                extra={"customer": customer, "channel": channel_name},
+            )
+            self._post_channel_not_found_error(customer, channel_name)
+            raise CustomerNotFoundError(f"Customer channel '{channel_name}' not found")
+
+        self._ensure_session()
+        with tracing.span("slack.resolve_channel", channel=channel_name):
+            channel_id = await self.channel_directory.resolve(channel_name)
+        if channel_id is None:
+            logger.error(
+                "Customer channel %s not found in directory",
+                channel_name,
+                extra={"customer": customer, "channel": channel_name},
+            )
+            self._post_channel_not_found_error(customer, channel_name)
+            raise CustomerNotFoundError(f"Customer channel '{channel_name}' not found")
+
+        if not self.breaker.allow():
+            raise SlackUnavailableError(
+                "Slack is unavailable, circuit breaker open",
+                retry_after=self.breaker.retry_after,
             )
 
+        try:
+            response = await self._post(channel_id, message)
+
             if response["ok"]:
-                logger.info(f"Successfully posted message to {channel_name}")
+                logger.info(
+                    "Successfully posted message to %s",
+                    channel_name,
+                    extra={"customer": customer, "channel": channel_name},
+                )
                 return response["ts"]  # Message timestamp ID
             else:
                 logger.error(
-                    f"Failed to post message to {channel_name}: {response['error']}"
+                    "Failed to post message to %s: %s",
+                    channel_name,
+                    response["error"],
+                    extra={"customer": customer, "channel": channel_name},
                 )
                 raise SlackIntegrationError(f"Slack API error: {response['error']}")
 
         except SlackApiError as e:
             logger.error(
-                f"Slack API error posting to {channel_name}: {e.response['error']}"
+                "Slack API error posting to %s: %s",
+                channel_name,
+                e.response["error"],
+                extra={"customer": customer, "channel": channel_name},
             )
 
             # Handle channel not found specifically
             if e.response["error"] == "channel_not_found":
-                await self._post_channel_not_found_error(customer, channel_name)
-                raise SlackIntegrationError(
+                self.channel_directory.invalidate(channel_name)
+                self._post_channel_not_found_error(customer, channel_name)
+                raise CustomerNotFoundError(
                     f"Customer channel '{channel_name}' not found"
                 )
 
+            if e.response["error"] == "ratelimited":
+                raise SlackRateLimitError(
+                    f"Slack API error: {e.response['error']}",
+                    retry_after=self.rate_limiter.retry_after(e),
+                )
+
             raise SlackIntegrationError(f"Slack API error: {e.response['error']}")
 
         except Exception as e:
-            logger.error(f"Unexpected error posting to Slack: {str(e)}")
+            logger.error(
+                "Unexpected error posting to Slack: %s",
+                e,
+                exc_info=True,
+                extra={"customer": customer, "channel": channel_name},
+            )
             raise SlackIntegrationError(f"Unexpected Slack error: {str(e)}")
 
-    async def _post_channel_not_found_error(self, customer: str, channel_name: str):
-        """Post error notification to internal channel when customer channel not found"""
-        error_message = (
-            f"Channel Not Found Error\n"
-            f"Failed to post notification for customer: `{customer}`\n"
-            f"Attempted channel: `{channel_name}`\n"
-            f"Please verify the channel exists and the bot has access."
-        )
+    def _post_channel_not_found_error(self, customer: str, channel_name: str):
+        """
+        Alert the internal channel that a customer channel was not found.
+
+        Reported to the AlertAggregator, which posts in the background and
+        folds repeats for the same customer into a periodic summary.
+        """
+        tracing.annotate(alert="channel_not_found")
+        self.alerts.report(customer, channel_name)
+
+    async def _post_internal_alert(self, text: str):
+        """Post an alert to the internal channel, logging rather than raising failures"""
+        if not self.breaker.allow():
+            logger.error("Slack circuit open, dropped internal alert")
+            return
 
         try:
-            self.client.chat_postMessage(
-                channel=self.internal_channel, text=error_message, username="Blue Bot"
-            )
-            logger.info(f"Posted channel not found error to {self.internal_channel}")
+            self._ensure_session()
+            with tracing.span("slack.alert", channel=self.internal_channel):
+                await self._post(self.internal_channel, text)
+            logger.info("Posted alert to %s", self.internal_channel)
         except SlackApiError as e:
             logger.error(
-                f"Failed to post error to internal channel: {e.response['error']}"
+                "Failed to post error to internal channel: %s", e.response["error"]
             )
         except Exception as e:
-            logger.error(f"Unexpected error posting to internal channel: {str(e)}")
+            logger.error("Unexpected error posting to internal channel: %s", e)
+
+    async def _post(self, channel: str, text: str):
+        """
+        Call chat.postMessage through the rate limiter, reporting the outcome to
+        the circuit breaker. Only transport errors and 5xx responses count as
+        failures; Slack answering with an error means Slack is up.
+        """
+        try:
+            response = await self.rate_limiter.call(
+                "chat.postMessage",
+                channel,
+                self.client.chat_postMessage,
+                channel=channel,
+                text=text,
+                username="Blue Bot",
+            )
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except SlackApiError as e:
+            if (getattr(e.response, "status_code", None) or 0) >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        return response
 
-    def validate_connection(self) -> bool:
+    async def validate_connection(self) -> bool:
         """Test if the Slack client can connect and authenticate"""
         try:
-            response = self.client.auth_test()
+            self._ensure_session()
+            response = await self.client.auth_test()
             return response["ok"]
         except SlackApiError:
             return False
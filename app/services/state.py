@@ -0,0 +1,379 @@
+"""
+Key-value state shared by the workers serving the app.
+
+Each uvicorn worker is a separate process with its own caches and rate limit
+buckets. A shared backend lets workers reuse each other's formatted messages
+and channel index, and count Slack calls against one set of limits. Backends
+store strings with a TTL and provide an atomic counter; callers fall back to
+process-local state when a backend call fails.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+from ..exceptions import StateBackendError
+
+logger = logging.getLogger(__name__)
+
+
+class StateBackend(ABC):
+    """Strings with expiry and atomic counters, namespaced by a key prefix"""
+
+    # Whether other processes see the same state
+    shared = True
+
+    def __init__(self, prefix: Optional[str] = None):
+        self.prefix = (
+            prefix if prefix is not None else os.getenv("STATE_KEY_PREFIX", "kalos:")
+        )
+        self.errors = 0
+        self._last_error_logged = 0.0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Return a key's value, or None if it is missing or expired"""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: float):
+        """Store a value that expires after `ttl` seconds"""
+
+    @abstractmethod
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        """Set a key only if it does not exist, returning whether it was set"""
+
+    @abstractmethod
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter, expiring it `ttl` seconds after the last increment"""
+
+    async def close(self):
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"errors": self.errors}
+
+    def _failed(self, operation: str, error: Exception) -> StateBackendError:
+        self.errors += 1
+        now = time.monotonic()
+        if now - self._last_error_logged >= 10:
+            self._last_error_logged = now
+            logger.warning(
+                "%s state backend %s failed: %s", type(self).__name__, operation, error
+            )
+        return StateBackendError(f"State backend {operation} failed: {error}")
+
+
+class MemoryState(StateBackend):
+    """Process-local state; services keep their own in-process structures"""
+
+    shared = False
+
+    def __init__(self, prefix: Optional[str] = None, max_keys: int = 100000):
+        super().__init__(prefix)
+        self.max_keys = max_keys
+        self._entries: Dict[str, Tuple[str, float]] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._store(key, value, ttl)
+
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        self._store(key, value, ttl)
+        return True
+
+    async def incr(self, key: str, ttl: float) -> int:
+        count = int(await self.get(key) or 0) + 1
+        self._store(key, str(count), ttl)
+        return count
+
+    def _store(self, key: str, value: str, ttl: float):
+        if key not in self._entries and len(self._entries) >= self.max_keys:
+            now = time.time()
+            self._entries = {
+                name: entry for name, entry in self._entries.items() if entry[1] > now
+            }
+            if len(self._entries) >= self.max_keys:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (value, time.time() + ttl)
+
+
+class SQLiteState(StateBackend):
+    """
+    State in a SQLite file shared by the processes on one host.
+
+    WAL mode lets readers proceed during writes; counters are updated inside an
+    immediate transaction so concurrent workers never lose an increment.
+    """
+
+    def __init__(self, path: Optional[str] = None, prefix: Optional[str] = None):
+        super().__init__(prefix)
+        self.path = path or os.getenv("STATE_PATH", "state.db")
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._run("get", self._get, self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._run("set", self._set, self.prefix + key, value, ttl)
+
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        return await self._run("add", self._add, self.prefix + key, value, ttl)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        return await self._run("incr", self._incr, self.prefix + key, ttl)
+
+    async def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def _run(self, operation: str, func, *args):
+        try:
+            return await asyncio.to_thread(func, *args)
+        except sqlite3.Error as e:
+            raise self._failed(operation, e) from e
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            self._db = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS state "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+        return self._db
+
+    def _get(self, key: str) -> Optional[str]:
+        with self._db_lock:
+            row = (
+                self._connection()
+                .execute(
+                    "SELECT value FROM state WHERE key = ? AND expires_at > ?",
+                    (key, time.time()),
+                )
+                .fetchone()
+            )
+        return row[0] if row else None
+
+    def _set(self, key: str, value: str, ttl: float):
+        with self._db_lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._written()
+
+    def _add(self, key: str, value: str, ttl: float) -> bool:
+        now = time.time()
+        with self._db_lock:
+            cursor = self._connection().execute(
+                "INSERT INTO state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                "expires_at = excluded.expires_at WHERE state.expires_at <= ?",
+                (key, value, now + ttl, now),
+            )
+            self._written()
+        return cursor.rowcount > 0
+
+    def _incr(self, key: str, ttl: float) -> int:
+        now = time.time()
+        with self._db_lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT value FROM state WHERE key = ? AND expires_at > ?",
+                    (key, now),
+                ).fetchone()
+                count = int(row[0]) + 1 if row else 1
+                db.execute(
+                    "INSERT OR REPLACE INTO state (key, value, expires_at) "
+                    "VALUES (?, ?, ?)",
+                    (key, str(count), now + ttl),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._written()
+        return count
+
+    def _written(self):
+        # Counters for past rate limit windows accumulate; sweep them now and then
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._db.execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),))
+
+
+class RedisState(StateBackend):
+    """
+    State in Redis, or any server speaking the Redis protocol, shared across hosts.
+
+    Speaks RESP over one connection per worker; commands are serialised on it.
+    After a connection failure, calls fail fast for a second before reconnecting.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        prefix: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ):
+        super().__init__(prefix)
+        self.url = url or os.getenv("STATE_REDIS_URL", "redis://127.0.0.1:6379/0")
+        self.timeout = timeout or float(os.getenv("STATE_REDIS_TIMEOUT", "1"))
+        parsed = urlparse(self.url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+        self._retry_at = 0.0
+
+    async def get(self, key: str) -> Optional[str]:
+        (value,) = await self._execute("get", [("GET", self.prefix + key)])
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._execute(
+            "set", [("SET", self.prefix + key, value, "PX", _milliseconds(ttl))]
+        )
+
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        (reply,) = await self._execute(
+            "add", [("SET", self.prefix + key, value, "PX", _milliseconds(ttl), "NX")]
+        )
+        return reply is not None
+
+    async def incr(self, key: str, ttl: float) -> int:
+        key = self.prefix + key
+        count, _ = await self._execute(
+            "incr", [("INCR", key), ("PEXPIRE", key, _milliseconds(ttl))]
+        )
+        return count
+
+    async def close(self):
+        self._disconnect()
+
+    async def _execute(self, operation: str, commands: List[tuple]) -> list:
+        """Send commands in one write and read their replies in order"""
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    if time.monotonic() < self._retry_at:
+                        raise ConnectionError("reconnecting after a failure")
+                    await asyncio.wait_for(self._connect(), self.timeout)
+                self._writer.write(b"".join(_encode(command) for command in commands))
+                return await asyncio.wait_for(
+                    self._read_replies(len(commands)), self.timeout
+                )
+            except (OSError, EOFError, ValueError, RedisReplyError) as e:
+                if not isinstance(e, RedisReplyError):
+                    self._disconnect()
+                    self._retry_at = time.monotonic() + 1.0
+                raise self._failed(operation, e) from e
+            except asyncio.CancelledError:
+                # A reply may be left unread; start over on a new connection
+                self._disconnect()
+                raise
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._writer.write(b"".join(_encode(command) for command in setup))
+            await self._read_replies(len(setup))
+
+    async def _read_replies(self, count: int) -> list:
+        replies = [await _read_reply(self._reader) for _ in range(count)]
+        for reply in replies:
+            if isinstance(reply, RedisReplyError):
+                raise reply
+        return replies
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = None
+        self._writer = None
+
+
+class RedisReplyError(Exception):
+    """An error reply from the Redis server"""
+
+
+def _milliseconds(seconds: float) -> int:
+    return max(1, int(seconds * 1000))
+
+
+def _encode(command: tuple) -> bytes:
+    parts = [str(arg).encode("utf-8") for arg in command]
+    return b"".join(
+        [b"*%d\r\n" % len(parts)]
+        + [b"$%d\r\n%s\r\n" % (len(part), part) for part in parts]
+    )
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readuntil(b"\r\n")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        return RedisReplyError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode("utf-8")
+    if kind == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(length)]
+    raise OSError(f"Unexpected Redis reply: {line!r}")
+
+
+def open_state_backend(kind: Optional[str] = None) -> StateBackend:
+    """
+    Build the backend selected by STATE_BACKEND: `memory` (default), `sqlite`
+    (STATE_PATH) or `redis` (STATE_REDIS_URL)
+    """
+    kind = (kind or os.getenv("STATE_BACKEND", "memory")).lower()
+    if kind == "memory":
+        return MemoryState()
+    if kind == "sqlite":
+        return SQLiteState()
+    if kind == "redis":
+        return RedisState()
+    raise ValueError(f"Unknown STATE_BACKEND '{kind}'")
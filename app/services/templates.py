@@ -0,0 +1,79 @@
+"""
+Deterministic Blue-persona templates for formatting notifications without the LLM.
+"""
+
+from typing import List, Optional, Union
+from urllib.parse import quote, urlparse
+from ..types import NotificationType
+
+
+def _items(data: Union[str, List[str]]) -> List[str]:
+    return data if isinstance(data, list) else [data]
+
+
+def _escape(text: str) -> str:
+    """Escape the characters Slack mrkdwn treats as control characters"""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _link_url(url: str) -> str:
+    """
+    Percent-encode the characters that would end a `<url|label>` link early,
+    spaces and `|`, `<`, `>`, leaving reserved URL characters and existing
+    escapes as they are.
+    """
+    return _escape(quote(url, safe="/:?#[]@!$&'()*+,;=%~"))
+
+
+def _bullets(items: List[str]) -> str:
+    return "\n".join(f"• {_escape(item)}" for item in items)
+
+
+def _link_label(url: str) -> str:
+    """Turn a URL's last path segment into a button-like label"""
+    segment = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+    if not segment:
+        return url
+    return segment.replace("-", " ").replace("_", " ").capitalize()
+
+
+def _links(links: List[str]) -> str:
+    return "\n".join(f"<{_link_url(url)}|{_escape(_link_label(url))}>" for url in links)
+
+
+def render_template(
+    notification_type: NotificationType,
+    customer: str,
+    data: Union[str, List[str]],
+    campaign: Optional[str] = None,
+    links: Optional[List[str]] = None,
+) -> str:
+    """Render a notification as Slack mrkdwn in Blue's voice"""
+    items = _items(data)
+    links = links or []
+    customer = _escape(customer)
+    campaign = _escape(campaign) if campaign else campaign
+    campaign_text = f" for *{campaign}*" if campaign else ""
+
+    if notification_type == NotificationType.CHANGE:
+        message = (
+            f"Hi {customer} team! :wave: Here's what I took care of{campaign_text}:\n"
+            f"{_bullets(items)}"
+        )
+    elif notification_type == NotificationType.LEARNING:
+        source = f" from your *{campaign}* campaign" if campaign else ""
+        message = f":bulb: Some fresh insights{source}:\n{_bullets(items)}"
+    else:
+        message = (
+            f":rotating_light: *Action required*{campaign_text}\n{_bullets(items)}"
+        )
+
+    if links:
+        heading = (
+            "*Take action:*"
+            if notification_type == NotificationType.UPDATE
+            else "*Links:*"
+        )
+        message += f"\n\n{heading}\n{_links(links)}"
+
+    return message
@@ -0,0 +1,212 @@
+"""
+Graceful shutdown: drain in-flight notifications before the process exits.
+
+When the process is told to stop (SIGTERM from a deploy or scale-down), the
+coordinator starts draining: new notifications are turned away with 503 so
+clients retry against another instance, `/ready` reports not-ready, and
+deliveries already under way get until SHUTDOWN_DEADLINE to finish. Deliveries
+still running at the deadline are cancelled and written to the outbox, whose
+unfinished jobs the next instance sharing OUTBOX_PATH resumes.
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Set, TypeVar
+from starlette.responses import JSONResponse
+from .exceptions import DeliveryDeferredError
+from .types import NotificationRequest
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DRAINED_PATHS = ("/notify", "/notify/batch", "/notify/stream")
+SHUTDOWN_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+
+class ShutdownCoordinator:
+    """
+    Tracks in-flight deliveries and drains them on shutdown.
+
+    Configured by SHUTDOWN_DEADLINE, seconds from the start of draining until
+    unfinished deliveries are moved to the outbox (default 20; keep it below
+    the orchestrator's kill timeout), and SHUTDOWN_READINESS_DELAY, seconds to
+    keep the listener open reporting not-ready before the server stops
+    accepting connections (default 0).
+    """
+
+    def __init__(
+        self,
+        deadline: Optional[float] = None,
+        readiness_delay: Optional[float] = None,
+    ):
+        self.deadline = (
+            deadline
+            if deadline is not None
+            else float(os.getenv("SHUTDOWN_DEADLINE", "20"))
+        )
+        self.readiness_delay = (
+            readiness_delay
+            if readiness_delay is not None
+            else float(os.getenv("SHUTDOWN_READINESS_DELAY", "0"))
+        )
+        self.draining = False
+        self.expired = False
+        self.deferred = 0
+        self._deadline_at: Optional[float] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Dict[asyncio.Task, NotificationRequest] = {}
+        self._expired_tasks: Set[asyncio.Task] = set()
+        self._active = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._restore: Dict[int, Callable] = {}
+        self._signalled = False
+
+    def begin(self):
+        """Stop admitting notifications and start the drain deadline"""
+        if self.draining:
+            return
+        self.draining = True
+        loop = asyncio.get_running_loop()
+        self._deadline_at = loop.time() + self.deadline
+        self._timer = loop.call_later(self.deadline, self._expire)
+        logger.info(
+            "Draining %d in-flight notifications, deadline %ss",
+            len(self._in_flight),
+            self.deadline,
+        )
+
+    def remaining(self) -> float:
+        """Seconds left before the drain deadline"""
+        if self._deadline_at is None:
+            return self.deadline
+        return max(0.0, self._deadline_at - asyncio.get_running_loop().time())
+
+    async def run(
+        self,
+        request: NotificationRequest,
+        delivery: Callable[[], Awaitable[T]],
+        outbox,
+    ) -> T:
+        """
+        Deliver a notification, moving it to the outbox if the drain deadline
+        passes first.
+
+        Raises:
+            DeliveryDeferredError: With the outbox job ID when the delivery was
+                cut off by the deadline
+        """
+        task = asyncio.create_task(delivery())
+        self._in_flight[task] = request
+        self._active += 1
+        self._idle.clear()
+        if self.expired:
+            self._expired_tasks.add(task)
+            task.cancel()
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task not in self._expired_tasks or asyncio.current_task().cancelling():
+                raise
+            # The notification may already have been posted; delivery from the
+            # outbox is at-least-once
+            job_id = await outbox.enqueue(request)
+            self.deferred += 1
+            logger.warning(
+                "Deferred notification for %s to outbox job %s at shutdown",
+                request.customer,
+                job_id,
+                extra={"customer": request.customer, "job_id": job_id},
+            )
+            raise DeliveryDeferredError(job_id)
+        finally:
+            self._in_flight.pop(task, None)
+            self._expired_tasks.discard(task)
+            self._active -= 1
+            if not self._active:
+                self._idle.set()
+
+    async def drain(self):
+        """Begin draining and wait until every in-flight delivery has settled"""
+        self.begin()
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.remaining())
+        except asyncio.TimeoutError:
+            self._expire()
+            await self._idle.wait()
+        if self._timer is not None:
+            self._timer.cancel()
+        if self.deferred:
+            logger.warning("Deferred %d notifications to the outbox", self.deferred)
+
+    def _expire(self):
+        if self.expired:
+            return
+        self.expired = True
+        for task in self._in_flight:
+            if not task.done():
+                self._expired_tasks.add(task)
+                task.cancel()
+
+    def install_signal_handlers(self):
+        """
+        Start draining as soon as the server is told to stop.
+
+        The server's own SIGTERM/SIGINT handlers are kept and called after
+        SHUTDOWN_READINESS_DELAY; a second signal goes straight to them. Only
+        the main thread can install handlers, and only handlers installed by
+        the server (e.g. uvicorn's) are chained.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        for sig in SHUTDOWN_SIGNALS:
+            previous = signal.getsignal(sig)
+            if not callable(previous) or previous is signal.default_int_handler:
+                continue
+
+            def handle(signum, frame, previous=previous):
+                if self._signalled:
+                    previous(signum, frame)
+                    return
+                self._signalled = True
+                loop.call_soon_threadsafe(self.begin)
+                loop.call_soon_threadsafe(
+                    loop.call_later, self.readiness_delay, previous, signum, frame
+                )
+
+            signal.signal(sig, handle)
+            self._restore[sig] = previous
+
+    def restore_signal_handlers(self):
+        for sig, previous in self._restore.items():
+            signal.signal(sig, previous)
+        self._restore.clear()
+
+
+class ShutdownMiddleware:
+    """ASGI middleware turning away new notifications with 503 while draining"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] in DRAINED_PATHS
+        ):
+            coordinator = getattr(scope["app"].state, "shutdown", None)
+            if coordinator is not None and coordinator.draining:
+                response = JSONResponse(
+                    {"detail": "Service is shutting down"},
+                    status_code=503,
+                    headers={"Retry-After": "1", "Connection": "close"},
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
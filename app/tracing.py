@@ -0,0 +1,326 @@
+"""
+In-process request tracing.
+
+Each traced request gets a tree of spans timing its stages (formatting, the LLM
+call, Slack rate limiting, posting, retries and alerts). The trace ID comes from
+an incoming `traceparent` or `X-Trace-Id` header, or is generated, and is
+returned in the `X-Trace-Id` response header. Only a sampled fraction of
+requests record spans; for the rest `span()` costs one context variable lookup.
+Completed traces are kept in a ring buffer for `GET /debug/traces` and can also
+be appended to a rotating JSON lines file.
+"""
+
+import asyncio
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from .logs import DeferredQueueHandler
+
+TRACED_PATHS = ("/notify", "/notify/batch")
+TRACE_ID_HEADER = "x-trace-id"
+TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+_trace_id: ContextVar[Optional[str]] = ContextVar("trace_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed stage of a request"""
+
+    __slots__ = ("name", "attributes", "children", "started", "duration", "status")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.children: List["Span"] = []
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def end(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round((self.started - origin) * 1000, 3),
+            "duration_ms": (
+                round(self.duration * 1000, 3) if self.duration is not None else None
+            ),
+            "status": self.status,
+            "attributes": dict(self.attributes),
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+class Tracer:
+    """
+    Samples requests, records their spans and exports completed traces.
+
+    Configured by TRACE_SAMPLE_RATE (default 0.01), TRACE_BUFFER_SIZE traces kept
+    in memory (default 500), and TRACE_PATH to also append traces to a JSON lines
+    file rotated at TRACE_FILE_MAX_BYTES (default 10 MiB) with
+    TRACE_FILE_BACKUPS old files (default 3).
+    """
+
+    def __init__(
+        self,
+        sample_rate: Optional[float] = None,
+        buffer_size: Optional[int] = None,
+        path: Optional[str] = None,
+    ):
+        self.sample_rate = (
+            sample_rate
+            if sample_rate is not None
+            else float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+        )
+        self.buffer_size = buffer_size or int(os.getenv("TRACE_BUFFER_SIZE", "500"))
+        self.path = path or os.getenv("TRACE_PATH")
+        self.max_bytes = int(os.getenv("TRACE_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+        self.backups = int(os.getenv("TRACE_FILE_BACKUPS", "3"))
+        self.traces: Deque[Dict[str, Any]] = deque(maxlen=self.buffer_size)
+        self.sampled = 0
+        self._file: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    @contextmanager
+    def trace(
+        self,
+        name: str,
+        trace_id: Optional[str] = None,
+        sampled: Optional[bool] = None,
+        **attributes,
+    ) -> Iterator[Optional[Span]]:
+        """
+        Run a request under a trace ID, recording spans if it is sampled.
+
+        Yields the root span, or None when the request is not sampled.
+        """
+        trace_id = trace_id or uuid.uuid4().hex
+        if sampled is None:
+            sampled = random.random() < self.sample_rate
+        id_token = _trace_id.set(trace_id)
+        if not sampled:
+            try:
+                yield None
+            finally:
+                _trace_id.reset(id_token)
+            return
+
+        self.sampled += 1
+        root = Span(name, attributes)
+        started_at = time.time()
+        span_token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            _fail(root, e)
+            raise
+        finally:
+            root.end()
+            _current_span.reset(span_token)
+            _trace_id.reset(id_token)
+            self.export(
+                {"trace_id": trace_id, "timestamp": started_at}
+                | root.to_dict(root.started)
+            )
+
+    def export(self, trace: Dict[str, Any]):
+        """Keep a completed trace in the ring buffer and the trace file"""
+        self.traces.append(trace)
+        if self.path:
+            self._trace_file().info(trace)
+
+    def recent(
+        self, limit: int = 50, min_duration_ms: float = 0.0, status: str = None
+    ) -> List[Dict[str, Any]]:
+        """Most recent traces first, optionally only slow or failed ones"""
+        matches = []
+        for trace in reversed(self.traces):
+            if trace["duration_ms"] < min_duration_ms:
+                continue
+            if status is not None and trace["status"] != status:
+                continue
+            matches.append(trace)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for trace in reversed(self.traces):
+            if trace["trace_id"] == trace_id:
+                return trace
+        return None
+
+    def close(self):
+        """Write out traces queued for the trace file"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+            self._file = None
+
+    def _trace_file(self) -> logging.Logger:
+        if self._file is None:
+            output = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups
+            )
+            output.setFormatter(TraceFormatter())
+            records: queue.SimpleQueue = queue.SimpleQueue()
+            self._listener = logging.handlers.QueueListener(records, output)
+            self._listener.start()
+            self._file = logging.getLogger(f"{__name__}.export")
+            self._file.propagate = False
+            self._file.setLevel(logging.INFO)
+            for existing in list(self._file.handlers):
+                self._file.removeHandler(existing)
+            self._file.addHandler(DeferredQueueHandler(records))
+        return self._file
+
+
+class TraceFormatter(logging.Formatter):
+    """Writes the trace dict carried as the record's message as one JSON line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, default=str)
+
+
+class _NoopSpan:
+    """Stands in for span() when the request is not being traced"""
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+class _ActiveSpan:
+    __slots__ = ("parent", "span", "token")
+
+    def __init__(self, parent: Span, name: str, attributes: Dict[str, Any]):
+        self.parent = parent
+        self.span = Span(name, attributes)
+
+    def __enter__(self) -> Span:
+        self.parent.children.append(self.span)
+        self.span.started = time.perf_counter()
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        if exc is not None:
+            _fail(self.span, exc)
+        self.span.end()
+        _current_span.reset(self.token)
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """
+    Context manager timing a stage as a child of the current span.
+
+    Yields None, and records nothing, when the request is not being traced.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NOOP_SPAN
+    return _ActiveSpan(parent, name, attributes)
+
+
+def annotate(**attributes):
+    """Add attributes to the current span, if the request is being traced"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def parse_trace_headers(headers) -> tuple:
+    """
+    Trace ID and sampling decision from incoming headers.
+
+    A W3C `traceparent` supplies both; an `X-Trace-Id` only the ID, leaving
+    the sampling decision to the tracer.
+    """
+    traceparent = headers.get("traceparent")
+    if traceparent:
+        parts = traceparent.strip().split("-")
+        if len(parts) == 4 and len(parts[1]) == 32 and len(parts[3]) == 2:
+            try:
+                return parts[1], bool(int(parts[3], 16) & 1)
+            except ValueError:
+                pass
+    trace_id = headers.get(TRACE_ID_HEADER)
+    if trace_id and TRACE_ID_PATTERN.match(trace_id):
+        return trace_id, None
+    return None, None
+
+
+def _fail(span: Span, error: BaseException):
+    span.status = "cancelled" if isinstance(error, asyncio.CancelledError) else "error"
+    span.attributes["error"] = f"{type(error).__name__}: {error}"
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that traces requests to TRACED_PATHS.
+
+    Request parsing and validation happen inside the root span, so the gap
+    before its first child is time spent before the endpoint ran.
+    """
+
+    def __init__(self, app, tracer: Optional[Tracer] = None):
+        self.app = app
+        self._tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in TRACED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {
+            key.decode("latin-1"): value.decode("latin-1")
+            for key, value in scope["headers"]
+        }
+        trace_id, sampled = parse_trace_headers(headers)
+        with (self._tracer or tracer).trace(
+            f"{scope['method']} {scope['path']}", trace_id, sampled
+        ) as root:
+            trace_id = current_trace_id()
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = [
+                        *message.get("headers", []),
+                        (TRACE_ID_HEADER.encode(), trace_id.encode()),
+                    ]
+                    if root is not None:
+                        root.set(status_code=message["status"])
+                        if message["status"] >= 500:
+                            root.status = "error"
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
+
+
+tracer = Tracer()
@@ -9,12 +9,26 @@ class NotificationType(str, Enum):
     UPDATE = "update"
 
 
+class FormatMode(str, Enum):
+    LLM = "llm"
+    TEMPLATE = "template"
+    AUTO = "auto"
+
+
+class Priority(str, Enum):
+    HIGH = "high"
+    NORMAL = "normal"
+    LOW = "low"
+
+
 class NotificationRequest(BaseModel):
     type: NotificationType
     customer: str
     campaign: Optional[str] = None
     data: Union[str, List[str]]
     links: List[str] = []
+    mode: Optional[FormatMode] = None
+    priority: Optional[Priority] = None
 
 
 class NotificationResponse(BaseModel):
@@ -22,3 +36,23 @@ class NotificationResponse(BaseModel):
     success: bool
     message_id: Optional[str] = None
     error: Optional[str] = None
+    job_id: Optional[str] = None
+    index: Optional[int] = None
+    trace_id: Optional[str] = None
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+
+class NotificationJob(BaseModel):
+    job_id: str
+    status: JobStatus
+    attempts: int = 0
+    message_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Measure import time and cold-start latency of the service.
+
+Each run uses a fresh interpreter: the import benchmark times `import app.main`
+and lists the slowest modules from `-X importtime`; the startup benchmark launches
+uvicorn against the local fake Slack and times the first /health response and
+the moment services report ready, with and without LAZY_STARTUP.
+
+Usage:
+    python -m benchmarks.cold_start --runs 5
+    python -m benchmarks.cold_start --json > cold_start.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+import httpx
+from benchmarks.fake_slack import FakeSlack
+from benchmarks.load_test import _free_port
+
+IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure_import(runs: int, top: int = 10) -> Dict:
+    """Median wall time of `import app.main` and its slowest top-level imports"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import time; t = time.perf_counter(); import app.main; "
+                "print(time.perf_counter() - t)",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        # Only direct imports of app modules and their immediate dependencies
+        if match and len(match.group(2)) <= 3:
+            modules.append((match.group(3), int(match.group(1)) / 1e6))
+    modules.sort(key=lambda item: item[1], reverse=True)
+
+    return {
+        "median_seconds": round(statistics.median(timings), 4),
+        "runs": [round(timing, 4) for timing in timings],
+        "slowest_modules": [
+            {"module": name, "seconds": round(seconds, 4)}
+            for name, seconds in modules[:top]
+        ],
+    }
+
+
+async def measure_startup(lazy: bool, slack_url: str, timeout: float = 60) -> Dict:
+    """Seconds from process launch to the first /health answer and to ready"""
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {
+            **os.environ,
+            "SLACK_API_URL": slack_url,
+            "SLACK_BOT_TOKEN": "xoxb-benchmark",
+            "OUTBOX_PATH": os.path.join(workdir, "outbox.db"),
+            "LAZY_STARTUP": "true" if lazy else "false",
+        }
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+            env=env,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        first_health = None
+        ready = None
+        try:
+            async with httpx.AsyncClient(timeout=1) as client:
+                while ready is None and time.perf_counter() - started < timeout:
+                    try:
+                        response = await client.get(f"http://127.0.0.1:{port}/health")
+                    except httpx.HTTPError:
+                        await asyncio.sleep(0.01)
+                        continue
+                    now = time.perf_counter() - started
+                    first_health = first_health or now
+                    if response.json().get("ready"):
+                        ready = now
+                    else:
+                        await asyncio.sleep(0.01)
+        finally:
+            process.terminate()
+            await process.wait()
+
+    return {
+        "lazy": lazy,
+        "first_health_seconds": round(first_health, 4) if first_health else None,
+        "ready_seconds": round(ready, 4) if ready else None,
+    }
+
+
+async def run(runs: int) -> Dict:
+    slack = FakeSlack(customers=["hsbc"])
+    slack_url = await slack.start()
+    try:
+        startup: List[Dict] = []
+        for lazy in (False, True):
+            startup.append(await measure_startup(lazy, slack_url))
+    finally:
+        await slack.stop()
+    return {"import": measure_import(runs), "startup": startup}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Import timing runs")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args.runs))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    imports = report["import"]
+    print(f"import app.main: median {imports['median_seconds']}s over {args.runs} runs")
+    for module in imports["slowest_modules"]:
+        print(f"  {module['seconds']:>8.4f}s  {module['module']}")
+    for result in report["startup"]:
+        mode = "lazy" if result["lazy"] else "eager"
+        print(
+            f"{mode} startup: first /health {result['first_health_seconds']}s, "
+            f"ready {result['ready_seconds']}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
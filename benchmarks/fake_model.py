@@ -0,0 +1,89 @@
+"""
+Agents SDK model that answers locally after a configurable delay.
+"""
+
+import asyncio
+import json
+import random
+from typing import AsyncIterator
+from agents.items import ModelResponse
+from agents.models.interface import Model
+from agents.usage import Usage
+from openai.types.responses import ResponseOutputMessage, ResponseOutputText
+
+
+class FakeModel(Model):
+    """
+    Stands in for the OpenAI model behind the Blue agent.
+
+    Plain-text requests get a short message back; structured batch requests get
+    one message per notification index, so the micro-batching path is exercised.
+    """
+
+    def __init__(
+        self, latency: float = 0.5, jitter: float = 0.0, error_ratio: float = 0.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_ratio = error_ratio
+        self.calls = 0
+
+    def __str__(self) -> str:
+        return "fake-model"
+
+    async def get_response(
+        self,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        tracing,
+        *,
+        previous_response_id=None,
+        conversation_id=None,
+        prompt=None,
+    ) -> ModelResponse:
+        self.calls += 1
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(0, self.jitter)))
+        if random.random() < self.error_ratio:
+            raise RuntimeError("Fake model error")
+
+        text = input if isinstance(input, str) else json.dumps(input)
+        if output_schema is not None and not output_schema.is_plain_text():
+            notifications = json.loads(text)
+            text = json.dumps(
+                {
+                    "messages": [
+                        {
+                            "index": item["index"],
+                            "message": f"Hi {item['customer']}! {item['data']}",
+                        }
+                        for item in notifications
+                    ]
+                }
+            )
+        else:
+            text = f"Hi from Blue! {text[:200]}"
+
+        return ModelResponse(
+            output=[
+                ResponseOutputMessage(
+                    id="msg_fake",
+                    type="message",
+                    role="assistant",
+                    status="completed",
+                    content=[
+                        ResponseOutputText(
+                            type="output_text", text=text, annotations=[]
+                        )
+                    ],
+                )
+            ],
+            usage=Usage(requests=1),
+            response_id=None,
+        )
+
+    def stream_response(self, *args, **kwargs) -> AsyncIterator:
+        raise NotImplementedError("FakeModel does not stream")
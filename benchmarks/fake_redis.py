@@ -0,0 +1,106 @@
+"""
+Local stand-in for the Redis commands the shared state backend uses.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class FakeRedis:
+    """
+    Serves GET, SET (PX, NX), INCR, PEXPIRE, DEL, PING, AUTH and SELECT over RESP.
+
+    Keys live in one in-memory dict regardless of the selected database.
+    """
+
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+        self.url: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the URL to use as STATE_REDIS_URL"""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        bound_port = self._server.sockets[0].getsockname()[1]
+        self.url = f"redis://{host}:{bound_port}/0"
+        return self.url
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                command = await self._read_command(reader)
+                self.commands += 1
+                writer.write(self._execute(command))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> List[bytes]:
+        header = await reader.readuntil(b"\r\n")
+        count = int(header[1:-2])
+        args = []
+        for _ in range(count):
+            length = int((await reader.readuntil(b"\r\n"))[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    def _execute(self, args: List[bytes]) -> bytes:
+        name = args[0].upper()
+        if name in (b"PING", b"AUTH", b"SELECT"):
+            return b"+OK\r\n" if name != b"PING" else b"+PONG\r\n"
+        if name == b"GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else _bulk(value)
+        if name == b"SET":
+            key, value, options = args[1], args[2], [a.upper() for a in args[3:]]
+            if b"NX" in options and self._get(key) is not None:
+                return b"$-1\r\n"
+            expires_at = None
+            if b"PX" in options:
+                expires_at = (
+                    time.monotonic() + int(args[3 + options.index(b"PX") + 1]) / 1000
+                )
+            self.data[key] = (value, expires_at)
+            return b"+OK\r\n"
+        if name == b"INCR":
+            current = self._get(args[1])
+            try:
+                count = int(current or 0) + 1
+            except ValueError:
+                return b"-ERR value is not an integer or out of range\r\n"
+            expires_at = self.data[args[1]][1] if current is not None else None
+            self.data[args[1]] = (str(count).encode(), expires_at)
+            return b":%d\r\n" % count
+        if name == b"PEXPIRE":
+            if self._get(args[1]) is None:
+                return b":0\r\n"
+            value = self.data[args[1]][0]
+            self.data[args[1]] = (value, time.monotonic() + int(args[2]) / 1000)
+            return b":1\r\n"
+        if name == b"DEL":
+            removed = sum(1 for key in args[1:] if self.data.pop(key, None))
+            return b":%d\r\n" % removed
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return entry[0]
+
+
+def _bulk(value: bytes) -> bytes:
+    return b"$%d\r\n%s\r\n" % (len(value), value)
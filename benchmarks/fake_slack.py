@@ -0,0 +1,108 @@
+"""
+Local stand-in for the Slack Web API methods the service calls.
+"""
+
+import asyncio
+import random
+from typing import Dict, Iterable, Optional
+from aiohttp import web
+
+
+class FakeSlack:
+    """
+    Serves auth.test, conversations.list and chat.postMessage over HTTP.
+
+    Every customer channel exists except those listed as missing, which are left
+    out of conversations.list and answer chat.postMessage with channel_not_found.
+    """
+
+    def __init__(
+        self,
+        customers: Iterable[str],
+        missing: Iterable[str] = (),
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        rate_limit_ratio: float = 0.0,
+        retry_after: int = 1,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.missing = {f"{customer.lower()}-private" for customer in missing}
+        names = ["kalos-internal"] + [
+            f"{customer.lower()}-private" for customer in customers
+        ]
+        self.channels: Dict[str, str] = {
+            name: f"C{index:08d}"
+            for index, name in enumerate(names)
+            if name not in self.missing
+        }
+        self._ids = set(self.channels.values())
+        self.posted = 0
+        self.rate_limited = 0
+        self.not_found = 0
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+        self.app = web.Application()
+        self.app.router.add_route("*", "/api/auth.test", self.auth_test)
+        self.app.router.add_route("*", "/api/conversations.list", self.list_channels)
+        self.app.router.add_route("*", "/api/chat.postMessage", self.post_message)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL to use as SLACK_API_URL"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{bound_port}/api/"
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def auth_test(self, request: web.Request) -> web.Response:
+        return web.json_response({"ok": True, "team": "bench", "user_id": "UBENCH"})
+
+    async def list_channels(self, request: web.Request) -> web.Response:
+        channels = [
+            {"id": channel_id, "name": name}
+            for name, channel_id in self.channels.items()
+        ]
+        return web.json_response(
+            {"ok": True, "channels": channels, "response_metadata": {}}
+        )
+
+    async def post_message(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(0, self.jitter)))
+
+        if random.random() < self.rate_limit_ratio:
+            self.rate_limited += 1
+            return web.json_response(
+                {"ok": False, "error": "ratelimited"},
+                status=429,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        channel = params.get("channel", "")
+        if channel not in self._ids and channel not in self.channels:
+            self.not_found += 1
+            return web.json_response({"ok": False, "error": "channel_not_found"})
+
+        self.posted += 1
+        return web.json_response(
+            {"ok": True, "channel": channel, "ts": f"{self.posted}.000000"}
+        )
+
+    async def _params(self, request: web.Request) -> Dict[str, str]:
+        params = dict(request.query)
+        if request.content_type == "application/json":
+            params.update(await request.json())
+        elif request.can_read_body:
+            params.update(await request.post())
+        return params
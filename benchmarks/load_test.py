@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Drive /notify at a fixed request rate against local Slack and LLM stand-ins.
+
+The app, the fake Slack server and the load generator share one event loop, so
+results are comparable between runs on the same machine rather than absolute.
+
+Usage:
+    python -m benchmarks.load_test --rate 50 --duration 10 --llm-latency 0.8
+    python -m benchmarks.load_test --env SLACK_METHOD_RATE=1000 --json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+import httpx
+import uvicorn
+from benchmarks.fake_model import FakeModel
+from benchmarks.fake_slack import FakeSlack
+
+NOTIFICATION_TYPES = ("change", "learning", "update")
+
+
+@dataclass
+class BenchmarkConfig:
+    rate: float = 10.0
+    duration: float = 10.0
+    customers: int = 200
+    missing_ratio: float = 0.0
+    slack_latency: float = 0.05
+    slack_jitter: float = 0.0
+    rate_limit_ratio: float = 0.0
+    llm_latency: float = 0.5
+    llm_jitter: float = 0.0
+    llm_error_ratio: float = 0.0
+    mode: Optional[str] = None
+    async_delivery: bool = False
+    connections: int = 500
+    verbose: bool = False
+    env: Dict[str, str] = field(default_factory=dict)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of the values, 0 when there are none"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+@contextmanager
+def patched_env(values: Dict[str, str]):
+    saved = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _build_request(index: int, config: BenchmarkConfig) -> Dict:
+    payload = {
+        "type": NOTIFICATION_TYPES[index % len(NOTIFICATION_TYPES)],
+        "customer": f"customer-{index % config.customers}",
+        "campaign": "Benchmark",
+        # Unique data so the format cache does not hide LLM latency
+        "data": [f"Added {index} new prospects", "Reviewed 3 sequences"],
+        "links": ["https://app.kalos.com/campaigns/benchmark"],
+    }
+    if config.mode:
+        payload["mode"] = config.mode
+    return payload
+
+
+async def _send(
+    client: httpx.AsyncClient, payload: Dict, async_delivery: bool
+) -> Tuple[float, str]:
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            "/notify",
+            json=payload,
+            params={"async": "true"} if async_delivery else None,
+        )
+        outcome = str(response.status_code)
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - started, outcome
+
+
+async def run_benchmark(config: BenchmarkConfig) -> Dict:
+    """Run one load test and return the report"""
+    customers = [f"customer-{index}" for index in range(config.customers)]
+    missing = customers[: round(config.customers * config.missing_ratio)]
+    slack = FakeSlack(
+        customers,
+        missing=missing,
+        latency=config.slack_latency,
+        jitter=config.slack_jitter,
+        rate_limit_ratio=config.rate_limit_ratio,
+    )
+    model = FakeModel(config.llm_latency, config.llm_jitter, config.llm_error_ratio)
+    slack_url = await slack.start()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {
+            "SLACK_API_URL": slack_url,
+            "SLACK_BOT_TOKEN": "xoxb-benchmark",
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-benchmark"),
+            "OPENAI_AGENTS_DISABLE_TRACING": "1",
+            "OUTBOX_PATH": os.path.join(workdir, "outbox.db"),
+            **config.env,
+        }
+        with patched_env(env):
+            from app.main import app
+
+            # Per-request logs would dominate the run; the report counts outcomes
+            logging.getLogger().setLevel(
+                logging.WARNING if config.verbose else logging.CRITICAL
+            )
+            port = _free_port()
+            server = uvicorn.Server(
+                uvicorn.Config(
+                    app,
+                    host="127.0.0.1",
+                    port=port,
+                    log_level="warning",
+                    access_log=False,
+                )
+            )
+            serving = asyncio.create_task(server.serve())
+            while not server.started:
+                if serving.done():
+                    await serving
+                    raise RuntimeError("Benchmark server failed to start")
+                await asyncio.sleep(0.01)
+
+            formatter = app.state.services.message_formatter
+            formatter.agent = formatter.agent.clone(model=model)
+            formatter.batcher.agent = formatter.batcher.agent.clone(model=model)
+
+            try:
+                results, elapsed = await _drive(port, config)
+                report = _report(config, results, elapsed)
+                report["service"] = {
+                    "format_paths": dict(formatter.path_counts),
+                    "slack_rate_limiter": app.state.services.slack_service.rate_limiter.stats(),
+                }
+            finally:
+                server.should_exit = True
+                await serving
+                await slack.stop()
+
+    report["fake_slack"] = {
+        "posted": slack.posted,
+        "rate_limited": slack.rate_limited,
+        "channel_not_found": slack.not_found,
+    }
+    report["fake_model_calls"] = model.calls
+    return report
+
+
+async def _drive(
+    port: int, config: BenchmarkConfig
+) -> Tuple[List[Tuple[float, str]], float]:
+    """Send requests open-loop: arrivals follow the schedule, not the responses"""
+    total = max(1, int(config.rate * config.duration))
+    limits = httpx.Limits(
+        max_connections=config.connections,
+        max_keepalive_connections=config.connections,
+    )
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120
+    ) as client:
+        started = time.perf_counter()
+        tasks = []
+        for index in range(total):
+            delay = started + index / config.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(
+                asyncio.create_task(
+                    _send(client, _build_request(index, config), config.async_delivery)
+                )
+            )
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+    return results, elapsed
+
+
+def _report(
+    config: BenchmarkConfig, results: List[Tuple[float, str]], elapsed: float
+) -> Dict:
+    latencies = [latency for latency, _ in results]
+    outcomes = Counter(outcome for _, outcome in results)
+    succeeded = outcomes["200"] + outcomes["202"]
+    return {
+        "config": asdict(config),
+        "requests": len(results),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 4),
+            "p95": round(percentile(latencies, 95), 4),
+            "p99": round(percentile(latencies, 99), 4),
+            "max": round(max(latencies, default=0.0), 4),
+        },
+        "error_rate": round(1 - succeeded / len(results), 4) if results else 0.0,
+        "outcomes": dict(outcomes),
+    }
+
+
+def _print_report(report: Dict):
+    latency = report["latency_seconds"]
+    print(
+        f"{report['requests']} requests in {report['elapsed_seconds']}s "
+        f"({report['throughput_rps']} req/s)"
+    )
+    print(
+        f"latency p50={latency['p50']}s p95={latency['p95']}s "
+        f"p99={latency['p99']}s max={latency['max']}s"
+    )
+    print(f"error rate {report['error_rate']:.2%}, outcomes {report['outcomes']}")
+    print(f"format paths {report['service']['format_paths']}")
+    print(f"slack rate limiter {report['service']['slack_rate_limiter']}")
+    print(
+        f"fake slack {report['fake_slack']}, model calls {report['fake_model_calls']}"
+    )
+
+
+def main():
+    defaults = BenchmarkConfig()
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--rate", type=float, default=defaults.rate, help="Requests per second"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=defaults.duration, help="Seconds of load"
+    )
+    parser.add_argument("--customers", type=int, default=defaults.customers)
+    parser.add_argument(
+        "--missing-ratio",
+        type=float,
+        default=defaults.missing_ratio,
+        help="Share of customers without a Slack channel",
+    )
+    parser.add_argument("--slack-latency", type=float, default=defaults.slack_latency)
+    parser.add_argument("--slack-jitter", type=float, default=defaults.slack_jitter)
+    parser.add_argument(
+        "--rate-limit-ratio",
+        type=float,
+        default=defaults.rate_limit_ratio,
+        help="Share of chat.postMessage calls answered with HTTP 429",
+    )
+    parser.add_argument("--llm-latency", type=float, default=defaults.llm_latency)
+    parser.add_argument("--llm-jitter", type=float, default=defaults.llm_jitter)
+    parser.add_argument(
+        "--llm-error-ratio", type=float, default=defaults.llm_error_ratio
+    )
+    parser.add_argument("--mode", choices=("llm", "template", "auto"))
+    parser.add_argument("--async", dest="async_delivery", action="store_true")
+    parser.add_argument("--connections", type=int, default=defaults.connections)
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="Service setting to override, e.g. SLACK_METHOD_RATE=1000",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show service warnings and errors"
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    options = vars(args)
+    as_json = options.pop("json")
+    options["env"] = dict(item.split("=", 1) for item in options["env"])
+    report = asyncio.run(run_benchmark(BenchmarkConfig(**options)))
+    if as_json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Measure the per-request cost of logging on the event loop thread.
+
+Replays the INFO logs of one successful /notify (received, formatted, posted)
+under the old `logging.basicConfig` handler with f-strings and under the queued
+JSON pipeline from `app.logs`, with and without sampling. Output goes to a temp
+file, and again to a slow sink that stalls on every flush like a backed-up log
+pipe; the reported mean and p99 are the time the calling thread (the event loop
+in the service) spends per request.
+
+Usage:
+    python -m benchmarks.logging_overhead --requests 20000
+    python -m benchmarks.logging_overhead --sink-delay 0.001 --json
+"""
+
+import argparse
+import json
+import logging
+import tempfile
+import time
+from typing import Callable, Dict, List
+from app.logs import configure_logging, shutdown_logging
+from benchmarks.load_test import patched_env, percentile
+
+CUSTOMER = "hsbc"
+CHANNEL = "hsbc-private"
+
+
+def eager_request():
+    """Log calls as they were before structured logging"""
+    logging.getLogger("app.routers.notifications").info(
+        f"Received notification request for customer {CUSTOMER}, type change"
+    )
+    logging.getLogger("app.services.message_formatter").info(
+        f"Successfully formatted change message for {CUSTOMER}"
+    )
+    logging.getLogger("app.services.slack_client").info(
+        f"Successfully posted message to {CHANNEL}"
+    )
+
+
+def lazy_request():
+    """Log calls as the service makes them now"""
+    logging.getLogger("app.routers.notifications").info(
+        "Received notification request for customer %s, type %s",
+        CUSTOMER,
+        "change",
+        extra={"customer": CUSTOMER, "notification_type": "change"},
+    )
+    logging.getLogger("app.services.message_formatter").info(
+        "Successfully formatted %s message for %s",
+        "change",
+        CUSTOMER,
+        extra={"customer": CUSTOMER, "format_path": "llm"},
+    )
+    logging.getLogger("app.services.slack_client").info(
+        "Successfully posted message to %s",
+        CHANNEL,
+        extra={"customer": CUSTOMER, "channel": CHANNEL},
+    )
+
+
+class SlowStream:
+    """File wrapper whose flush stalls, like a pipe whose reader has fallen behind"""
+
+    def __init__(self, stream, delay: float):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text: str):
+        self.stream.write(text)
+
+    def flush(self):
+        if self.delay:
+            time.sleep(self.delay)
+        self.stream.flush()
+
+
+def time_requests(emit: Callable[[], None], requests: int) -> Dict[str, float]:
+    """Mean and p99 microseconds per request spent in the calling thread"""
+    timings: List[float] = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        emit()
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return {
+        "mean_us": round(sum(timings) / len(timings), 2),
+        "p99_us": round(percentile(timings, 99), 2),
+    }
+
+
+def run(requests: int, sink_delay: float) -> Dict[str, Dict[str, float]]:
+    results = {}
+    root = logging.getLogger()
+    with tempfile.TemporaryDirectory() as workdir:
+        for sink, delay, count in (
+            ("file", 0.0, requests),
+            ("slow sink", sink_delay, max(1, requests // 20)),
+        ):
+            with open(f"{workdir}/basic.log", "w") as output:
+                shutdown_logging()
+                for existing in list(root.handlers):
+                    root.removeHandler(existing)
+                logging.basicConfig(
+                    level=logging.INFO, stream=SlowStream(output, delay), force=True
+                )
+                results[f"{sink}: basicConfig, f-strings"] = time_requests(
+                    eager_request, count
+                )
+
+            for name, rates in (
+                ("queued JSON, lazy", ""),
+                ("queued JSON, 1% sampled", "app=0.01"),
+            ):
+                with open(f"{workdir}/queued.log", "w") as output:
+                    with patched_env({"LOG_SAMPLE_RATES": rates}):
+                        configure_logging(
+                            "INFO", json_format=True, stream=SlowStream(output, delay)
+                        )
+                    results[f"{sink}: {name}"] = time_requests(lazy_request, count)
+                    # Let the writer thread drain before the file closes
+                    shutdown_logging()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument(
+        "--sink-delay",
+        type=float,
+        default=0.0005,
+        help="Seconds the slow sink stalls per written record",
+    )
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    results = run(args.requests, args.sink_delay)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, timing in results.items():
+        print(
+            f"{name:<36} mean {timing['mean_us']:>8.2f} µs  "
+            f"p99 {timing['p99_us']:>8.2f} µs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path, monkeypatch):
+    """
+    Keep each test's SQLite files in its own temporary directory, so jobs
+    left in the outbox by one run are never replayed by the next. Stores
+    that persist only when configured stay in memory.
+    """
+    monkeypatch.setenv("OUTBOX_PATH", str(tmp_path / "outbox.db"))
+    monkeypatch.setenv("STATE_PATH", str(tmp_path / "state.db"))
+    for name in ("FORMAT_CACHE_PATH", "IDEMPOTENCY_PATH", "TRACE_PATH"):
+        monkeypatch.delenv(name, raising=False)
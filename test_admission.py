@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for admission control and 429 load shedding.
+Deliveries are simulated in memory, no API calls are made.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+import pytest
+from fastapi.testclient import TestClient
+from app.exceptions import ServiceOverloadedError
+from app.main import app
+from app.services.admission import AdmissionController
+
+
+async def hold(admission: AdmissionController, customer: str, gate: asyncio.Event):
+    async with admission.admit(customer):
+        await gate.wait()
+
+
+async def test_excess_work_queues_then_is_shed():
+    """Arrivals past the limit queue; arrivals past the queue are rejected"""
+    admission = AdmissionController(
+        max_in_flight=2, max_queued=1, max_per_customer=0, queue_timeout=5
+    )
+    gate = asyncio.Event()
+    tasks = [asyncio.create_task(hold(admission, f"c{i}", gate)) for i in range(3)]
+    await asyncio.sleep(0)
+    assert admission.in_flight == 2
+    assert admission.queued == 1
+
+    with pytest.raises(ServiceOverloadedError) as excinfo:
+        async with admission.admit("c4"):
+            pass
+    assert excinfo.value.retry_after >= 1
+    assert admission.rejected["queue_full"] == 1
+
+    gate.set()
+    await asyncio.gather(*tasks)
+    assert admission.in_flight == 0
+    assert admission.queued == 0
+
+
+async def test_per_customer_cap_and_queue_timeout():
+    admission = AdmissionController(
+        max_in_flight=1, max_queued=10, max_per_customer=2, queue_timeout=0.05
+    )
+    gate = asyncio.Event()
+    first = asyncio.create_task(hold(admission, "noisy", gate))
+    second = asyncio.create_task(hold(admission, "noisy", gate))
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceOverloadedError):
+        async with admission.admit("noisy"):
+            pass
+    assert admission.rejected["customer"] == 1
+
+    # The queued second request gives up once queue_timeout passes
+    with pytest.raises(ServiceOverloadedError):
+        await second
+    assert admission.rejected["timeout"] == 1
+
+    gate.set()
+    await first
+    assert admission.in_flight == 0
+    assert admission._customers == {}
+
+
+def test_limit_adapts_to_latency():
+    admission = AdmissionController(
+        max_in_flight=100, min_in_flight=10, latency_target=0.5, adjust_interval=0
+    )
+    for _ in range(30):
+        admission.observe(2.0)
+    assert admission.limit == 10
+
+    admission.in_flight = 10
+    for _ in range(200):
+        admission.observe(0.1)
+    assert admission.limit > 10
+
+
+def test_notify_returns_429_with_retry_after():
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with TestClient(app) as client:
+            dispatcher = client.app.state.services.dispatcher
+            dispatcher.coalescer.submit = AsyncMock(
+                side_effect=ServiceOverloadedError("Notification queue is full", 2.5)
+            )
+            response = client.post(
+                "/notify",
+                json={"type": "change", "customer": "hsbc", "data": "Added 5"},
+            )
+            batch = client.post(
+                "/notify/batch",
+                json=[{"type": "change", "customer": "hsbc", "data": "Added 5"}],
+            )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    assert batch.json()[0]["status"] == 429
+
+
+if __name__ == "__main__":
+    asyncio.run(test_excess_work_queues_then_is_shed())
+    asyncio.run(test_per_customer_cap_and_queue_timeout())
+    test_limit_adapts_to_latency()
+    test_notify_returns_429_with_retry_after()
+    print("Admission control tests completed!")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for deduplicated channel-not-found alerts.
+Alerts are captured in memory, no API calls are made.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+from app.services.alerts import AlertAggregator
+
+
+async def test_repeats_are_suppressed_and_summarised():
+    """The first failure alerts immediately; repeats arrive as one summary with counts"""
+    post = AsyncMock()
+    alerts = AlertAggregator(post, window=60, summary_interval=0.05)
+
+    for _ in range(5):
+        alerts.report("openai", "openai-private")
+    alerts.report("acme", "acme-private")
+    alerts.report("acme", "acme-private")
+    await asyncio.sleep(0)
+
+    assert post.await_count == 2
+    assert "`openai`" in post.await_args_list[0].args[0]
+    assert "`acme`" in post.await_args_list[1].args[0]
+
+    await asyncio.sleep(0.1)
+    assert post.await_count == 3
+    summary = post.await_args_list[2].args[0]
+    assert "`openai` (`openai-private`): 4 failed notifications" in summary
+    assert "`acme` (`acme-private`): 1 failed notification" in summary
+    assert alerts.suppressed == 5
+
+    await alerts.close()
+
+
+async def test_close_flushes_pending_summary():
+    post = AsyncMock()
+    alerts = AlertAggregator(post, window=60, summary_interval=60)
+    alerts.report("openai", "openai-private")
+    alerts.report("openai", "openai-private")
+
+    await alerts.close()
+
+    assert post.await_count == 2
+    assert "1 failed notification" in post.await_args_list[1].args[0]
+
+
+if __name__ == "__main__":
+    asyncio.run(test_repeats_are_suppressed_and_summarised())
+    asyncio.run(test_close_flushes_pending_summary())
+    print("Alert aggregation tests completed!")
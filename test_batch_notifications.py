@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch notification endpoint.
+Formatting and Slack posting are mocked, no API calls are made.
+"""
+
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.exceptions import SlackIntegrationError
+
+
+def make_request(customer: str) -> dict:
+    return {"type": "change", "customer": customer, "data": ["Added 5 prospects"]}
+
+
+def test_batch_returns_results_in_order_with_partial_failures():
+    """Each item gets its own response and one failure does not fail the batch"""
+
+    async def post_message(customer, message):
+        if customer == "openai":
+            raise SlackIntegrationError("Customer channel 'openai-private' not found")
+        return f"ts-{customer}"
+
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with TestClient(app) as client:
+            services = client.app.state.services
+            services.message_formatter.format_message = AsyncMock(
+                return_value="Hello from Blue!"
+            )
+            services.slack_service.post_message = AsyncMock(side_effect=post_message)
+
+            response = client.post(
+                "/notify/batch",
+                json=[
+                    make_request("hsbc"),
+                    make_request("openai"),
+                    make_request("goldman"),
+                ],
+            )
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["success"] for result in results] == [True, False, True]
+    assert results[0]["message_id"] == "ts-hsbc"
+    assert results[1]["status"] == 500
+    assert "openai-private" in results[1]["error"]
+    assert results[2]["message_id"] == "ts-goldman"
+
+
+def test_batch_rejects_oversized_batches():
+    """Batches larger than the configured maximum are rejected up front"""
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with patch("app.routers.notifications.MAX_BATCH_SIZE", 2):
+            with TestClient(app) as client:
+                response = client.post("/notify/batch", json=[make_request("hsbc")] * 3)
+
+    assert response.status_code == 400
+
+
+if __name__ == "__main__":
+    test_batch_returns_results_in_order_with_partial_failures()
+    test_batch_rejects_oversized_batches()
+    print("Batch notification tests completed!")
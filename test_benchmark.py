@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the offline load test harness.
+Runs against the local Slack and LLM stand-ins, no network access needed.
+"""
+
+import asyncio
+from benchmarks.load_test import BenchmarkConfig, percentile, run_benchmark
+
+
+def test_percentile_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([], 95) == 0.0
+
+
+async def test_short_run_reports_throughput_latency_and_errors():
+    """Missing channels surface as errors; everything else is delivered"""
+    report = await run_benchmark(
+        BenchmarkConfig(
+            rate=100,
+            duration=0.2,
+            customers=10,
+            missing_ratio=0.1,
+            slack_latency=0.001,
+            llm_latency=0.001,
+        )
+    )
+
+    assert report["requests"] == 20
+    assert report["outcomes"] == {"200": 18, "500": 2}
+    assert report["error_rate"] == 0.1
+    assert report["throughput_rps"] > 0
+    assert report["latency_seconds"]["p50"] <= report["latency_seconds"]["p99"]
+    assert report["fake_slack"]["posted"] >= 18
+    assert report["fake_model_calls"] == 20
+
+
+if __name__ == "__main__":
+    test_percentile_nearest_rank()
+    asyncio.run(test_short_run_reports_throughput_latency_and_errors())
+    print("Benchmark harness tests completed!")
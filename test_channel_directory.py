@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the Slack channel directory and its use by SlackService.
+These use a fake Slack client, no API calls are made.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+from slack_sdk.errors import SlackApiError
+from app.services.channel_directory import ChannelDirectory
+from app.services.slack_client import SlackService
+from app.exceptions import SlackIntegrationError
+
+
+class FakeSlackClient:
+    """Serves conversations.list in pages of one channel"""
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.list_calls = 0
+
+    async def conversations_list(self, cursor=None, **kwargs):
+        self.list_calls += 1
+        position = int(cursor or 0)
+        next_cursor = str(position + 1) if position + 1 < len(self.channels) else ""
+        name, channel_id = self.channels[position]
+        return {
+            "channels": [{"name": name, "id": channel_id}],
+            "response_metadata": {"next_cursor": next_cursor},
+        }
+
+
+async def test_resolve_paginates_and_caches():
+    """All pages are loaded once and lookups are served from the index"""
+    client = FakeSlackClient([("hsbc-private", "C1"), ("goldman-private", "C2")])
+    directory = ChannelDirectory(client, ttl=300, refresh_interval=30)
+
+    assert await directory.resolve("hsbc-private") == "C1"
+    assert await directory.resolve("goldman-private") == "C2"
+    assert client.list_calls == 2  # one load of two pages
+
+
+async def test_unknown_channel_is_negatively_cached():
+    """Unknown channels resolve to None and are not looked up again"""
+    client = FakeSlackClient([("hsbc-private", "C1")])
+    directory = ChannelDirectory(client, negative_ttl=60, refresh_interval=30)
+
+    assert await directory.resolve("openai-private") is None
+    calls = client.list_calls
+    assert directory.is_missing("openai-private")
+    assert await directory.resolve("openai-private") is None
+    assert client.list_calls == calls
+
+
+async def test_unavailable_directory_falls_back_to_name():
+    """If conversations.list fails, the name is passed through to Slack"""
+    client = FakeSlackClient([])
+    client.conversations_list = AsyncMock(
+        side_effect=SlackApiError("Error", {"error": "missing_scope"})
+    )
+    directory = ChannelDirectory(client)
+
+    assert await directory.resolve("hsbc-private") == "hsbc-private"
+
+
+async def test_post_message_short_circuits_missing_channel():
+    """Repeated posts to a missing channel alert once and skip Slack afterwards"""
+    service = SlackService()
+    service.client.conversations_list = AsyncMock(
+        return_value={"channels": [{"name": "hsbc-private", "id": "C1"}]}
+    )
+
+    with patch.object(
+        service.client, "chat_postMessage", new_callable=AsyncMock
+    ) as mock_post:
+        mock_post.return_value = {"ok": True, "ts": "1234567890.123456"}
+
+        service.alerts.post = AsyncMock()
+        assert await service.post_message("hsbc", "Hello") == "1234567890.123456"
+        assert mock_post.call_args.kwargs["channel"] == "C1"
+
+        for _ in range(3):
+            try:
+                await service.post_message("openai", "Hello")
+                assert False, "Expected SlackIntegrationError"
+            except SlackIntegrationError:
+                pass
+
+        await asyncio.sleep(0)
+        service.alerts.post.assert_awaited_once()
+        assert service.alerts.suppressed == 2
+        assert mock_post.call_count == 1
+
+    await service.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_resolve_paginates_and_caches())
+    asyncio.run(test_unknown_channel_is_negatively_cached())
+    asyncio.run(test_unavailable_directory_falls_back_to_name())
+    asyncio.run(test_post_message_short_circuits_missing_channel())
+    print("Channel directory tests completed!")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for circuit breakers around the LLM and Slack.
+The LLM and Slack client are mocked, no API calls are made.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
+import pytest
+from slack_sdk.errors import SlackApiError
+from app.exceptions import CustomerNotFoundError, SlackUnavailableError
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.format_cache import FormatCache
+from app.services.message_formatter import MessageFormatter
+from app.services.slack_client import SlackService
+from app.types import NotificationType
+
+
+def test_breaker_opens_half_opens_and_closes():
+    """Consecutive failures open the breaker; one probe at a time decides recovery"""
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05, probes=1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["trips"] == 2
+
+
+async def test_open_llm_breaker_uses_template_without_calling_llm():
+    """After repeated LLM failures formatting falls straight to templates"""
+    formatter = MessageFormatter(cache=FormatCache(max_entries=0))
+    formatter.breaker = CircuitBreaker("llm", failure_threshold=2, reset_timeout=60)
+    run = AsyncMock(side_effect=RuntimeError("OpenAI is down"))
+
+    with patch("app.services.message_formatter.Runner.run", run):
+        for _ in range(3):
+            message = await formatter.format_message(
+                notification_type=NotificationType.CHANGE,
+                customer="hsbc",
+                data=["Added 15 new prospects"],
+            )
+
+    assert run.await_count == 2
+    assert formatter.path_counts["fallback"] == 2
+    assert formatter.path_counts["circuit_open"] == 1
+    assert "• Added 15 new prospects" in message
+
+
+async def test_slack_breaker_fails_fast_and_ignores_client_errors():
+    """Transport errors open the breaker; channel_not_found does not"""
+    service = SlackService()
+    service.breaker = CircuitBreaker("slack", failure_threshold=2, reset_timeout=60)
+    service.channel_directory.resolve = AsyncMock(return_value="C123")
+    service._post_channel_not_found_error = Mock()
+
+    with patch.object(
+        service.client,
+        "chat_postMessage",
+        new_callable=AsyncMock,
+        side_effect=SlackApiError("Error", {"error": "channel_not_found"}),
+    ):
+        for _ in range(3):
+            service.channel_directory._missing.clear()
+            with pytest.raises(CustomerNotFoundError):
+                await service.post_message("openai", "Test message")
+    assert service.breaker.state == CLOSED
+
+    with patch.object(
+        service.client,
+        "chat_postMessage",
+        new_callable=AsyncMock,
+        side_effect=asyncio.TimeoutError(),
+    ) as post:
+        for _ in range(3):
+            with pytest.raises(Exception) as error:
+                await service.post_message("hsbc", "Test message")
+        assert post.await_count == 2
+        assert isinstance(error.value, SlackUnavailableError)
+        assert error.value.retry_after > 0
+
+    await service.close()
+
+
+if __name__ == "__main__":
+    test_breaker_opens_half_opens_and_closes()
+    asyncio.run(test_open_llm_breaker_uses_template_without_calling_llm())
+    asyncio.run(test_slack_breaker_fails_fast_and_ignores_client_errors())
+    print("Circuit breaker tests completed!")
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for per-customer notification coalescing.
+Delivery is faked, no API calls are made.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, Mock
+from app import metrics
+from app.services.coalescer import NotificationCoalescer, merge_requests
+from app.services.dispatcher import NotificationDispatcher
+from app.services.message_formatter import format_path
+from app.types import NotificationRequest, NotificationType
+
+
+def make_request(
+    customer, data, type=NotificationType.CHANGE, campaign=None, links=None
+):
+    return NotificationRequest(
+        type=type, customer=customer, campaign=campaign, data=data, links=links or []
+    )
+
+
+def test_merge_requests():
+    """Data is concatenated, links deduplicated, differing campaigns prefixed"""
+    merged = merge_requests(
+        [
+            make_request("hsbc", "Added 5 prospects", campaign="Bankers", links=["a"]),
+            make_request(
+                "hsbc",
+                ["Raised budget", "New creative"],
+                campaign="Advisors",
+                links=["a", "b"],
+            ),
+        ]
+    )
+
+    assert merged.campaign is None
+    assert merged.data == [
+        "[Bankers] Added 5 prospects",
+        "[Advisors] Raised budget",
+        "[Advisors] New creative",
+    ]
+    assert merged.links == ["a", "b"]
+
+
+async def test_burst_is_delivered_as_one_digest():
+    """Notifications for one customer within the window produce a single delivery"""
+    delivered = []
+
+    async def deliver(request):
+        delivered.append(request)
+        return f"ts-{len(delivered)}"
+
+    coalescer = NotificationCoalescer(deliver, window=0.05, max_size=10)
+    results = await asyncio.gather(
+        coalescer.submit(make_request("hsbc", "one")),
+        coalescer.submit(make_request("hsbc", "two")),
+        coalescer.submit(make_request("goldman", "three")),
+        coalescer.submit(make_request("hsbc", "urgent", type=NotificationType.UPDATE)),
+    )
+
+    assert len(delivered) == 3  # hsbc digest, goldman, update bypass
+    digest = next(
+        r
+        for r in delivered
+        if r.customer == "hsbc" and r.type == NotificationType.CHANGE
+    )
+    assert digest.data == ["one", "two"]
+    assert results[0] == results[1]
+
+
+async def test_full_group_flushes_early():
+    """Reaching the size limit delivers without waiting for the window"""
+    delivered = []
+
+    async def deliver(request):
+        delivered.append(request)
+        return "ts"
+
+    coalescer = NotificationCoalescer(deliver, window=10, max_size=2)
+    await asyncio.wait_for(
+        asyncio.gather(
+            coalescer.submit(make_request("hsbc", "one")),
+            coalescer.submit(make_request("hsbc", "two")),
+        ),
+        timeout=1,
+    )
+
+    assert len(delivered) == 1
+
+
+async def test_digest_outcome_reaches_every_caller():
+    """A digest formatted by the fallback is counted as fallback for each caller"""
+
+    async def format_message(**kwargs):
+        format_path.set("fallback")
+        return "Update from Blue: one, two"
+
+    formatter = Mock(format_message=format_message)
+    slack_service = Mock(post_message=AsyncMock(return_value="ts-1"))
+    dispatcher = NotificationDispatcher(slack_service, formatter)
+    dispatcher.coalescer.window = 0.05
+    fallbacks = metrics.notifications_total.value("learning", "fallback")
+
+    message_ids = await asyncio.gather(
+        dispatcher.deliver(make_request("hsbc", "one", type=NotificationType.LEARNING)),
+        dispatcher.deliver(make_request("hsbc", "two", type=NotificationType.LEARNING)),
+    )
+
+    assert message_ids == ["ts-1", "ts-1"]
+    assert slack_service.post_message.await_count == 1
+    assert metrics.notifications_total.value("learning", "fallback") == fallbacks + 2
+
+
+if __name__ == "__main__":
+    test_merge_requests()
+    asyncio.run(test_burst_is_delivered_as_one_digest())
+    asyncio.run(test_full_group_flushes_early())
+    asyncio.run(test_digest_outcome_reaches_every_caller())
+    print("Coalescer tests completed!")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for lazy imports and lazy startup.
+Warm-up and delivery are mocked, no API calls are made.
+"""
+
+import asyncio
+import subprocess
+import sys
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+
+
+def test_importing_app_does_not_load_heavy_sdks():
+    """The Agents SDK and the Slack async client load on first use, not at import"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, app.main; "
+            "print([m for m in ('agents', 'aiohttp', 'slack_sdk.web.async_client') "
+            "if m in sys.modules])",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_lazy_startup_serves_health_before_services_are_ready(monkeypatch):
+    """/health answers during startup and /notify waits for the services"""
+    monkeypatch.setenv("LAZY_STARTUP", "true")
+
+    async def slow_warm_up():
+        await asyncio.sleep(0.3)
+
+    with (
+        patch("app.dependencies.ServiceContainer.warm_up", side_effect=slow_warm_up),
+        patch(
+            "app.services.dispatcher.NotificationDispatcher.deliver",
+            new_callable=AsyncMock,
+            return_value="ts-1",
+        ),
+    ):
+        with TestClient(app) as client:
+            health = client.get("/health").json()
+            response = client.post(
+                "/notify",
+                json={"type": "change", "customer": "hsbc", "data": "Added 5"},
+            )
+            ready = client.get("/health").json()
+
+    assert health["ready"] is False
+    assert response.status_code == 200
+    assert response.json()["message_id"] == "ts-1"
+    assert ready["ready"] is True
+    assert ready["startup_seconds"] >= 0.3
+
+
+if __name__ == "__main__":
+    test_importing_app_does_not_load_heavy_sdks()
+    print("Cold start tests completed!")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for micro-batching LLM formatting calls.
+The LLM is mocked, no API calls are made.
+"""
+
+import asyncio
+import json
+from unittest.mock import Mock, patch
+from app.services.format_cache import FormatCache
+from app.services.message_formatter import (
+    FormattedBatch,
+    FormattedMessage,
+    MessageFormatter,
+)
+from app.types import NotificationType
+
+
+async def test_concurrent_requests_share_one_call_and_split_failures_fall_back():
+    """Pending requests go out as one batch; unparsed items are retried singly"""
+    formatter = MessageFormatter(cache=FormatCache(max_entries=0))
+    formatter.batcher.window = 0.02
+    batch_prompts = []
+    single_prompts = []
+
+    async def run(agent, prompt):
+        if agent.output_type is FormattedBatch:
+            batch_prompts.append(json.loads(prompt))
+            # The model drops the last notification from its answer
+            return Mock(
+                final_output=FormattedBatch(
+                    messages=[
+                        FormattedMessage(index=0, message="Digest for hsbc"),
+                        FormattedMessage(index=1, message="Digest for goldman"),
+                    ]
+                )
+            )
+        single_prompts.append(prompt)
+        return Mock(final_output="Single for anthropic")
+
+    with patch("app.services.message_formatter.Runner.run", side_effect=run):
+        messages = await asyncio.gather(
+            *(
+                formatter.format_message(
+                    notification_type=NotificationType.CHANGE,
+                    customer=customer,
+                    data="Added 5 prospects",
+                )
+                for customer in ("hsbc", "goldman", "anthropic")
+            )
+        )
+
+    assert messages == ["Digest for hsbc", "Digest for goldman", "Single for anthropic"]
+    assert len(batch_prompts) == 1
+    assert [item["customer"] for item in batch_prompts[0]] == [
+        "hsbc",
+        "goldman",
+        "anthropic",
+    ]
+    assert len(single_prompts) == 1
+    assert formatter.batcher.split_failures == 1
+
+
+if __name__ == "__main__":
+    asyncio.run(test_concurrent_requests_share_one_call_and_split_failures_fall_back())
+    print("Format batching tests completed!")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the formatted message cache.
+The LLM is mocked, no API calls are made.
+"""
+
+import asyncio
+import os
+import tempfile
+from unittest.mock import Mock, patch
+from app.services.format_cache import FormatCache, make_cache_key
+from app.services.message_formatter import MessageFormatter
+from app.types import NotificationType
+
+
+async def test_lru_eviction_and_counters():
+    """The least recently used entry is evicted once the cache is full"""
+    cache = FormatCache(max_entries=2, ttl=60)
+
+    await cache.set("a", "message a")
+    await cache.set("b", "message b")
+    assert await cache.get("a") == "message a"  # a is now most recent
+    await cache.set("c", "message c")
+
+    assert await cache.get("b") is None
+    assert await cache.get("c") == "message c"
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 2
+
+
+async def test_sqlite_persistence():
+    """Entries written to SQLite are available to a new cache instance"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "format_cache.db")
+
+        cache = FormatCache(max_entries=10, ttl=60, path=path)
+        await cache.set("key", "persisted message")
+        cache.close()
+
+        restarted = FormatCache(max_entries=10, ttl=60, path=path)
+        assert await restarted.get("key") == "persisted message"
+        restarted.close()
+
+
+def test_cache_key_is_canonical():
+    """Key order does not matter, instructions and model do"""
+    payload = {"type": "change", "customer": "hsbc", "data": ["a"], "links": []}
+    reordered = {"links": [], "data": ["a"], "customer": "hsbc", "type": "change"}
+
+    key = make_cache_key(payload, "instructions", "gpt-4o-mini")
+    assert key == make_cache_key(reordered, "instructions", "gpt-4o-mini")
+    assert key != make_cache_key(payload, "other instructions", "gpt-4o-mini")
+    assert key != make_cache_key(payload, "instructions", "gpt-4o")
+
+
+async def test_formatter_reuses_cached_message():
+    """Identical notifications only call the LLM once"""
+    formatter = MessageFormatter(cache=FormatCache(max_entries=10, ttl=60))
+
+    with patch("app.services.message_formatter.Runner.run") as mock_run:
+        mock_run.return_value = Mock(final_output="Hello from Blue!")
+
+        for _ in range(3):
+            message = await formatter.format_message(
+                notification_type=NotificationType.LEARNING,
+                customer="goldman",
+                data=["Conversion rate up 18%"],
+                campaign="Wealth Managers, Conversational",
+            )
+            assert message == "Hello from Blue!"
+
+        assert mock_run.call_count == 1
+
+
+if __name__ == "__main__":
+    asyncio.run(test_lru_eviction_and_counters())
+    asyncio.run(test_sqlite_persistence())
+    test_cache_key_is_canonical()
+    asyncio.run(test_formatter_reuses_cached_message())
+    print("Format cache tests completed!")
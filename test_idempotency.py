@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for idempotent /notify delivery.
+Formatting and Slack posting are mocked, no API calls are made.
+"""
+
+import asyncio
+import os
+import tempfile
+from unittest.mock import AsyncMock, patch
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.exceptions import IdempotencyConflictError, SlackIntegrationError
+from app.services.idempotency import IdempotencyStore
+from app.types import NotificationRequest, NotificationResponse, NotificationType
+
+
+def make_request(data: str = "Added 5 prospects") -> NotificationRequest:
+    return NotificationRequest(type=NotificationType.CHANGE, customer="hsbc", data=data)
+
+
+async def test_concurrent_duplicates_wait_for_the_first_delivery():
+    """Only one delivery runs; the duplicate and later repeats get its response"""
+    store = IdempotencyStore(ttl=60)
+    calls = []
+
+    async def deliver():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return NotificationResponse(status=200, success=True, message_id="ts-1")
+
+    first, second = await asyncio.gather(
+        store.run("key:abc", make_request(), deliver),
+        store.run("key:abc", make_request(), deliver),
+    )
+    repeat = await store.run("key:abc", make_request(), deliver)
+
+    assert len(calls) == 1
+    assert first.message_id == second.message_id == repeat.message_id == "ts-1"
+    assert store.stats()["joined"] == 1
+    assert store.stats()["replays"] == 1
+
+    with pytest.raises(IdempotencyConflictError):
+        await store.run("key:abc", make_request("Something else"), deliver)
+
+
+async def test_failures_are_retried_and_results_survive_restart():
+    """Errors are not remembered; stored responses are reloaded from SQLite"""
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "idempotency.db")
+        store = IdempotencyStore(ttl=60, path=path)
+        deliver = AsyncMock(
+            side_effect=[
+                SlackIntegrationError("Slack is down"),
+                NotificationResponse(status=200, success=True, message_id="ts-2"),
+            ]
+        )
+
+        with pytest.raises(SlackIntegrationError):
+            await store.run("key:retry", make_request(), deliver)
+        response = await store.run("key:retry", make_request(), deliver)
+        assert response.message_id == "ts-2"
+        store.close()
+
+        restarted = IdempotencyStore(ttl=60, path=path)
+        replayed = await restarted.run("key:retry", make_request(), deliver)
+        restarted.close()
+
+    assert replayed.message_id == "ts-2"
+    assert deliver.await_count == 2
+
+
+def test_notify_replays_response_for_repeated_idempotency_key():
+    """A retried request with the same key does not post to Slack again"""
+    payload = {"type": "change", "customer": "hsbc", "data": ["Added 5 prospects"]}
+    headers = {"Idempotency-Key": "retry-1"}
+
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with TestClient(app) as client:
+            services = client.app.state.services
+            services.message_formatter.format_message = AsyncMock(
+                return_value="Hello from Blue!"
+            )
+            services.slack_service.post_message = AsyncMock(return_value="ts-hsbc")
+
+            first = client.post("/notify", json=payload, headers=headers)
+            second = client.post("/notify", json=payload, headers=headers)
+            conflict = client.post(
+                "/notify", json={**payload, "data": "Different"}, headers=headers
+            )
+            unkeyed = client.post("/notify", json=payload)
+
+            post_count = services.slack_service.post_message.await_count
+
+    assert first.json()["message_id"] == second.json()["message_id"] == "ts-hsbc"
+    assert conflict.status_code == 400
+    assert unkeyed.status_code == 200
+    assert post_count == 2
+
+
+if __name__ == "__main__":
+    asyncio.run(test_concurrent_duplicates_wait_for_the_first_delivery())
+    asyncio.run(test_failures_are_retried_and_results_survive_restart())
+    test_notify_replays_response_for_repeated_idempotency_key()
+    print("Idempotency tests completed!")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for latency-budgeted formatting and hedged LLM requests.
+The LLM is mocked, no API calls are made.
+"""
+
+import asyncio
+from unittest.mock import Mock, patch
+from app.services.format_cache import FormatCache
+from app.services.message_formatter import MessageFormatter
+from app.types import NotificationType
+
+
+async def test_slow_llm_falls_back_to_template_and_fills_cache():
+    """A response past the budget is replaced by a template, then cached when it lands"""
+    formatter = MessageFormatter(cache=FormatCache(max_entries=10, ttl=60))
+    formatter.latency_budget = 0.05
+
+    async def slow_run(agent, prompt):
+        await asyncio.sleep(0.15)
+        return Mock(final_output="Hello from Blue!")
+
+    with patch("app.services.message_formatter.Runner.run", side_effect=slow_run):
+        kwargs = dict(
+            notification_type=NotificationType.CHANGE,
+            customer="hsbc",
+            data=["Added 15 new prospects"],
+        )
+        message = await formatter.format_message(**kwargs)
+        assert "• Added 15 new prospects" in message
+        assert formatter.path_counts["timeout"] == 1
+
+        await asyncio.sleep(0.2)
+        assert await formatter.format_message(**kwargs) == "Hello from Blue!"
+        assert formatter.path_counts["cache"] == 1
+
+
+async def test_hedged_request_wins_when_primary_is_slow():
+    """After the percentile delay a second request is sent and the first reply is used"""
+    formatter = MessageFormatter(cache=FormatCache(max_entries=0))
+    formatter.hedge_enabled = True
+    formatter.hedge_min_samples = 1
+    formatter._latencies.extend([0.02] * 10)
+    calls = []
+
+    async def run(agent, prompt):
+        calls.append(prompt)
+        await asyncio.sleep(1 if len(calls) == 1 else 0.01)
+        return Mock(final_output=f"reply {len(calls)}")
+
+    with patch("app.services.message_formatter.Runner.run", side_effect=run):
+        message = await asyncio.wait_for(
+            formatter.format_message(
+                notification_type=NotificationType.LEARNING,
+                customer="goldman",
+                data="Conversion rate up 18%",
+            ),
+            timeout=0.5,
+        )
+
+    assert message == "reply 2"
+    assert formatter.hedges == 1
+    # The message is counted once, by its path, not again for the hedge
+    assert sum(formatter.path_counts.values()) == 1
+    assert "hedged" not in formatter.path_counts
+
+
+if __name__ == "__main__":
+    asyncio.run(test_slow_llm_falls_back_to_template_and_fills_cache())
+    asyncio.run(test_hedged_request_wins_when_primary_is_slow())
+    print("Latency budget tests completed!")
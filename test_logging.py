@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for structured, queued and sampled logging.
+Records are captured in memory, nothing is written to disk.
+"""
+
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from app.logs import (
+    DeferredQueueHandler,
+    JSONFormatter,
+    SamplingFilter,
+    parse_sample_rates,
+)
+
+
+def record(name: str, level: int, msg: str = "event", **extra) -> logging.LogRecord:
+    return logging.makeLogRecord(
+        {
+            "name": name,
+            "levelno": level,
+            "levelname": logging.getLevelName(level),
+            "msg": msg,
+            **extra,
+        }
+    )
+
+
+def test_json_formatter_includes_extras_and_exceptions():
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        exc_info = sys.exc_info()
+    entry = json.loads(
+        JSONFormatter().format(
+            record(
+                "app.services.slack_client",
+                logging.ERROR,
+                "Failed to post to %s",
+                args=("hsbc-private",),
+                customer="hsbc",
+                exc_info=exc_info,
+            )
+        )
+    )
+
+    assert entry["message"] == "Failed to post to hsbc-private"
+    assert entry["level"] == "ERROR"
+    assert entry["customer"] == "hsbc"
+    assert "RuntimeError: boom" in entry["exception"]
+
+
+def test_sampling_drops_success_logs_but_keeps_errors():
+    sampler = SamplingFilter(
+        1.0, parse_sample_rates("app.routers=0, app.services.outbox=1")
+    )
+
+    assert not sampler.filter(record("app.routers.notifications", logging.INFO))
+    assert sampler.filter(record("app.routers.notifications", logging.WARNING))
+    assert sampler.filter(record("app.services.outbox", logging.INFO))
+    assert sampler.filter(record("app.services.slack_client", logging.INFO))
+    assert sampler.sampled_out == 1
+
+
+def test_messages_are_formatted_on_the_listener_thread():
+    formatted_on = []
+
+    class Customer:
+        def __str__(self):
+            formatted_on.append(threading.current_thread())
+            return "hsbc"
+
+    output = io.StringIO()
+    sink = logging.StreamHandler(output)
+    sink.setFormatter(JSONFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, sink)
+
+    logger = logging.getLogger("test_logging.deferred")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = DeferredQueueHandler(records)
+    logger.addHandler(handler)
+    try:
+        logger.info("Posted message for %s", Customer())
+        assert formatted_on == []
+        listener.start()
+        listener.stop()
+    finally:
+        logger.removeHandler(handler)
+
+    assert formatted_on and formatted_on[0] is not threading.main_thread()
+    assert json.loads(output.getvalue())["message"] == "Posted message for hsbc"
+
+
+if __name__ == "__main__":
+    test_json_formatter_includes_extras_and_exceptions()
+    test_sampling_drops_success_logs_but_keeps_errors()
+    test_messages_are_formatted_on_the_listener_thread()
+    print("Logging tests completed!")
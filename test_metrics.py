@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the /metrics endpoint.
+Formatting and Slack posting are mocked, no API calls are made.
+"""
+
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.exceptions import CustomerNotFoundError
+from app.metrics import Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Bucket counts are cumulative and end with +Inf"""
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "latency_seconds_count 3" in lines
+
+
+def test_metrics_endpoint_reports_outcomes_and_stages():
+    """Notifications are counted by type and outcome with per-stage timings"""
+
+    async def post_message(customer, message):
+        if customer == "openai":
+            raise CustomerNotFoundError("Customer channel 'openai-private' not found")
+        return "1234567890.123456"
+
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with TestClient(app) as client:
+            services = client.app.state.services
+            services.message_formatter.format_message = AsyncMock(
+                return_value="Hello from Blue!"
+            )
+            services.slack_service.post_message = AsyncMock(side_effect=post_message)
+
+            client.post(
+                "/notify",
+                json={"type": "learning", "customer": "hsbc", "data": "Up 18%"},
+            )
+            client.post(
+                "/notify",
+                json={"type": "learning", "customer": "openai", "data": "Up 18%"},
+            )
+            response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'kalos_notifications_total{type="learning",outcome="success"}' in body
+    assert (
+        'kalos_notifications_total{type="learning",outcome="channel_not_found"}' in body
+    )
+    assert 'kalos_notify_duration_seconds_count{type="learning"}' in body
+    assert 'kalos_format_duration_seconds_bucket{type="learning",le="+Inf"}' in body
+    assert "kalos_slack_post_duration_seconds_count" in body
+    assert "kalos_notify_in_flight 0" in body
+    assert "kalos_format_cache_hits_total" in body
+    assert "kalos_outbox_queue_depth" in body
+
+
+if __name__ == "__main__":
+    test_histogram_renders_cumulative_buckets()
+    test_metrics_endpoint_reports_outcomes_and_stages()
+    print("Metrics tests completed!")
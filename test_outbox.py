@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Tests for asynchronous delivery through the durable outbox.
+Delivery is faked, no API calls are made.
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from app.services.outbox import Outbox
+from app.exceptions import SlackIntegrationError, SlackRateLimitError
+from app.types import JobStatus, NotificationRequest, NotificationType
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.delivered = []
+
+    async def deliver(self, request):
+        if request.customer == "openai":
+            raise SlackIntegrationError("Customer channel 'openai-private' not found")
+        self.delivered.append(request.customer)
+        return f"ts-{request.customer}"
+
+
+def make_request(customer: str) -> NotificationRequest:
+    return NotificationRequest(
+        type=NotificationType.CHANGE, customer=customer, data="Added 5 prospects"
+    )
+
+
+class RateLimitedDispatcher(FakeDispatcher):
+    """Slack keeps rate limiting the first attempt past the limiter's retries"""
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    async def deliver(self, request):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise SlackRateLimitError("Slack API error: ratelimited", retry_after=0)
+        return await super().deliver(request)
+
+
+class SlowDispatcher(FakeDispatcher):
+    async def deliver(self, request):
+        await asyncio.sleep(0.2)
+        return await super().deliver(request)
+
+
+async def wait_for_status(
+    outbox: Outbox, job_id: str, status: JobStatus, attempts: int = 100
+):
+    for _ in range(attempts):
+        job = await outbox.get(job_id)
+        if job.status == status:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} never reached {status}")
+
+
+async def test_enqueued_jobs_are_delivered():
+    """Workers drain queued jobs and record the outcome"""
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = Outbox(path=os.path.join(directory, "outbox.db"), workers=2)
+        dispatcher = FakeDispatcher()
+        await outbox.start(dispatcher)
+
+        delivered_id = await outbox.enqueue(make_request("hsbc"))
+        failed_id = await outbox.enqueue(make_request("openai"))
+
+        job = await wait_for_status(outbox, delivered_id, JobStatus.DELIVERED)
+        assert job.message_id == "ts-hsbc"
+        job = await wait_for_status(outbox, failed_id, JobStatus.FAILED)
+        assert "openai-private" in job.error
+        assert await outbox.get("missing") is None
+
+        await outbox.stop()
+
+
+async def test_rate_limited_jobs_are_retried():
+    """A rate limit is transient: the job is re-queued instead of failed"""
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = Outbox(path=os.path.join(directory, "outbox.db"), workers=1)
+        dispatcher = RateLimitedDispatcher()
+        await outbox.start(dispatcher)
+
+        job_id = await outbox.enqueue(make_request("hsbc"))
+
+        job = await wait_for_status(outbox, job_id, JobStatus.DELIVERED, attempts=300)
+        assert job.attempts == 2
+        assert dispatcher.delivered == ["hsbc"]
+
+        await outbox.stop()
+
+
+async def test_stop_without_timeout_waits_for_jobs_in_progress():
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = Outbox(path=os.path.join(directory, "outbox.db"), workers=1)
+        dispatcher = SlowDispatcher()
+        await outbox.start(dispatcher)
+
+        job_id = await outbox.enqueue(make_request("hsbc"))
+        await wait_for_status(outbox, job_id, JobStatus.PROCESSING)
+        await outbox.stop(timeout=None)
+
+        assert dispatcher.delivered == ["hsbc"]
+
+
+async def test_outboxes_sharing_a_file_deliver_each_job_once():
+    """A second worker starting mid-delivery leaves the first worker's job alone"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "outbox.db")
+        first, second = SlowDispatcher(), FakeDispatcher()
+        outboxes = [Outbox(path=path, workers=1), Outbox(path=path, workers=1)]
+        await outboxes[0].start(first)
+
+        job_id = await outboxes[0].enqueue(make_request("hsbc"))
+        await wait_for_status(outboxes[0], job_id, JobStatus.PROCESSING)
+        await outboxes[1].start(second)
+        # Both outboxes try to claim the same queued job
+        outboxes[1]._queue.put_nowait(job_id)
+        await wait_for_status(outboxes[0], job_id, JobStatus.DELIVERED)
+
+        assert first.delivered == ["hsbc"]
+        assert second.delivered == []
+        for outbox in outboxes:
+            await outbox.stop()
+
+
+async def test_expired_leases_are_recovered_by_another_worker():
+    """Jobs held by a worker that stopped renewing its lease are redelivered"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "outbox.db")
+        outbox = Outbox(path=path, workers=1, lease=0.3)
+        dispatcher = FakeDispatcher()
+        await outbox.start(dispatcher)
+
+        db = sqlite3.connect(path)
+        db.execute(
+            "INSERT INTO jobs (id, payload, status, attempts, created_at, updated_at, "
+            "owner, lease_until) VALUES (?, ?, ?, 1, 0, 0, ?, ?)",
+            (
+                "job-1",
+                make_request("goldman").model_dump_json(),
+                "processing",
+                "crashed-worker",
+                time.time() + 0.2,
+            ),
+        )
+        db.commit()
+        db.close()
+
+        job = await wait_for_status(outbox, "job-1", JobStatus.DELIVERED)
+        assert job.attempts == 2
+        assert dispatcher.delivered == ["goldman"]
+        await outbox.stop()
+
+
+async def test_interrupted_jobs_resume_on_start():
+    """Jobs left processing by a crash are delivered by the next instance"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "outbox.db")
+
+        outbox = Outbox(path=path, workers=1)
+        await outbox.start(FakeDispatcher())
+        await outbox.stop()
+
+        # Simulate a job claimed by a worker that crashed before finishing
+        db = sqlite3.connect(path)
+        db.execute(
+            "INSERT INTO jobs (id, payload, status, attempts, created_at, updated_at) "
+            "VALUES (?, ?, ?, 1, 0, 0)",
+            ("job-1", make_request("goldman").model_dump_json(), "processing"),
+        )
+        db.commit()
+        db.close()
+
+        restarted = Outbox(path=path, workers=1, retention=1e12)
+        dispatcher = FakeDispatcher()
+        await restarted.start(dispatcher)
+
+        job = await wait_for_status(restarted, "job-1", JobStatus.DELIVERED)
+        assert job.attempts == 2
+        assert dispatcher.delivered == ["goldman"]
+
+        await restarted.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_enqueued_jobs_are_delivered())
+    asyncio.run(test_rate_limited_jobs_are_retried())
+    asyncio.run(test_stop_without_timeout_waits_for_jobs_in_progress())
+    asyncio.run(test_outboxes_sharing_a_file_deliver_each_job_once())
+    asyncio.run(test_expired_leases_are_recovered_by_another_worker())
+    asyncio.run(test_interrupted_jobs_resume_on_start())
+    print("Outbox tests completed!")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for compact, token-budgeted LLM prompts.
+The LLM is mocked, no API calls are made.
+"""
+
+import asyncio
+import json
+from unittest.mock import Mock, patch
+from app import metrics
+from app.services.format_cache import FormatCache
+from app.services.message_formatter import BLUE_INSTRUCTIONS, MessageFormatter
+from app.services.prompt_builder import PromptBuilder, estimate_tokens
+from app.types import NotificationType
+
+
+def test_prompt_is_canonical_and_drops_empty_fields():
+    builder = PromptBuilder(max_tokens=1000)
+    prompt = builder.build(
+        NotificationType.CHANGE, "hsbc", ["Added 5 prospects", ""], None, []
+    )
+
+    assert prompt.text == (
+        '{"customer":"hsbc","data":["Added 5 prospects"],"type":"change"}'
+    )
+    assert prompt.tokens == estimate_tokens(prompt.text)
+    assert not prompt.truncated
+    # Empty fields and items do not change the prompt, or its cache key
+    same = builder.build(NotificationType.CHANGE, "hsbc", ["Added 5 prospects"])
+    assert same.text == prompt.text
+
+
+def test_overflowing_data_is_summarised_within_budget():
+    builder = PromptBuilder(max_tokens=200, max_item_chars=100)
+    data = [
+        f"Prospect {index} replied to the outreach sequence" for index in range(200)
+    ]
+    links = ["https://app.kalos.ai/campaigns/42"]
+
+    prompt = builder.build(
+        NotificationType.LEARNING, "hsbc", data, "Q3 Outreach", links
+    )
+
+    assert prompt.tokens <= 200
+    kept = prompt.payload["data"]
+    assert kept[0] == data[0]
+    assert kept[-1] == f"+{200 - (len(kept) - 1)} more"
+    assert prompt.omitted == 200 - (len(kept) - 1)
+    # Links and campaign survive when dropping data items is enough
+    assert prompt.payload["links"] == links
+    assert prompt.payload["campaign"] == "Q3 Outreach"
+
+
+def test_long_items_are_clipped():
+    builder = PromptBuilder(max_tokens=50, max_item_chars=1000)
+    prompt = builder.build(NotificationType.UPDATE, "hsbc", "word " * 500)
+
+    assert prompt.tokens <= 50
+    assert prompt.payload["data"].endswith("…")
+    assert prompt.clipped == 1 and prompt.omitted == 0
+
+
+async def test_formatter_sends_compact_prompt_and_reports_tokens():
+    formatter = MessageFormatter(cache=FormatCache(max_entries=0))
+    formatter.prompt_builder = PromptBuilder(max_tokens=100)
+    prompts = []
+
+    async def run(agent, prompt):
+        prompts.append((agent.instructions, prompt))
+        usage = Mock(
+            input_tokens=400,
+            output_tokens=30,
+            input_tokens_details=Mock(cached_tokens=256),
+        )
+        return Mock(final_output="Hello!", context_wrapper=Mock(usage=usage))
+
+    truncated = metrics.prompt_truncated.value("learning")
+    cached = metrics.llm_tokens.value("cached")
+    with patch("app.services.message_formatter.Runner.run", side_effect=run):
+        message = await formatter.format_message(
+            notification_type=NotificationType.LEARNING,
+            customer="hsbc",
+            data=[f"Insight number {index}" for index in range(100)],
+        )
+
+    assert message == "Hello!"
+    instructions, prompt = prompts[0]
+    # The persona stays a fixed prefix; the notification is compact JSON
+    assert instructions == BLUE_INSTRUCTIONS
+    payload = json.loads(prompt)
+    assert set(payload) == {"type", "customer", "data"}
+    assert payload["data"][-1].endswith(" more")
+    assert estimate_tokens(prompt) <= 100
+    assert metrics.prompt_truncated.value("learning") == truncated + 1
+    assert metrics.llm_tokens.value("cached") == cached + 256
+
+
+if __name__ == "__main__":
+    test_prompt_is_canonical_and_drops_empty_fields()
+    test_overflowing_data_is_summarised_within_budget()
+    test_long_items_are_clipped()
+    asyncio.run(test_formatter_sends_compact_prompt_and_reports_tokens())
+    print("Prompt builder tests completed!")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Tests for Slack rate limit scheduling.
+Slack calls are faked, no API calls are made.
+"""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+import pytest
+from fastapi.testclient import TestClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.slack_response import SlackResponse
+from app.exceptions import SlackRateLimitError
+from app.main import app
+from app.services.rate_limiter import SlackRateLimiter
+from app.services.slack_client import SlackService
+
+
+def ratelimited_error(retry_after: str) -> SlackApiError:
+    response = SlackResponse(
+        client=None,
+        http_verb="POST",
+        api_url="https://slack.com/api/chat.postMessage",
+        req_args={},
+        data={"ok": False, "error": "ratelimited"},
+        headers={"Retry-After": retry_after},
+        status_code=429,
+    )
+    return SlackApiError("Rate limited", response)
+
+
+async def test_channel_calls_are_spaced_not_failed():
+    """Calls beyond the channel rate queue up instead of failing"""
+    limiter = SlackRateLimiter(
+        channel_rate=20, channel_burst=1, method_rate=1000, method_burst=1000
+    )
+
+    started = time.monotonic()
+    await asyncio.gather(*(limiter.acquire("chat.postMessage", "C1") for _ in range(4)))
+    elapsed = time.monotonic() - started
+
+    assert elapsed >= 0.14  # three waits of 1/20s
+    assert limiter.stats()["calls"] == 4
+    assert limiter.stats()["queued"] == 0
+
+
+async def test_other_channels_are_not_delayed():
+    """A busy channel does not hold up posts to other channels"""
+    limiter = SlackRateLimiter(
+        channel_rate=1, channel_burst=1, method_rate=1000, method_burst=1000
+    )
+
+    await limiter.acquire("chat.postMessage", "C1")
+    waited = await limiter.acquire("chat.postMessage", "C2")
+    assert waited < 0.05
+
+
+async def test_ratelimited_calls_are_retried_after_retry_after():
+    """A 429 pauses the channel for Retry-After and the call is retried"""
+    limiter = SlackRateLimiter(
+        channel_rate=1000, method_rate=1000, method_burst=1000, backoff=0.01
+    )
+    attempts = []
+
+    async def post(**kwargs):
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise ratelimited_error("0.1")
+        return {"ok": True, "ts": "1234567890.123456"}
+
+    response = await limiter.call("chat.postMessage", "C1", post, channel="C1")
+
+    assert response["ts"] == "1234567890.123456"
+    assert len(attempts) == 2
+    assert attempts[1] - attempts[0] >= 0.1
+    assert limiter.stats()["rate_limited"] == 1
+
+
+async def test_retries_are_bounded():
+    """Persistent rate limiting eventually surfaces the Slack error"""
+    limiter = SlackRateLimiter(
+        channel_rate=1000, method_rate=1000, max_retries=2, backoff=0.001
+    )
+
+    async def post(**kwargs):
+        raise ratelimited_error("0")
+
+    try:
+        await limiter.call("chat.postMessage", "C1", post)
+        assert False, "Expected SlackApiError"
+    except SlackApiError as e:
+        assert e.response["error"] == "ratelimited"
+    assert limiter.stats()["rate_limited"] == 2
+
+
+async def test_exhausted_retries_carry_slack_retry_after():
+    """The error raised after the last retry keeps Slack's Retry-After"""
+    service = SlackService()
+    service.rate_limiter = SlackRateLimiter(
+        channel_rate=1000, method_rate=1000, max_retries=0, backoff=0.001
+    )
+    service.channel_directory.resolve = AsyncMock(return_value="C123")
+
+    with patch.object(
+        service.client,
+        "chat_postMessage",
+        new_callable=AsyncMock,
+        side_effect=ratelimited_error("5"),
+    ):
+        with pytest.raises(SlackRateLimitError) as error:
+            await service.post_message("hsbc", "Test message")
+
+    assert error.value.retry_after == 5
+    await service.close()
+
+
+def test_notify_returns_429_when_slack_rate_limits():
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with TestClient(app) as client:
+            dispatcher = client.app.state.services.dispatcher
+            dispatcher.coalescer.submit = AsyncMock(
+                side_effect=SlackRateLimitError("Slack API error: ratelimited", 6.2)
+            )
+            response = client.post(
+                "/notify",
+                json={"type": "change", "customer": "hsbc", "data": "Added 5"},
+            )
+            batch = client.post(
+                "/notify/batch",
+                json=[{"type": "change", "customer": "hsbc", "data": "Added 5"}],
+            )
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "7"
+    assert batch.json()[0]["status"] == 429
+
+
+if __name__ == "__main__":
+    asyncio.run(test_channel_calls_are_spaced_not_failed())
+    asyncio.run(test_other_channels_are_not_delayed())
+    asyncio.run(test_ratelimited_calls_are_retried_after_retry_after())
+    asyncio.run(test_retries_are_bounded())
+    asyncio.run(test_exhausted_retries_carry_slack_retry_after())
+    test_notify_returns_429_when_slack_rate_limits()
+    print("Rate limiter tests completed!")
@@ -7,9 +7,11 @@ This will post messages to actual Slack channels.
 import asyncio
 import os
 from dotenv import load_dotenv
+from app.dependencies import ServiceContainer
 from app.services.slack_client import SlackService
 from app.types import NotificationRequest, NotificationType
 from app.routers.notifications import send_notification
+from app.shutdown import ShutdownCoordinator
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,7 +22,8 @@ async def test_slack_connection():
     print("Testing Slack connection...")
 
     service = SlackService()
-    is_connected = service.validate_connection()
+    is_connected = await service.validate_connection()
+    await service.close()
 
     if is_connected:
         print("   PASS: Successfully connected to Slack API")
@@ -35,6 +38,8 @@ async def test_real_slack_messages():
     """Test posting real messages to Slack channels"""
     print("\nTesting real Slack message posting...")
 
+    services = ServiceContainer()
+
     # Test cases for different notification types
     test_cases = [
         {
@@ -87,7 +92,13 @@ async def test_real_slack_messages():
                 links=test_case["links"],
             )
 
-            response = await send_notification(request)
+            response = await send_notification(
+                request,
+                dispatcher=services.dispatcher,
+                outbox=services.outbox,
+                idempotency=services.idempotency,
+                shutdown=ShutdownCoordinator(),
+            )
 
             if response.success:
                 print(f"   PASS: Posted to #{test_case['customer']}-private")
@@ -99,11 +110,14 @@ async def test_real_slack_messages():
             print(f"   ERROR: {str(e)}")
             # This might trigger kalos-internal notification for channel not found
 
+    await services.close()
+
 
 async def test_channel_not_found():
     """Test error handling when channel doesn't exist"""
     print("\nTesting channel not found error handling...")
 
+    services = ServiceContainer()
     try:
         request = NotificationRequest(
             type=NotificationType.CHANGE,
@@ -113,7 +127,13 @@ async def test_channel_not_found():
             links=[],
         )
 
-        await send_notification(request)
+        await send_notification(
+            request,
+            dispatcher=services.dispatcher,
+            outbox=services.outbox,
+            idempotency=services.idempotency,
+            shutdown=ShutdownCoordinator(),
+        )
         print(
             "   UNEXPECTED: Message posted successfully when channel should not exist"
         )
@@ -122,6 +142,9 @@ async def test_channel_not_found():
         print(f"   EXPECTED: Error occurred - {str(e)}")
         print("   Check #kalos-internal channel for error notification")
 
+    finally:
+        await services.close()
+
 
 async def main():
     """Run real Slack tests"""
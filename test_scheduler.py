@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for priority lanes and fair scheduling across customers.
+Work is simulated in memory, no API calls are made.
+"""
+
+import asyncio
+from app.services.scheduler import FairScheduler, request_lane, type_lanes
+from app.types import NotificationRequest, NotificationType, Priority
+
+WEIGHTS = {Priority.HIGH: 8, Priority.NORMAL: 4, Priority.LOW: 1}
+
+
+async def run_queued(scheduler: FairScheduler, jobs):
+    """Queue jobs behind a held slot and return the order they were granted in"""
+    order = []
+    gate = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(Priority.NORMAL, "holder"):
+            await gate.wait()
+
+    async def job(lane, customer, name):
+        async with scheduler.slot(lane, customer):
+            order.append(name)
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    tasks = []
+    for lane, customer, name in jobs:
+        tasks.append(asyncio.create_task(job(lane, customer, name)))
+        await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(holder, *tasks)
+    return order
+
+
+async def test_lanes_share_slots_by_weight():
+    """High-priority work goes first without starving the low lane"""
+    scheduler = FairScheduler("format", 1, WEIGHTS)
+    jobs = [(Priority.LOW, "acme", f"low-{index}") for index in range(4)]
+    jobs += [(Priority.HIGH, "acme", f"high-{index}") for index in range(16)]
+
+    order = await run_queued(scheduler, jobs)
+
+    assert order[0] == "high-0"
+    first_low = next(
+        index for index, name in enumerate(order) if name.startswith("low")
+    )
+    assert first_low <= 9
+    assert scheduler.depths() == {lane: 0 for lane in Priority}
+
+
+async def test_noisy_customer_does_not_starve_others():
+    """Customers in the same lane take turns regardless of how much each queued"""
+    scheduler = FairScheduler("post", 1, WEIGHTS)
+    jobs = [(Priority.NORMAL, "noisy", f"noisy-{index}") for index in range(20)]
+    jobs += [(Priority.NORMAL, "quiet", "quiet-0")]
+
+    order = await run_queued(scheduler, jobs)
+
+    assert order.index("quiet-0") == 1
+
+
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = FairScheduler("format", 1, WEIGHTS)
+    gate = asyncio.Event()
+
+    async def hold():
+        async with scheduler.slot(Priority.HIGH, "acme"):
+            await gate.wait()
+
+    async def wait():
+        async with scheduler.slot(Priority.HIGH, "acme"):
+            pass
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(wait())
+    await asyncio.sleep(0)
+    assert scheduler.depths()[Priority.HIGH] == 1
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert scheduler.depths()[Priority.HIGH] == 0
+
+    gate.set()
+    await holder
+    async with scheduler.slot(Priority.LOW, "acme"):
+        pass
+    assert scheduler._active == 0
+
+
+async def test_waiter_cancelled_as_slot_is_released():
+    """A waiter cancelled in the same tick as a release is skipped, not handed the slot"""
+    scheduler = FairScheduler("format", 1, WEIGHTS)
+    gate = asyncio.Event()
+    order = []
+
+    async def hold():
+        async with scheduler.slot(Priority.HIGH, "acme"):
+            await gate.wait()
+            # Cancels the first waiter's future; its task has not run yet
+            cancelled.cancel()
+
+    async def wait(name):
+        async with scheduler.slot(Priority.HIGH, "acme"):
+            order.append(name)
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(wait("cancelled"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(wait("waiter"))
+    await asyncio.sleep(0)
+    assert scheduler.depths()[Priority.HIGH] == 2
+
+    gate.set()
+    await asyncio.wait_for(holder, timeout=1)
+    await asyncio.wait_for(waiter, timeout=1)
+    await asyncio.gather(cancelled, return_exceptions=True)
+
+    assert cancelled.cancelled()
+    assert order == ["waiter"]
+    assert scheduler.depths()[Priority.HIGH] == 0
+    assert scheduler._active == 0
+    assert scheduler._waiting == 0
+
+
+def test_explicit_priority_overrides_type_lane():
+    lanes = type_lanes()
+    update = NotificationRequest(
+        type=NotificationType.UPDATE, customer="acme", data="x"
+    )
+    learning = NotificationRequest(
+        type=NotificationType.LEARNING, customer="acme", data="x", priority="high"
+    )
+
+    assert request_lane(update, lanes) == Priority.HIGH
+    assert request_lane(learning, lanes) == Priority.HIGH
+
+
+if __name__ == "__main__":
+    asyncio.run(test_lanes_share_slots_by_weight())
+    asyncio.run(test_noisy_customer_does_not_starve_others())
+    asyncio.run(test_cancelled_waiter_gives_up_its_place())
+    asyncio.run(test_waiter_cancelled_as_slot_is_released())
+    test_explicit_priority_overrides_type_lane()
+    print("Scheduler tests completed!")
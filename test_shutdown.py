@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for graceful shutdown: draining, readiness and deferral to the outbox.
+Formatting and Slack posting are mocked, no API calls are made.
+"""
+
+import asyncio
+import os
+import tempfile
+from unittest.mock import AsyncMock, Mock, patch
+import pytest
+from fastapi.testclient import TestClient
+from app.exceptions import DeliveryDeferredError
+from app.main import app
+from app.services.outbox import Outbox
+from app.shutdown import ShutdownCoordinator
+from app.types import JobStatus, NotificationRequest, NotificationType
+
+REQUEST = NotificationRequest(
+    type=NotificationType.CHANGE, customer="hsbc", data="Added 5 prospects"
+)
+
+
+async def test_deliveries_past_the_deadline_move_to_the_outbox():
+    coordinator = ShutdownCoordinator(deadline=0.05)
+    outbox = Mock(enqueue=AsyncMock(return_value="job-1"))
+
+    async def quick():
+        await asyncio.sleep(0.01)
+        return "ts-1"
+
+    async def stuck():
+        await asyncio.sleep(10)
+
+    finishing = asyncio.create_task(coordinator.run(REQUEST, quick, outbox))
+    cut_off = asyncio.create_task(coordinator.run(REQUEST, stuck, outbox))
+    await asyncio.sleep(0)
+    await coordinator.drain()
+
+    assert await finishing == "ts-1"
+    with pytest.raises(DeliveryDeferredError) as deferred:
+        await cut_off
+    assert deferred.value.job_id == "job-1"
+    outbox.enqueue.assert_awaited_once_with(REQUEST)
+    assert coordinator.deferred == 1
+
+
+async def test_outbox_stop_lets_the_current_job_finish():
+    class SlowDispatcher:
+        async def deliver(self, request):
+            await asyncio.sleep(0.05)
+            return "ts-1"
+
+    with tempfile.TemporaryDirectory() as directory:
+        outbox = Outbox(path=os.path.join(directory, "outbox.db"), workers=2)
+        await outbox.start(SlowDispatcher())
+        job_id = await outbox.enqueue(REQUEST)
+        await asyncio.sleep(0.01)
+        await outbox.stop(timeout=1.0)
+
+        restarted = Outbox(path=os.path.join(directory, "outbox.db"), workers=1)
+        await restarted.start(SlowDispatcher())
+        job = await restarted.get(job_id)
+        await restarted.stop()
+
+    assert job.status == JobStatus.DELIVERED
+
+
+def test_draining_defers_in_flight_and_turns_away_new_notifications(monkeypatch):
+    with tempfile.TemporaryDirectory() as directory:
+        monkeypatch.setenv("OUTBOX_PATH", os.path.join(directory, "outbox.db"))
+        monkeypatch.setenv("SHUTDOWN_DEADLINE", "0.1")
+
+        with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+            with TestClient(app) as client:
+                shutdown = client.app.state.shutdown
+                services = client.app.state.services
+
+                async def deliver_during_shutdown(request):
+                    shutdown.begin()
+                    await asyncio.sleep(10)
+
+                services.dispatcher.deliver = deliver_during_shutdown
+                assert client.get("/ready").status_code == 200
+
+                deferred = client.post(
+                    "/notify",
+                    json={"type": "change", "customer": "hsbc", "data": "Added 5"},
+                )
+                rejected = client.post(
+                    "/notify",
+                    json={"type": "change", "customer": "hsbc", "data": "Added 5"},
+                )
+                ready = client.get("/ready")
+                health = client.get("/health").json()
+
+    assert deferred.status_code == 202
+    assert deferred.json()["job_id"]
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "1"
+    assert ready.status_code == 503
+    assert ready.json() == {"ready": False, "draining": True}
+    assert health["draining"] is True
+
+
+if __name__ == "__main__":
+    asyncio.run(test_deliveries_past_the_deadline_move_to_the_outbox())
+    asyncio.run(test_outbox_stop_lets_the_current_job_finish())
+    print("Shutdown tests completed!")
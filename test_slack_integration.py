@@ -5,7 +5,7 @@ This tests the basic Slack service functionality without requiring actual API ca
 """
 
 import asyncio
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, patch
 from app.services.slack_client import SlackService
 from app.exceptions import SlackIntegrationError
 
@@ -33,7 +33,9 @@ async def test_slack_service():
     # Test mock Slack API integration
     print("\nTesting Slack API integration:")
 
-    with patch.object(service.client, "chat_postMessage") as mock_post:
+    with patch.object(
+        service.client, "chat_postMessage", new_callable=AsyncMock
+    ) as mock_post:
         # Test successful message posting
         mock_post.return_value = {"ok": True, "ts": "1234567890.123456"}
 
@@ -48,7 +50,9 @@ async def test_slack_service():
 
     # Test channel not found error
     with patch.object(service, "_post_channel_not_found_error") as mock_internal_post:
-        with patch.object(service.client, "chat_postMessage") as mock_post:
+        with patch.object(
+            service.client, "chat_postMessage", new_callable=AsyncMock
+        ) as mock_post:
             # Simulate channel not found error
             from slack_sdk.errors import SlackApiError
 
@@ -64,6 +68,7 @@ async def test_slack_service():
                 # Verify internal notification was called
                 mock_internal_post.assert_called_once()
 
+    await service.close()
     print("\nSlack service tests completed!")
 
 
@@ -125,28 +130,29 @@ async def test_simple_message_formatting():
     print("Message formatting fallback tests completed!")
 
 
-def test_slack_connection_validation():
+async def test_slack_connection_validation():
     """Test the Slack connection validation"""
     print("\nTesting Slack connection validation:")
 
     service = SlackService()
 
     # Test successful validation
-    with patch.object(service.client, "auth_test") as mock_auth:
+    with patch.object(service.client, "auth_test", new_callable=AsyncMock) as mock_auth:
         mock_auth.return_value = {"ok": True}
-        result = service.validate_connection()
+        result = await service.validate_connection()
         status = "PASS" if result else "FAIL"
         print(f"   {status}: Connection validation with success response")
 
     # Test failed validation
-    with patch.object(service.client, "auth_test") as mock_auth:
+    with patch.object(service.client, "auth_test", new_callable=AsyncMock) as mock_auth:
         from slack_sdk.errors import SlackApiError
 
         mock_auth.side_effect = SlackApiError("Auth failed", {"error": "invalid_auth"})
-        result = service.validate_connection()
+        result = await service.validate_connection()
         status = "PASS" if not result else "FAIL"
         print(f"   {status}: Connection validation with auth error")
 
+    await service.close()
     print("Connection validation tests completed!")
 
 
@@ -154,7 +160,9 @@ async def test_end_to_end_notification():
     """Test the complete notification flow"""
     print("\nTesting end-to-end notification flow:")
 
+    from app.dependencies import ServiceContainer
     from app.routers.notifications import send_notification
+    from app.shutdown import ShutdownCoordinator
     from app.types import NotificationRequest, NotificationType
 
     # Create test request
@@ -167,16 +175,24 @@ async def test_end_to_end_notification():
     )
 
     # Mock the Slack client
-    with patch("app.services.slack_client.WebClient") as mock_client_class:
-        mock_client = Mock()
-        mock_client_class.return_value = mock_client
+    with patch("app.services.slack_client.AsyncWebClient") as mock_client_class:
+        mock_client = mock_client_class.return_value
+        mock_client.session = None
+        mock_client.chat_postMessage = AsyncMock()
         mock_client.chat_postMessage.return_value = {
             "ok": True,
             "ts": "1234567890.123456",
         }
+        services = ServiceContainer()
 
         try:
-            response = await send_notification(test_request)
+            response = await send_notification(
+                test_request,
+                dispatcher=services.dispatcher,
+                outbox=services.outbox,
+                idempotency=services.idempotency,
+                shutdown=ShutdownCoordinator(),
+            )
             if response.success and response.message_id:
                 print("   PASS: End-to-end notification completed successfully")
                 print(f"   Message ID: {response.message_id}")
@@ -184,6 +200,8 @@ async def test_end_to_end_notification():
                 print("   FAIL: End-to-end notification failed")
         except Exception as e:
             print(f"   FAIL: End-to-end notification error: {e}")
+        finally:
+            await services.close()
 
     print("End-to-end notification tests completed!")
 
@@ -194,7 +212,7 @@ async def main():
 
     await test_slack_service()
     test_simple_message_formatting()
-    test_slack_connection_validation()
+    await test_slack_connection_validation()
     await test_end_to_end_notification()
 
     print("\nAll tests completed successfully!")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared state backends and the services that use them.
+Redis is replaced by a local stand-in and Slack by fakes, no API calls are made.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from benchmarks.fake_redis import FakeRedis
+from app.exceptions import StateBackendError
+from app.services.channel_directory import ChannelDirectory
+from app.services.format_cache import FormatCache
+from app.services.rate_limiter import SlackRateLimiter
+from app.services.state import MemoryState, RedisState, SQLiteState, StateBackend
+
+
+class FakeSlackClient:
+    def __init__(self):
+        self.list_calls = 0
+
+    async def conversations_list(self, **kwargs):
+        self.list_calls += 1
+        return {"channels": [{"name": "hsbc-private", "id": "C1"}]}
+
+
+async def check_backend(state):
+    assert await state.get("missing") is None
+    await state.set("greeting", "hello", ttl=60)
+    assert await state.get("greeting") == "hello"
+
+    assert await state.add("lease", "worker-1", ttl=60)
+    assert not await state.add("lease", "worker-2", ttl=60)
+    assert await state.get("lease") == "worker-1"
+
+    assert [await state.incr("counter", ttl=60) for _ in range(3)] == [1, 2, 3]
+
+    await state.set("short", "gone soon", ttl=0.05)
+    await asyncio.sleep(0.1)
+    assert await state.get("short") is None
+    assert await state.add("short", "again", ttl=60)
+
+
+async def test_backends_share_the_same_semantics():
+    fake_redis = FakeRedis()
+    url = await fake_redis.start()
+    with tempfile.TemporaryDirectory() as directory:
+        backends = [
+            MemoryState(),
+            SQLiteState(path=os.path.join(directory, "state.db")),
+            RedisState(url=url),
+        ]
+        try:
+            for state in backends:
+                await check_backend(state)
+        finally:
+            for state in backends:
+                await state.close()
+            await fake_redis.stop()
+
+
+def test_incomplete_backend_cannot_be_created():
+    class GetOnlyState(StateBackend):
+        async def get(self, key):
+            return None
+
+    try:
+        GetOnlyState()
+        raise AssertionError("Expected TypeError")
+    except TypeError:
+        pass
+
+
+async def test_workers_share_cached_messages_and_channel_index():
+    fake_redis = FakeRedis()
+    url = await fake_redis.start()
+    workers = [RedisState(url=url), RedisState(url=url)]
+    try:
+        first, second = (FormatCache(ttl=60, state=state) for state in workers)
+        await first.set("key", "Hello from Blue!")
+        assert await second.get("key") == "Hello from Blue!"
+        assert second.stats()["shared_hits"] == 1
+
+        client = FakeSlackClient()
+        directories = [ChannelDirectory(client, state=state) for state in workers]
+        assert await directories[0].resolve("hsbc-private") == "C1"
+        assert await directories[1].resolve("hsbc-private") == "C1"
+        assert client.list_calls == 1
+        assert directories[1].shared_loads == 1
+    finally:
+        for state in workers:
+            await state.close()
+        await fake_redis.stop()
+
+
+async def test_rate_limits_are_global_across_workers():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "state.db")
+        workers = [SQLiteState(path=path), SQLiteState(path=path)]
+        limiters = [
+            SlackRateLimiter(channel_rate=20, channel_burst=1, state=state)
+            for state in workers
+        ]
+        started = time.monotonic()
+        await asyncio.gather(
+            *(
+                limiter.acquire("chat.postMessage", "C1")
+                for limiter in limiters
+                for _ in range(3)
+            )
+        )
+        elapsed = time.monotonic() - started
+        for state in workers:
+            await state.close()
+
+    # Six posts to one channel at 20/s take at least five 50ms windows,
+    # where two independent limiters would have let them through in 100ms
+    assert elapsed >= 0.2
+
+
+async def test_unreachable_backend_falls_back_to_local_state():
+    state = RedisState(url="redis://127.0.0.1:1/0", timeout=0.5)
+    cache = FormatCache(ttl=60, state=state)
+    limiter = SlackRateLimiter(channel_rate=1, channel_burst=1, state=state)
+
+    await cache.set("key", "Hello from Blue!")
+    assert await cache.get("key") == "Hello from Blue!"
+    assert await limiter.acquire("chat.postMessage", "C1") < 0.1
+    try:
+        await state.get("key")
+        raise AssertionError("Expected StateBackendError")
+    except StateBackendError:
+        pass
+    assert state.errors >= 3
+    await state.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(test_backends_share_the_same_semantics())
+    test_incomplete_backend_cannot_be_created()
+    asyncio.run(test_workers_share_cached_messages_and_channel_index())
+    asyncio.run(test_rate_limits_are_global_across_workers())
+    asyncio.run(test_unreachable_backend_falls_back_to_local_state())
+    print("State backend tests completed!")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the NDJSON streaming notification endpoint.
+Formatting and Slack posting are mocked, no API calls are made.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.routers.notifications import _stream_deliveries
+
+
+def record(customer: str) -> bytes:
+    return json.dumps(
+        {"type": "change", "customer": customer, "data": ["Added 5 prospects"]}
+    ).encode()
+
+
+def test_stream_delivers_records_split_across_chunks():
+    """Each non-empty line gets one response line tagged with its index"""
+    body = (
+        record("hsbc")
+        + b"\n"
+        + record("goldman")
+        + b"\n\n{not json}\n"
+        + record("anthropic")
+    )
+
+    def chunks():
+        for start in range(0, len(body), 7):
+            yield body[start : start + 7]
+
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with TestClient(app) as client:
+            services = client.app.state.services
+            services.message_formatter.format_message = AsyncMock(
+                return_value="Hello from Blue!"
+            )
+            services.slack_service.post_message = AsyncMock(
+                side_effect=lambda customer, message: f"ts-{customer}"
+            )
+            response = client.post("/notify/stream", content=chunks())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {
+        line["index"]: line
+        for line in map(json.loads, response.text.strip().split("\n"))
+    }
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[0]["message_id"] == "ts-hsbc"
+    assert results[1]["message_id"] == "ts-goldman"
+    assert results[2]["status"] == 400
+    assert results[3]["message_id"] == "ts-anthropic"
+
+
+async def test_stream_stops_reading_while_concurrency_is_exhausted():
+    """Backpressure: no more input is read until in-flight records complete"""
+    release = asyncio.Event()
+    read = []
+
+    async def deliver(request):
+        await release.wait()
+        return f"ts-{request.customer}"
+
+    async def chunks():
+        for index in range(10):
+            read.append(index)
+            yield record(f"customer-{index}") + b"\n"
+
+    dispatcher = Mock(deliver=AsyncMock(side_effect=deliver))
+    with patch("app.routers.notifications.STREAM_CONCURRENCY", 2):
+        stream = _stream_deliveries(chunks(), dispatcher)
+        first = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0.05)
+        assert len(read) <= 3
+
+        release.set()
+        lines = [await first] + [line async for line in stream]
+
+    assert len(lines) == 10
+    assert len(read) == 10
+
+
+if __name__ == "__main__":
+    test_stream_delivers_records_split_across_chunks()
+    asyncio.run(test_stream_stops_reading_while_concurrency_is_exhausted())
+    print("Stream notification tests completed!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for template-based formatting and mode selection.
+The LLM is mocked, no API calls are made.
+"""
+
+import asyncio
+from unittest.mock import patch
+from app.services.message_formatter import MessageFormatter
+from app.services.templates import render_template
+from app.types import FormatMode, NotificationType
+
+
+def test_render_templates():
+    """Each notification type renders Slack mrkdwn with campaign and links"""
+    change = render_template(
+        NotificationType.CHANGE,
+        "hsbc",
+        ["Added 15 new prospects", "Increased spend to $40k"],
+        campaign="Investment Bankers",
+    )
+    assert "*Investment Bankers*" in change
+    assert "• Added 15 new prospects\n• Increased spend to $40k" in change
+
+    learning = render_template(
+        NotificationType.LEARNING, "goldman", "Conversion rate up 18%"
+    )
+    assert "• Conversion rate up 18%" in learning
+
+    update = render_template(
+        NotificationType.UPDATE,
+        "anthropic",
+        "Monthly spend limit reached",
+        links=["https://getkalos.com/account/approve-budget"],
+    )
+    assert "*Action required*" in update
+    assert "<https://getkalos.com/account/approve-budget|Approve budget>" in update
+
+
+def test_render_templates_escapes_mrkdwn():
+    """Data cannot inject Slack markup and URLs cannot break out of links"""
+    message = render_template(
+        NotificationType.UPDATE,
+        "AT&T",
+        ["Replies <@U123> & <!channel> > 5"],
+        campaign="Q3 <Outreach>",
+        links=["https://getkalos.com/report?a=1&b=x|y>z <evil>"],
+    )
+
+    assert "*Q3 &lt;Outreach&gt;*" in message
+    assert "• Replies &lt;@U123&gt; &amp; &lt;!channel&gt; &gt; 5" in message
+    assert "<!channel>" not in message
+    link = message.rsplit("\n", 1)[-1]
+    assert link.startswith(
+        "<https://getkalos.com/report?a=1&amp;b=x%7Cy%3Ez%20%3Cevil%3E|"
+    )
+    assert link.count("|") == 1 and link.count(">") == 1 and link.endswith(">")
+
+    change = render_template(NotificationType.CHANGE, "AT&T <x>", "Added 5")
+    assert change.startswith("Hi AT&amp;T &lt;x&gt; team!")
+
+
+def test_resolve_mode():
+    """Request mode overrides the type default, auto keeps updates on the LLM"""
+    formatter = MessageFormatter()
+
+    assert formatter.resolve_mode(NotificationType.CHANGE, "x") == FormatMode.LLM
+    assert (
+        formatter.resolve_mode(NotificationType.CHANGE, "x", FormatMode.TEMPLATE)
+        == FormatMode.TEMPLATE
+    )
+    assert (
+        formatter.resolve_mode(NotificationType.LEARNING, ["short"], FormatMode.AUTO)
+        == FormatMode.TEMPLATE
+    )
+    assert (
+        formatter.resolve_mode(NotificationType.UPDATE, "short", FormatMode.AUTO)
+        == FormatMode.LLM
+    )
+    assert (
+        formatter.resolve_mode(NotificationType.CHANGE, "x" * 500, FormatMode.AUTO)
+        == FormatMode.LLM
+    )
+
+
+async def test_template_mode_skips_llm():
+    """Template mode never calls the agent"""
+    formatter = MessageFormatter()
+
+    with patch("app.services.message_formatter.Runner.run") as mock_run:
+        message = await formatter.format_message(
+            notification_type=NotificationType.CHANGE,
+            customer="hsbc",
+            data="Added 15 new prospects",
+            mode=FormatMode.TEMPLATE,
+        )
+
+    mock_run.assert_not_called()
+    assert "• Added 15 new prospects" in message
+
+
+if __name__ == "__main__":
+    test_render_templates()
+    test_render_templates_escapes_mrkdwn()
+    test_resolve_mode()
+    asyncio.run(test_template_mode_skips_llm())
+    print("Template tests completed!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Tests for request tracing and the trace debug endpoint.
+Formatting and Slack posting are mocked, no API calls are made.
+"""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import tracing
+from app.main import app
+from app.routers import debug
+from app.tracing import Tracer, parse_trace_headers, span
+
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+async def test_spans_form_a_tree_across_tasks():
+    tracer = Tracer(sample_rate=1.0, buffer_size=10)
+
+    async def stage(name: str, fail: bool = False):
+        with span(name):
+            await asyncio.sleep(0.01)
+            if fail:
+                raise RuntimeError("Slack API error")
+
+    with tracer.trace("POST /notify", "trace-1"):
+        with span("deliver"):
+            await asyncio.gather(
+                stage("format"), stage("post", fail=True), return_exceptions=True
+            )
+
+    trace = tracer.get("trace-1")
+    deliver = trace["children"][0]
+    assert deliver["name"] == "deliver"
+    children = {child["name"]: child for child in deliver["children"]}
+    assert children["format"]["status"] == "ok"
+    assert children["format"]["duration_ms"] >= 10
+    assert children["post"]["status"] == "error"
+    assert "Slack API error" in children["post"]["attributes"]["error"]
+
+
+def test_unsampled_requests_keep_a_trace_id_without_spans():
+    tracer = Tracer(sample_rate=0.0)
+
+    with tracer.trace("POST /notify") as root:
+        with span("deliver") as child:
+            trace_id = tracing.current_trace_id()
+
+    assert root is None and child is None
+    assert trace_id
+    assert tracing.current_trace_id() is None
+    assert not tracer.traces
+
+
+def test_trace_headers():
+    assert parse_trace_headers({"traceparent": TRACEPARENT}) == (
+        "4bf92f3577b34da6a3ce929d0e0e4736",
+        True,
+    )
+    assert parse_trace_headers({"x-trace-id": "req-42"}) == ("req-42", None)
+    assert parse_trace_headers({"x-trace-id": "bad id!"}) == (None, None)
+
+
+def test_notify_returns_trace_id_and_records_trace(monkeypatch):
+    monkeypatch.setattr(tracing.tracer, "sample_rate", 0.0)
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    with patch("app.dependencies.ServiceContainer.warm_up", new_callable=AsyncMock):
+        with TestClient(app) as client:
+            services = client.app.state.services
+            services.message_formatter.format_message = AsyncMock(
+                return_value="Hello from Blue!"
+            )
+            services.slack_service.post_message = AsyncMock(return_value="ts-1")
+            response = client.post(
+                "/notify",
+                json={"type": "change", "customer": "hsbc", "data": "Added 5"},
+                headers={"traceparent": TRACEPARENT},
+            )
+            trace = tracing.tracer.get(trace_id)
+            unsampled = client.post(
+                "/notify",
+                json={"type": "change", "customer": "hsbc", "data": "Added 5"},
+            )
+            listing = tracing.tracer.recent(limit=1)
+            # Not mounted unless TRACE_DEBUG_ENDPOINT=true
+            debug_response = client.get(f"/debug/traces/{trace_id}")
+
+    assert response.json()["trace_id"] == trace_id
+    assert response.headers["x-trace-id"] == trace_id
+    assert trace["attributes"]["customer"] == "hsbc"
+    assert trace["attributes"]["status_code"] == 200
+    deliver = trace["children"][0]
+    assert deliver["attributes"]["outcome"] == "success"
+    assert [child["name"] for child in deliver["children"]] == ["format", "post"]
+
+    assert unsampled.json()["trace_id"] == unsampled.headers["x-trace-id"]
+    assert listing[0]["trace_id"] == trace_id
+    assert debug_response.status_code == 404
+
+
+def test_debug_endpoints_serve_traces(monkeypatch):
+    tracer = Tracer(sample_rate=1.0, buffer_size=10)
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    with tracer.trace("POST /notify", "trace-1"):
+        pass
+    debug_app = FastAPI()
+    debug_app.include_router(debug.router)
+
+    with TestClient(debug_app) as client:
+        trace = client.get("/debug/traces/trace-1")
+        listing = client.get("/debug/traces", params={"limit": 1})
+        missing = client.get("/debug/traces/trace-2")
+
+    assert trace.json()["trace_id"] == "trace-1"
+    assert listing.json()["traces"][0]["trace_id"] == "trace-1"
+    assert missing.status_code == 404
+
+
+def test_traces_are_appended_to_the_trace_file(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(sample_rate=1.0, path=str(path))
+    with tracer.trace("POST /notify", "trace-1"):
+        pass
+    with tracer.trace("POST /notify", "trace-2"):
+        pass
+    tracer.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["trace_id"] for line in lines] == ["trace-1", "trace-2"]
+
+
+if __name__ == "__main__":
+    asyncio.run(test_spans_form_a_tree_across_tasks())
+    test_unsampled_requests_keep_a_trace_id_without_spans()
+    test_trace_headers()
+    print("Tracing tests completed!")